@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Compara la memoria y el tiempo de arranque de los dos modos de lanzar varios
+workers:
+
+- ``uvicorn``: ``uvicorn src.main:app --workers N`` (lo que hace ``fastapi
+  run --workers N``); cada worker se crea con spawn e importa y calienta la
+  aplicación por su cuenta.
+- ``prefork``: ``python -m src.launcher --workers N``; el maestro precarga la
+  aplicación, congela el heap y crea los workers con fork.
+
+Mide el tiempo hasta que ``/health/ready`` responde 200 en todos los workers
+y, después de arrancar y tras unas peticiones al menú, la memoria de cada
+proceso leída de ``/proc/<pid>/smaps_rollup`` (solo Linux):
+
+- RSS: memoria residente, contando las páginas compartidas en cada proceso.
+- PSS: las páginas compartidas se reparten entre los procesos que las usan.
+- USS: memoria privada del proceso (lo que se liberaría al terminarlo).
+
+Uso:
+    python scripts-examples/bench_workers.py --workers 4
+    python scripts-examples/bench_workers.py --workers 4 --modos prefork --peticiones 500
+"""
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+from pathlib import Path
+from typing import Dict, List, Optional
+
+project_root = Path(__file__).parent.parent
+
+TRAFFIC_PATHS = (
+    "/api/v1/public/platos",
+    "/api/v1/public/vinos",
+    "/api/v1/public/facets?entidad=vinos",
+    "/api/v1/public/vinos/lote?ids=1,2,3",
+)
+
+def _command(mode: str, app: str, port: int, workers: int) -> List[str]:
+    if mode == "prefork":
+        return [sys.executable, "-m", "src.launcher", "--app", app,
+                "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    return [sys.executable, "-m", "uvicorn", app, "--host", "0.0.0.0",
+            "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+
+def _get(url: str, timeout: float = 2.0) -> Optional[int]:
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            return response.status
+    except urllib.error.HTTPError as e:
+        return e.code
+    except OSError:
+        return None
+
+def _descendants(pid: int) -> List[int]:
+    """El proceso y todos sus descendientes"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    result, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        result.append(current)
+        pending.extend(children.get(current, ()))
+    return result
+
+def _memory(pid: int) -> Dict[str, float]:
+    """RSS, PSS y USS del proceso en MiB"""
+    values: Dict[str, int] = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                values[parts[0][:-1]] = int(parts[1])
+    uss = values.get("Private_Clean", 0) + values.get("Private_Dirty", 0)
+    return {"rss": values.get("Rss", 0) / 1024, "pss": values.get("Pss", 0) / 1024, "uss": uss / 1024}
+
+def _report(title: str, root: int) -> None:
+    print(f"  {title}")
+    totals = {"rss": 0.0, "pss": 0.0, "uss": 0.0}
+    for pid in _descendants(root):
+        try:
+            memory = _memory(pid)
+        except OSError:
+            continue
+        role = "maestro" if pid == root else "worker"
+        print(f"    {role:8} {pid:>7}  RSS {memory['rss']:7.1f}  PSS {memory['pss']:7.1f}  USS {memory['uss']:7.1f} MiB")
+        for key in totals:
+            totals[key] += memory[key]
+    print(f"    {'total':16}  RSS {totals['rss']:7.1f}  PSS {totals['pss']:7.1f}  USS {totals['uss']:7.1f} MiB")
+
+def run(mode: str, app: str, port: int, workers: int, requests: int, timeout: float) -> None:
+    print(f"\n== {mode} ({workers} workers)")
+    start = time.perf_counter()
+    process = subprocess.Popen(_command(mode, app, port, workers), cwd=project_root)
+    base = f"http://127.0.0.1:{port}"
+    try:
+        # Listo cuando `workers` respuestas seguidas dan 200 (las conexiones se reparten entre workers)
+        streak = 0
+        while streak < workers * 3:
+            if process.poll() is not None:
+                raise RuntimeError(f"El proceso terminó con código {process.returncode}")
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError("Tiempo de espera agotado")
+            streak = streak + 1 if _get(base + "/health/ready") == 200 else 0
+            if not streak:
+                time.sleep(0.05)
+        print(f"  listo en {(time.perf_counter() - start) * 1000:.0f} ms")
+        _report("tras arrancar", process.pid)
+
+        if requests:
+            for i in range(requests):
+                _get(base + TRAFFIC_PATHS[i % len(TRAFFIC_PATHS)])
+            _report(f"tras {requests} peticiones", process.pid)
+    finally:
+        process.send_signal(signal.SIGTERM)
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--app", default="src.main:app")
+    parser.add_argument("--modos", nargs="+", choices=("uvicorn", "prefork"), default=["uvicorn", "prefork"])
+    parser.add_argument("--peticiones", type=int, default=200)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+    for mode in args.modos:
+        run(mode, args.app, args.port, args.workers, args.peticiones, args.timeout)
+        time.sleep(1)
+
+if __name__ == "__main__":
+    main()
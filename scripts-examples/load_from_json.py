@@ -25,9 +25,7 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 try:
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-    from src.core.config import settings
+    from src.database import SessionLocal
     from src.entities.plato import Plato
     from src.entities.vino import Vino
     from src.entities.categoria_plato import CategoriaPlato
@@ -47,9 +45,7 @@ except ImportError as e:
     sys.exit(1)
 
 def create_session():
-    """Crea una sesión de base de datos"""
-    engine = create_engine(settings.sync_dsn, echo=False)
-    SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    """Crea una sesión de base de datos (la misma configuración de engine que la API)"""
     return SessionLocal()
 
 def load_categorias_platos(db, data: List[Dict[str, Any]]) -> Dict[str, CategoriaPlato]:
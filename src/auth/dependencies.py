@@ -8,51 +8,78 @@ from typing import Optional
 
 from src.database import get_db
 from src.auth.service import AuthService
-from src.entities.user import User
+from src.auth.token_registry import ADMIN_ROLE, TokenUser, token_registry
 
 # Configuración del esquema de seguridad
 security = HTTPBearer()
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail=detail,
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+def authenticate_token(token: str, db: Session) -> TokenUser:
     """
-    Dependencia para obtener el usuario actual desde el token JWT
+    Valida el token y devuelve el usuario. Con los claims `uid` y `ver` se
+    comprueba contra el registro en memoria; los tokens emitidos antes de
+    tenerlos se validan buscando el usuario en la base de datos
     """
-    token = credentials.credentials
-    
-    # Verificar el token
     payload = AuthService.verify_token(token)
     username: str = payload.get("sub")
-    
+
     if username is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Token inválido",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
+        raise _unauthorized("Token inválido")
+
+    user_id = payload.get("uid")
+    version = payload.get("ver")
+    if isinstance(user_id, int) and isinstance(version, int):
+        state = token_registry.state(user_id)
+        if state is None:
+            raise _unauthorized("Usuario no encontrado")
+        if not state.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Usuario inactivo"
+            )
+        # Nombre, rol y contraseña se comparan también: pueden cambiar sin pasar por el ORM
+        credentials = payload.get("cred")
+        if (
+            version != state.token_version
+            or username != state.username
+            or (payload.get("role") == ADMIN_ROLE) != state.is_admin
+            or (credentials is not None and credentials != state.credentials)
+        ):
+            raise _unauthorized("Token revocado")
+        return TokenUser(id=user_id, username=username, is_admin=state.is_admin)
+
     # Obtener usuario de la base de datos
     user = AuthService.get_user_by_username(db, username)
     if user is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario no encontrado",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
+        raise _unauthorized("Usuario no encontrado")
+
     if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Usuario inactivo"
         )
-    
-    return user
+
+    return TokenUser.from_user(user)
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: Session = Depends(get_db)
+) -> TokenUser:
+    """
+    Dependencia para obtener el usuario actual desde el token JWT (síncrona:
+    la recarga del registro de tokens consulta la base de datos)
+    """
+    return authenticate_token(credentials.credentials, db)
 
 async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
-) -> User:
+    current_user: TokenUser = Depends(get_current_user)
+) -> TokenUser:
     """
     Dependencia para obtener usuario activo
     """
@@ -64,8 +91,8 @@ async def get_current_active_user(
     return current_user
 
 async def get_current_admin_user(
-    current_user: User = Depends(get_current_active_user)
-) -> User:
+    current_user: TokenUser = Depends(get_current_active_user)
+) -> TokenUser:
     """
     Dependencia para verificar que el usuario sea administrador
     """
@@ -77,28 +104,17 @@ async def get_current_admin_user(
     return current_user
 
 # Dependencia opcional para autenticación (no obligatoria)
-async def get_current_user_optional(
+def get_current_user_optional(
     credentials: Optional[HTTPAuthorizationCredentials] = Depends(security),
     db: Session = Depends(get_db)
-) -> Optional[User]:
+) -> Optional[TokenUser]:
     """
     Dependencia opcional para obtener el usuario actual si está autenticado
     """
     if credentials is None:
         return None
-    
+
     try:
-        token = credentials.credentials
-        payload = AuthService.verify_token(token)
-        username: str = payload.get("sub")
-        
-        if username is None:
-            return None
-        
-        user = AuthService.get_user_by_username(db, username)
-        if user is None or not user.is_active:
-            return None
-        
-        return user
+        return authenticate_token(credentials.credentials, db)
     except HTTPException:
         return None
@@ -8,6 +8,7 @@ from passlib.context import CryptContext
 from fastapi import HTTPException, status
 from sqlalchemy.orm import Session
 
+from src.auth.token_registry import ADMIN_ROLE, USER_ROLE, credentials_fingerprint
 from src.core.config import settings
 from src.entities.user import User
 
@@ -36,6 +37,17 @@ class AuthService:
             return None
         return user
     
+    @staticmethod
+    def token_claims(user: User) -> dict:
+        """Claims con los que se autoriza sin consultar la base de datos"""
+        return {
+            "sub": user.username,
+            "uid": user.id,
+            "role": ADMIN_ROLE if user.is_admin else USER_ROLE,
+            "ver": user.token_version,
+            "cred": credentials_fingerprint(user.hashed_password),
+        }
+    
     @staticmethod
     def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
         """Crear token JWT"""
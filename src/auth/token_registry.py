@@ -0,0 +1,110 @@
+"""
+Estado de autorización de los usuarios en memoria
+
+Los tokens llevan el id (``uid``), el rol (``role``), la versión de token del
+usuario al emitirlos (``ver``) y una huella de su contraseña (``cred``). Se
+validan contra el estado actual de cada usuario, que se guarda aquí para
+todos: un cambio de credenciales, rol o estado hecho sobre un ``User``
+incrementa la versión, y uno que no pasa por ese hook (``UPDATE`` masivo,
+SQL a mano) se detecta al comparar el nombre, el rol y la huella con los
+claims.
+
+La tabla se recarga entera (los usuarios son pocos) cuando cambia la versión
+del ámbito "usuarios": al instante si el commit es de este worker y, si es
+de otro, al leer esa fila, como mucho cada ``auth_state_check_seconds``. Los
+``UPDATE`` masivos del ORM la incrementan solos; el SQL a mano debe llamar a
+``mark_changed(session, "users")`` en la misma transacción.
+"""
+import hashlib
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, NamedTuple, Optional
+
+from sqlalchemy import select
+
+from src.core.config import settings
+from src.database import SessionLocal
+from src.database.change_tracking import USERS_SCOPE, CommittedChanges, read_version, register_commit_listener
+from src.entities.user import User
+
+ADMIN_ROLE = "admin"
+USER_ROLE = "user"
+
+@dataclass(frozen=True)
+class TokenUser:
+    """Usuario autenticado, construido a partir de los claims del token"""
+    id: int
+    username: str
+    is_admin: bool
+    is_active: bool = True
+
+    @classmethod
+    def from_user(cls, user: User) -> "TokenUser":
+        return cls(id=user.id, username=user.username, is_admin=user.is_admin, is_active=user.is_active)
+
+def credentials_fingerprint(hashed_password: str) -> str:
+    """Huella corta del hash de la contraseña, para el claim `cred`"""
+    return hashlib.sha256(hashed_password.encode("utf-8")).hexdigest()[:16]
+
+class UserState(NamedTuple):
+    """Estado de un usuario con el que se validan sus tokens"""
+    token_version: int
+    is_active: bool
+    is_admin: bool
+    username: str
+    credentials: str
+
+class TokenRegistry:
+    """id de usuario -> estado de autorización"""
+
+    def __init__(self, check_interval: float) -> None:
+        self.check_interval = check_interval
+        self.reloads = 0
+        self._states: Dict[int, UserState] = {}
+        self._scope_version: Optional[int] = None
+        self._stale = True
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def state(self, user_id: int) -> Optional[UserState]:
+        """Estado actual del usuario, o None si no existe"""
+        if self._stale or time.monotonic() - self._checked_at >= self.check_interval:
+            self._refresh()
+        return self._states.get(user_id)
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    def _refresh(self) -> None:
+        with self._lock:
+            if not self._stale and time.monotonic() - self._checked_at < self.check_interval:
+                return
+            # Antes de leer: un commit concurrente volverá a marcarla como obsoleta
+            stale, self._stale = self._stale, False
+            db = SessionLocal()
+            try:
+                row = read_version(db, USERS_SCOPE)
+                version = row[0] if row else None
+                if stale or version is None or version != self._scope_version:
+                    self._states = {
+                        user_id: UserState(token_version, is_active, is_admin, username, credentials_fingerprint(hashed_password))
+                        for user_id, token_version, is_active, is_admin, username, hashed_password in db.execute(
+                            select(User.id, User.token_version, User.is_active, User.is_admin, User.username, User.hashed_password)
+                        )
+                    }
+                    self._scope_version = version
+                    self.reloads += 1
+            except Exception:
+                self._stale = True
+                raise
+            finally:
+                db.close()
+            self._checked_at = time.monotonic()
+
+token_registry = TokenRegistry(check_interval=settings.auth_state_check_seconds)
+
+@register_commit_listener
+def _invalidate_token_registry(changes: CommittedChanges) -> None:
+    if changes.scope == USERS_SCOPE:
+        token_registry.invalidate()
@@ -0,0 +1,326 @@
+"""
+Cachés para la capa de servicios: LRU en proceso y memoria compartida entre workers
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo entre procesos
+    fcntl = None
+
+from src.core.config import settings
+from src.core.singleflight import SingleFlight
+
+def cache_key(prefix: str, **params: Any) -> str:
+    """
+    Clave canónica a partir de parámetros de filtrado: ignora los nulos,
+    normaliza textos (sin espacios extremos, sin mayúsculas) y números
+    """
+    parts = [prefix]
+    for name in sorted(params):
+        value = params[name]
+        if value is None or value == "":
+            continue
+        if isinstance(value, str):
+            value = value.strip().casefold()
+        elif isinstance(value, bool):
+            value = int(value)
+        elif isinstance(value, (int, float)):
+            value = repr(float(value))
+        parts.append(f"{name}={value}")
+    return "|".join(parts)
+
+class CacheBackend(ABC):
+    """Interfaz común de las cachés de la capa de servicios"""
+
+    def __init__(self) -> None:
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    @abstractmethod
+    def generation(self) -> int:
+        """Contador que avanza con cada invalidación"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Devuelve el valor cacheado o None"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        """
+        Guarda un valor. Si se indica `generation` (leída antes de calcularlo)
+        y ha habido una invalidación entretanto, el valor se descarta
+        """
+
+    @abstractmethod
+    def invalidate(self, version: Optional[int] = None, local: bool = True) -> None:
+        """
+        Invalida todas las entradas. `version` es la versión de cambios de la
+        base de datos: los avisos no locales (detectados por varios workers)
+        se ignoran si esa versión ya se aplicó
+        """
+
+    def get_or_set(
+        self,
+        key: str,
+        compute: Callable[[], Any],
+        flight: Optional[SingleFlight] = None
+    ) -> Any:
+        """
+        Devuelve el valor cacheado o lo calcula y lo guarda. Con `flight`,
+        los fallos concurrentes de la misma clave comparten un único cálculo
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if flight is None:
+            return self._fill(key, compute)
+        return flight.do(key, lambda: self._fill(key, compute))
+
+    def _fill(self, key: str, compute: Callable[[], Any]) -> Any:
+        # Otro líder puede haber rellenado la entrada mientras tanto
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        self.misses += 1
+        generation = self.generation
+        value = compute()
+        self.set(key, value, generation)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": type(self).__name__,
+            "generation": self.generation,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+class NullCache(CacheBackend):
+    """Caché desactivada"""
+
+    @property
+    def generation(self) -> int:
+        return 0
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        pass
+
+    def invalidate(self, version: Optional[int] = None, local: bool = True) -> None:
+        pass
+
+class LRUCache(CacheBackend):
+    """Caché LRU en memoria del proceso, con TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._applied_version = 0
+
+    @property
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._data[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, version: Optional[int] = None, local: bool = True) -> None:
+        with self._lock:
+            if version is not None:
+                if not local and version == self._applied_version:
+                    return
+                self._applied_version = version
+            self._generation += 1
+            self._data.clear()
+
+class SharedMemoryCache(CacheBackend):
+    """
+    Caché compartida por todos los workers de un host, sin servicios externos.
+
+    Cada entrada es un fichero JSON serializado en un directorio de memoria
+    compartida (``/dev/shm``) que se publica con ``os.replace``: los lectores
+    ven la versión anterior o la nueva, nunca una escritura a medias. La
+    invalidación incrementa un contador de generación guardado en un fichero
+    de control mapeado en memoria, de modo que es O(1) y visible al instante
+    en todos los workers. Cada worker guarda además el último valor
+    deserializado de cada clave para no decodificar el JSON en cada lectura.
+    """
+
+    # Cabecera de cada entrada: generación, instante de escritura (epoch)
+    ENTRY_HEADER = struct.Struct("<Qd")
+    # Fichero de control: generación, última versión de cambios aplicada
+    CONTROL = struct.Struct("<QQ")
+
+    def __init__(self, directory: str, max_entries: int, ttl_seconds: float) -> None:
+        super().__init__()
+        self.directory = Path(directory)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        fd = os.open(self.directory / "control", os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(fd).st_size < self.CONTROL.size:
+            os.ftruncate(fd, self.CONTROL.size)
+        self._control_fd = fd
+        self._control = mmap.mmap(fd, self.CONTROL.size)
+        self._local: "OrderedDict[str, tuple[int, tuple[int, int], float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def generation(self) -> int:
+        return self.CONTROL.unpack_from(self._control, 0)[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self._path(key)
+        generation = self.generation
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns)
+
+        with self._lock:
+            cached = self._local.get(key)
+        if cached is not None and cached[0] == generation and cached[1] == stamp:
+            if time.time() - cached[2] > self.ttl_seconds:
+                return None
+            return cached[3]
+
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                entry_generation, written = self.ENTRY_HEADER.unpack_from(data, 0)
+                if entry_generation != generation or time.time() - written > self.ttl_seconds:
+                    return None
+                value = json.loads(data[self.ENTRY_HEADER.size:])
+        except (FileNotFoundError, ValueError):
+            return None
+
+        with self._lock:
+            self._local[key] = (generation, stamp, written, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+        return value
+
+    def set(self, key: str, value: Any, generation: Optional[int] = None) -> None:
+        current = self.generation
+        if generation is not None and generation != current:
+            return
+        payload = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        path = self._path(key)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(self.ENTRY_HEADER.pack(current, time.time()))
+            f.write(payload)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def invalidate(self, version: Optional[int] = None, local: bool = True) -> None:
+        with self._locked_control():
+            generation, applied_version = self.CONTROL.unpack_from(self._control, 0)
+            if version is not None:
+                if not local and version == applied_version:
+                    return
+                applied_version = version
+            self.CONTROL.pack_into(self._control, 0, generation + 1, applied_version)
+        with self._lock:
+            self._local.clear()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / (hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _evict(self) -> None:
+        """Elimina las entradas más antiguas si se supera `max_entries`"""
+        entries = list(self.directory.glob("*.json"))
+        if len(entries) <= self.max_entries:
+            return
+        entries.sort(key=lambda p: p.stat().st_mtime if p.exists() else 0)
+        for path in entries[:len(entries) - self.max_entries]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _locked_control(self):
+        return _FileLock(self._control_fd)
+
+class _FileLock:
+    """Bloqueo exclusivo entre procesos sobre un descriptor (no-op sin fcntl)"""
+
+    _thread_lock = threading.Lock()
+
+    def __init__(self, fd: int) -> None:
+        self.fd = fd
+
+    def __enter__(self) -> None:
+        self._thread_lock.acquire()
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc) -> None:
+        if fcntl is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+        self._thread_lock.release()
+
+def default_shared_dir(namespace: str) -> str:
+    base = Path("/dev/shm") if Path("/dev/shm").is_dir() else Path(tempfile.gettempdir())
+    database = settings.db_name if settings.db_backend == "mysql" else Path(settings.sqlite_path).stem
+    return str(base / f"{database}-{namespace}-cache")
+
+def build_cache(namespace: str) -> CacheBackend:
+    """Crea la caché configurada en `settings.cache_backend`"""
+    if settings.cache_backend == "none":
+        return NullCache()
+    if settings.cache_backend == "shared":
+        if settings.cache_shared_dir:
+            directory = str(Path(settings.cache_shared_dir) / namespace)
+        else:
+            directory = default_shared_dir(namespace)
+        return SharedMemoryCache(
+            directory,
+            max_entries=settings.cache_max_entries,
+            ttl_seconds=settings.cache_ttl_seconds,
+        )
+    return LRUCache(
+        max_entries=settings.cache_max_entries,
+        ttl_seconds=settings.cache_ttl_seconds,
+    )
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings
-from pydantic import Field
-from typing import Literal
+from pydantic import Field, model_validator
+from typing import Dict, Literal, Optional
 from pathlib import Path
 
 class Settings(BaseSettings):
@@ -8,21 +8,148 @@ class Settings(BaseSettings):
     app_name: str = Field(default="Restaurante API", env="APP_NAME")
     env: Literal["dev", "prod", "test"] = Field(default="dev", env="ENVIRONMENT")
     
-    # Configuración de base de datos
-    db_user: str = Field(env="DB_USER")
-    db_password: str = Field(env="DB_PASSWORD")
+    # Configuración de base de datos: MySQL o SQLite (un solo equipo, sin servidor)
+    db_backend: Literal["mysql", "sqlite"] = Field(default="mysql", env="DB_BACKEND")
+    # Credenciales de MySQL (obligatorias con DB_BACKEND=mysql)
+    db_user: Optional[str] = Field(default=None, env="DB_USER")
+    db_password: Optional[str] = Field(default=None, env="DB_PASSWORD")
     db_host: str = Field(default="127.0.0.1", env="DB_HOST")
     db_port: int = Field(default=3306, env="DB_PORT")
-    db_name: str = Field(env="DB_NAME")
+    db_name: Optional[str] = Field(default=None, env="DB_NAME")
     sql_echo: bool = Field(default=False, env="SQL_ECHO")
+    # SQLite: fichero de la base de datos y pragmas (siempre en modo WAL)
+    sqlite_path: str = Field(
+        default=str(Path(__file__).parent.parent.parent / "var" / "restaurante.db"),
+        env="SQLITE_PATH"
+    )
+    sqlite_synchronous: Literal["OFF", "NORMAL", "FULL"] = Field(default="NORMAL", env="SQLITE_SYNCHRONOUS")
+    sqlite_cache_mb: int = Field(default=64, ge=0, env="SQLITE_CACHE_MB")
+    sqlite_mmap_mb: int = Field(default=256, ge=0, env="SQLITE_MMAP_MB")
+    # Espera máxima por el cerrojo de escritura (entre hilos y entre procesos)
+    sqlite_busy_timeout_ms: int = Field(default=5000, ge=0, env="SQLITE_BUSY_TIMEOUT_MS")
     
     # Configuración JWT
     secret_key: str = Field(env="SECRET_KEY")
     algorithm: str = Field(default="HS256", env="JWT_ALGORITHM")
     access_token_expire_minutes: int = Field(default=30, env="ACCESS_TOKEN_EXPIRE_MINUTES")
+    # Cada cuánto se comprueba si otro worker ha modificado usuarios (0 = en cada petición)
+    auth_state_check_seconds: float = Field(default=1.0, ge=0, env="AUTH_STATE_CHECK_SECONDS")
+
+    # Eventos de actualización del menú (SSE)
+    menu_events_poll_seconds: float = Field(default=1.0, env="MENU_EVENTS_POLL_SECONDS")
+    menu_events_heartbeat_seconds: float = Field(default=15.0, env="MENU_EVENTS_HEARTBEAT_SECONDS")
+
+    # Archivado de registros eliminados lógicamente
+    archival_enabled: bool = Field(default=True, env="ARCHIVAL_ENABLED")
+    archival_retention_days: int = Field(default=90, env="ARCHIVAL_RETENTION_DAYS")
+    archival_batch_size: int = Field(default=500, env="ARCHIVAL_BATCH_SIZE")
+    archival_interval_minutes: int = Field(default=360, env="ARCHIVAL_INTERVAL_MINUTES")
+
+    # Caché de la capa de servicios
+    cache_backend: Literal["memory", "shared", "none"] = Field(default="memory", env="CACHE_BACKEND")
+    cache_max_entries: int = Field(default=256, env="CACHE_MAX_ENTRIES")
+    cache_ttl_seconds: float = Field(default=300.0, env="CACHE_TTL_SECONDS")
+    cache_shared_dir: Optional[str] = Field(default=None, env="CACHE_SHARED_DIR")
+    # Espera máxima por un cálculo idéntico en curso; después se calcula por separado
+    cache_flight_wait_seconds: float = Field(default=5.0, gt=0, env="CACHE_FLIGHT_WAIT_SECONDS")
+
+    # Caché de resultados de los repositorios (0 entradas = desactivada)
+    repository_cache_max_entries: int = Field(default=128, ge=0, env="REPOSITORY_CACHE_MAX_ENTRIES")
+    repository_cache_ttl_seconds: float = Field(default=300.0, env="REPOSITORY_CACHE_TTL_SECONDS")
+
+    # Agrupar platos y vinos en la base de datos (JSON_ARRAYAGG / json_group_array) en vez de en Python
+    sql_json_aggregation: bool = Field(default=False, env="SQL_JSON_AGGREGATION")
+
+    # Publicación del menú: las tablas son un borrador y la carta pública sale
+    # de la última publicación (POST /admin/menu/publicar)
+    menu_publication_enabled: bool = Field(default=False, env="MENU_PUBLICATION_ENABLED")
+
+    # Máximo de ids por petición en las consultas por lote
+    lote_max_ids: int = Field(default=100, ge=1, env="LOTE_MAX_IDS")
+
+    # Puntuación mínima (0-1) de la búsqueda aproximada de vinos
+    fuzzy_min_score: float = Field(default=0.3, ge=0, le=1, env="FUZZY_MIN_SCORE")
+
+    # Límite de concurrencia por grupo de rutas (public, admin, auth)
+    concurrency_limits_enabled: bool = Field(default=True, env="CONCURRENCY_LIMITS_ENABLED")
+    concurrency_adaptive: bool = Field(default=True, env="CONCURRENCY_ADAPTIVE")
+    concurrency_public_limit: int = Field(default=32, env="CONCURRENCY_PUBLIC_LIMIT")
+    concurrency_admin_limit: int = Field(default=8, env="CONCURRENCY_ADMIN_LIMIT")
+    concurrency_auth_limit: int = Field(default=4, env="CONCURRENCY_AUTH_LIMIT")
+    concurrency_queue_size: int = Field(default=64, env="CONCURRENCY_QUEUE_SIZE")
+    concurrency_queue_timeout_ms: int = Field(default=2000, env="CONCURRENCY_QUEUE_TIMEOUT_MS")
+    concurrency_latency_target_ms: float = Field(default=250.0, env="CONCURRENCY_LATENCY_TARGET_MS")
+
+    # Limitación de peticiones (cubos de tokens, formato "<n>/<second|minute|hour>")
+    rate_limit_enabled: bool = Field(default=True, env="RATE_LIMIT_ENABLED")
+    rate_limit_rules: Dict[str, str] = Field(
+        default={
+            "/api/v1/public": "120/minute",
+            "/api/v1/auth/token": "10/minute",
+        },
+        env="RATE_LIMIT_RULES"
+    )
+    rate_limit_login_username: str = Field(default="5/minute", env="RATE_LIMIT_LOGIN_USERNAME")
+    # Claves (IPs o usuarios) recordadas por límite; conviene que cubra las claves distintas
+    # de un periodo: al desbordarse, las claves nuevas empiezan sin ráfaga completa
+    rate_limit_max_keys: int = Field(default=100_000, env="RATE_LIMIT_MAX_KEYS")
+
+    # Exportación estática del menú público
+    snapshot_dir: str = Field(
+        default=str(Path(__file__).parent.parent.parent / "var" / "snapshots"),
+        env="SNAPSHOT_DIR"
+    )
+
+    # Perfilado bajo demanda (cabecera X-Profile con token de administrador)
+    profiling_enabled: bool = Field(default=True, env="PROFILING_ENABLED")
+    profile_dir: str = Field(
+        default=str(Path(__file__).parent.parent.parent / "var" / "profiles"),
+        env="PROFILE_DIR"
+    )
+    profile_sample_interval_ms: float = Field(default=1.0, env="PROFILE_SAMPLE_INTERVAL_MS")
+    profile_max_artifacts: int = Field(default=20, env="PROFILE_MAX_ARTIFACTS")
+
+    # Trazas por capas (muestreo por petición, exportación a fichero OTLP/JSON)
+    tracing_enabled: bool = Field(default=True, env="TRACING_ENABLED")
+    tracing_sample_ratio: float = Field(default=0.01, ge=0.0, le=1.0, env="TRACING_SAMPLE_RATIO")
+    tracing_export_path: str = Field(
+        default=str(Path(__file__).parent.parent.parent / "var" / "traces" / "spans.jsonl"),
+        env="TRACING_EXPORT_PATH"
+    )
+    tracing_max_queue: int = Field(default=1000, env="TRACING_MAX_QUEUE")
+    tracing_max_file_mb: int = Field(default=100, env="TRACING_MAX_FILE_MB")
+
+    # Filas por lote al leer con cursor de servidor (respuestas en streaming)
+    stream_batch_size: int = Field(default=500, ge=1, env="STREAM_BATCH_SIZE")
+    export_batch_size: int = Field(default=1000, ge=1, env="EXPORT_BATCH_SIZE")
+    # Filas por transacción en la importación de CSV
+    import_batch_size: int = Field(default=500, ge=1, env="IMPORT_BATCH_SIZE")
+
+    # Calentamiento del worker antes de /health/ready (conexiones por defecto: tamaño del pool)
+    warmup_enabled: bool = Field(default=True, env="WARMUP_ENABLED")
+    warmup_pool_connections: Optional[int] = Field(default=None, ge=1, env="WARMUP_POOL_CONNECTIONS")
+    warmup_retry_seconds: float = Field(default=5.0, env="WARMUP_RETRY_SECONDS")
+
+    # Arranque multiproceso con precarga (python -m src.launcher)
+    launcher_host: str = Field(default="0.0.0.0", env="LAUNCHER_HOST")
+    launcher_port: int = Field(default=8000, env="LAUNCHER_PORT")
+    launcher_workers: int = Field(default=2, ge=1, env="LAUNCHER_WORKERS")
+
+    # Maridaje plato-vino
+    pairing_top_k: int = Field(default=5, ge=1, env="PAIRING_TOP_K")
+
+    @model_validator(mode="after")
+    def _check_mysql_credentials(self) -> "Settings":
+        if self.db_backend == "mysql":
+            missing = [name.upper() for name in ("db_user", "db_password", "db_name") if getattr(self, name) is None]
+            if missing:
+                raise ValueError(f"Faltan {', '.join(missing)} (obligatorias con DB_BACKEND=mysql)")
+        return self
 
     @property
     def sync_dsn(self) -> str:
+        if self.db_backend == "sqlite":
+            return f"sqlite:///{self.sqlite_path}"
         return (f"mysql+pymysql://{self.db_user}:{self.db_password}"
                 f"@{self.db_host}:{self.db_port}/{self.db_name}?charset=utf8mb4")
 
@@ -0,0 +1,99 @@
+"""
+Coalescencia de cálculos idénticos concurrentes (single-flight)
+"""
+import copy
+import threading
+from typing import Any, Callable, Dict, Optional
+
+class _Call:
+    """Cálculo en curso compartido por todas las llamadas con la misma clave"""
+
+    __slots__ = ("done", "result", "error", "aborted")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[Exception] = None
+        self.aborted = False
+
+class SingleFlight:
+    """
+    Agrupa las llamadas concurrentes con la misma clave: la primera (líder)
+    ejecuta la función y las demás esperan y reciben su resultado o su
+    excepción. La clave se libera antes de despertar a los que esperan, así
+    que una llamada posterior vuelve a calcular en lugar de heredar un error.
+
+    Si el líder se interrumpe sin una excepción normal (cancelación, salida
+    del proceso), los que esperaban no heredan la interrupción: uno de ellos
+    pasa a ser el nuevo líder. Con `wait_timeout`, quien lleva esperando ese
+    tiempo a un líder bloqueado deja de esperar y calcula por su cuenta.
+    """
+
+    def __init__(self, wait_timeout: Optional[float] = None) -> None:
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.leaders = 0
+        self.coalesced = 0
+        self.timeouts = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+                    self.leaders += 1
+                else:
+                    self.coalesced += 1
+
+            if leader:
+                return self._run(key, call, fn)
+
+            if not call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.timeouts += 1
+                return fn()
+            if call.aborted:
+                continue
+            if call.error is not None:
+                _reraise(call.error)
+            return call.result
+
+    def _run(self, key: str, call: _Call, fn: Callable[[], Any]) -> Any:
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            call.aborted = True
+            raise
+        finally:
+            with self._lock:
+                if self._calls.get(key) is call:
+                    del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "timeouts": self.timeouts,
+            "in_flight": in_flight,
+        }
+
+def _reraise(error: Exception) -> None:
+    """
+    Lanza en el hilo que esperaba una copia del error del líder: lanzar el
+    mismo objeto desde varios hilos a la vez mezclaría sus tracebacks
+    """
+    try:
+        clone = copy.copy(error)
+    except Exception:
+        raise RuntimeError(f"Error en el cálculo compartido: {error!r}") from error
+    raise clone.with_traceback(None) from error
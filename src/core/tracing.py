@@ -0,0 +1,272 @@
+"""
+Trazas ligeras por capas (ruta, servicio, repositorio, SQL)
+
+Cada petición muestreada abre una traza raíz; ``span()`` crea hijos en el
+contexto actual (``contextvars``, que Starlette copia al threadpool) y, si la
+petición no está muestreada, devuelve un span vacío sin coste apreciable.
+Al cerrar la raíz, la traza completa se pasa a un hilo que la escribe como
+una línea JSON con el formato OTLP/JSON de OpenTelemetry
+(``{"resourceSpans": [...]}``), apta para ``otel-cli`` o el receptor
+``otlpjsonfile`` del OpenTelemetry Collector.
+"""
+import functools
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Valores de `kind` de OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+# Valores de `status.code` de OTLP
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+class Span:
+    """Span activo o terminado de una traza muestreada"""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "kind", "start_ns", "end_ns", "attributes", "status", "_token")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], kind: int, attributes: Dict[str, Any]) -> None:
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        self.attributes = attributes
+        self.status = STATUS_OK
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.attributes["exception.type"] = type(error).__name__
+        self.attributes["exception.message"] = str(error)[:500]
+
+    def end(self, end_ns: Optional[int] = None) -> None:
+        self.end_ns = end_ns or time.time_ns()
+        self.trace.spans.append(self)
+        if self.parent_id is None:
+            span_exporter.export(self.trace)
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc is not None:
+            self.set_error(exc)
+        _current_span.reset(self._token)
+        self.end()
+
+class _NoopSpan:
+    """Span de las peticiones no muestreadas: no registra nada"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_error(self, error: BaseException) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+class Trace:
+    """Spans terminados de una misma petición"""
+
+    __slots__ = ("trace_id", "spans")
+
+    def __init__(self) -> None:
+        self.trace_id = os.urandom(16).hex()
+        # list.append es atómico: los spans pueden terminar en cualquier hilo
+        self.spans: List[Span] = []
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+def start_trace(name: str, kind: int = SPAN_KIND_SERVER, **attributes: Any):
+    """Abre la traza raíz si la petición sale muestreada"""
+    if not settings.tracing_enabled or random.random() >= settings.tracing_sample_ratio:
+        return NOOP_SPAN
+    return Span(Trace(), name, None, kind, attributes)
+
+def span(name: str, kind: int = SPAN_KIND_INTERNAL, **attributes: Any):
+    """Span hijo del actual; vacío si no hay traza en curso"""
+    parent = _current_span.get()
+    if parent is None:
+        return NOOP_SPAN
+    return Span(parent.trace, name, parent.span_id, kind, attributes)
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, (list, tuple)):
+        return {"arrayValue": {"values": [_otlp_value(v) for v in value]}}
+    return {"stringValue": str(value)}
+
+def _otlp_span(trace: Trace, item: Span) -> Dict[str, Any]:
+    data = {
+        "traceId": trace.trace_id,
+        "spanId": item.span_id,
+        "name": item.name,
+        "kind": item.kind,
+        "startTimeUnixNano": str(item.start_ns),
+        "endTimeUnixNano": str(item.end_ns),
+        "attributes": [
+            {"key": key, "value": _otlp_value(value)}
+            for key, value in item.attributes.items() if value is not None
+        ],
+        "status": {"code": item.status},
+    }
+    if item.parent_id is not None:
+        data["parentSpanId"] = item.parent_id
+    return data
+
+class FileSpanExporter:
+    """
+    Escribe las trazas terminadas en un fichero JSON lines desde un hilo
+    propio. La cola está acotada: si el disco no da abasto se descartan
+    trazas en lugar de frenar las peticiones
+    """
+
+    def __init__(self, path: str, max_queue: int, max_bytes: int) -> None:
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.exported = 0
+        self.dropped = 0
+        self._queue: "queue.Queue[Optional[Trace]]" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def shutdown(self, timeout: float = 5.0) -> None:
+        """Vacía la cola y detiene el hilo"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"exported": self.exported, "dropped": self.dropped, "pending": self._queue.qsize()}
+
+    def _start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        resource = {"attributes": [{"key": "service.name", "value": {"stringValue": settings.app_name}}]}
+        scope = {"name": __name__}
+        while True:
+            trace = self._queue.get()
+            if trace is None:
+                return
+            batch = [trace]
+            # Agrupar lo que ya esté en cola en una sola escritura
+            while len(batch) < 100:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._queue.put(None)
+                    break
+                batch.append(item)
+            lines = [
+                json.dumps({"resourceSpans": [{
+                    "resource": resource,
+                    "scopeSpans": [{"scope": scope, "spans": [_otlp_span(t, s) for s in t.spans]}],
+                }]}, ensure_ascii=False)
+                for t in batch
+            ]
+            try:
+                self._write(lines)
+                self.exported += len(batch)
+            except OSError as e:
+                self.dropped += len(batch)
+                logger.warning("No se pudieron escribir las trazas en %s: %s", self.path, e)
+
+    def _write(self, lines: List[str]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+            # Rotación simple: se conserva un único fichero anterior
+            os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+span_exporter = FileSpanExporter(
+    settings.tracing_export_path,
+    max_queue=settings.tracing_max_queue,
+    max_bytes=settings.tracing_max_file_mb * 1024 * 1024,
+)
+
+def traced(name: Optional[str] = None):
+    """
+    Decorador que envuelve la función en un span con sus argumentos como
+    atributos (``arg.<nombre>``, o ``arg.<nombre>.size`` para colecciones) y
+    el tamaño del resultado si es una colección
+    """
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            attributes = {}
+            for key, value in bound.arguments.items():
+                if key in ("self", "db"):
+                    continue
+                if isinstance(value, (str, int, float, bool)):
+                    attributes[f"arg.{key}"] = value
+                elif isinstance(value, (list, tuple, dict)):
+                    attributes[f"arg.{key}.size"] = len(value)
+            with span(span_name, **attributes) as current:
+                result = fn(*args, **kwargs)
+                if isinstance(result, (list, tuple, dict)):
+                    current.set_attribute("result.size", len(result))
+                return result
+
+        return wrapper
+    return decorator
@@ -1,14 +1,19 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 from src.core.config import settings
+from src.database.sqlite_backend import create_sqlite_engine
 
-engine = create_engine(
-    settings.sync_dsn, 
-    echo=settings.sql_echo,
-    pool_pre_ping=True, 
-    pool_recycle=3600, 
-    future=True
-)
+if settings.db_backend == "sqlite":
+    engine = create_sqlite_engine(settings.sqlite_path, echo=settings.sql_echo, future=True)
+else:
+    engine = create_engine(
+        settings.sync_dsn, 
+        echo=settings.sql_echo,
+        pool_pre_ping=True, 
+        pool_recycle=3600, 
+        future=True
+    )
 
 class Base(DeclarativeBase): 
     pass
@@ -33,18 +38,61 @@ def init_db() -> None:
         denominacion_origen,
         enologo,
         uva,
-        user
+        user,
+        version_cambios,
+        plato_archivado,
+        vino_archivado,
+        publicacion_menu
     )
     
     # Create all tables
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns()
+    with SessionLocal() as db:
+        read_model.backfill(db)
+    
+    # Registrar la fila de versión de cada ámbito de cambios
+    change_tracking.ensure_version_rows(engine)
     
     print("✅ Tablas de la base de datos creadas correctamente")
 
+def _add_missing_columns() -> None:
+    """
+    Añade a las tablas existentes las columnas nuevas de los modelos, ya que
+    create_all no modifica tablas ya creadas. Solo columnas que admitan NULL
+    o tengan valor por defecto en el servidor
+    """
+    inspector = inspect(engine)
+    tables = set(inspector.get_table_names())
+    preparer = engine.dialect.identifier_preparer
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if table.name not in tables:
+                continue
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                if not column.nullable and column.server_default is None:
+                    print(f"⚠️  Falta la columna {table.name}.{column.name} y no se puede añadir automáticamente")
+                    continue
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {ddl}"))
+                print(f"✅ Columna {table.name}.{column.name} añadida")
+
 def get_db():
     """Dependency to get database session"""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Listeners de sesión para el seguimiento de cambios confirmados
+from src.database import change_tracking  # noqa: E402
+
+# Spans de SQL para las trazas muestreadas
+from src.database import sql_tracing  # noqa: E402
+
+# Columnas desnormalizadas de platos y vinos (modelo de lectura)
+from src.database import read_model  # noqa: E402
@@ -0,0 +1,190 @@
+"""
+Seguimiento de cambios confirmados sobre las tablas de la aplicación.
+
+Los listeners de sesión anotan en cada flush qué tablas (e ids) se han
+modificado, incrementan la versión del ámbito afectado dentro de la misma
+transacción (tabla ``versiones_cambios``) y, tras el commit, notifican a los
+suscriptores registrados con ``register_commit_listener``.
+"""
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from sqlalchemy import event, inspect as sa_inspect, insert, select, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import func
+
+from src.entities.version_cambios import VersionCambios
+
+logger = logging.getLogger(__name__)
+
+MENU_SCOPE = "menu"
+
+# Tablas cuyo cambio altera lo que ve el público en la carta
+MENU_TABLES: FrozenSet[str] = frozenset({
+    "platos",
+    "vinos",
+    "categoria_platos",
+    "categoria_vinos",
+    "alergenos",
+    "bodegas",
+    "denominaciones_origen",
+    "enologos",
+    "uvas",
+    "platos_alergenos",
+    "vinos_uvas",
+})
+
+USERS_SCOPE = "usuarios"
+
+# Publicaciones del menú: con MENU_PUBLICATION_ENABLED la carta pública solo cambia al publicar
+PUBLICATION_SCOPE = "publicacion"
+
+SCOPES: Dict[str, FrozenSet[str]] = {
+    MENU_SCOPE: MENU_TABLES,
+    USERS_SCOPE: frozenset({"users"}),
+    PUBLICATION_SCOPE: frozenset({"publicaciones_menu"}),
+}
+
+_PENDING_KEY = "_cambios_pendientes"
+_VERSIONS_KEY = "_versiones_cambios"
+
+@dataclass(frozen=True)
+class CommittedChanges:
+    """Cambios confirmados en un ámbito, tal y como se notifican a los listeners"""
+    scope: str
+    version: Optional[int]
+    tables: FrozenSet[str]
+    entities: Dict[str, FrozenSet[int]] = field(default_factory=dict)
+    local: bool = True
+
+CommitListener = Callable[[CommittedChanges], None]
+
+_listeners: List[CommitListener] = []
+
+def register_commit_listener(listener: CommitListener) -> CommitListener:
+    """
+    Registra un listener de cambios confirmados (usable como decorador).
+    Se invoca en el hilo que hizo commit: debe ser rápido y thread-safe.
+    """
+    _listeners.append(listener)
+    return listener
+
+def dispatch(changes: CommittedChanges) -> None:
+    """Notifica unos cambios confirmados a todos los listeners"""
+    for listener in list(_listeners):
+        try:
+            listener(changes)
+        except Exception:
+            logger.exception("Error en listener de cambios %r", listener)
+
+def mark_changed(session: Session, table: str, ids: Iterable[int] = ()) -> None:
+    """
+    Anota cambios hechos con DML de Core (no visibles en el flush del ORM)
+    y actualiza la versión de su ámbito en la transacción en curso
+    """
+    _record(session, {table: set(ids)})
+
+def ensure_version_rows(bind) -> None:
+    """Crea la fila de versión de cada ámbito si todavía no existe"""
+    table = VersionCambios.__table__
+    with bind.begin() as conn:
+        existing = set(conn.execute(select(table.c.ambito)).scalars())
+        for scope in SCOPES:
+            if scope not in existing:
+                conn.execute(insert(table).values(ambito=scope, version=0))
+
+def read_version(session: Session, scope: str = MENU_SCOPE) -> Optional[tuple]:
+    """Devuelve ``(version, tablas)`` del ámbito, o None si no hay fila"""
+    table = VersionCambios.__table__
+    row = session.execute(
+        select(table.c.version, table.c.tablas).where(table.c.ambito == scope)
+    ).first()
+    return tuple(row) if row else None
+
+def _scope_of(table: str) -> Optional[str]:
+    for scope, tables in SCOPES.items():
+        if table in tables:
+            return scope
+    return None
+
+def _bump_version(session: Session, scope: str, tables: Iterable[str]) -> Optional[int]:
+    """Incrementa la versión del ámbito dentro de la transacción de la sesión"""
+    table = VersionCambios.__table__
+    tablas = ",".join(sorted(tables))[:500]
+    conn = session.connection()
+    try:
+        result = conn.execute(
+            update(table)
+            .where(table.c.ambito == scope)
+            .values(version=table.c.version + 1, tablas=tablas, updated_at=func.now())
+        )
+        if result.rowcount == 0:
+            conn.execute(insert(table).values(ambito=scope, version=1, tablas=tablas))
+        return conn.execute(
+            select(table.c.version).where(table.c.ambito == scope)
+        ).scalar_one()
+    except SQLAlchemyError as e:
+        # Sin tabla de versiones (BD sin inicializar) no se coordina entre workers
+        logger.warning("No se pudo actualizar la versión de '%s': %s", scope, e)
+        return None
+
+def _record(session: Session, changes: Dict[str, Set[int]]) -> None:
+    pending: Dict[str, Set[int]] = session.info.setdefault(_PENDING_KEY, {})
+    touched: Dict[str, Set[str]] = {}
+    for table, ids in changes.items():
+        pending.setdefault(table, set()).update(ids)
+        scope = _scope_of(table)
+        if scope is not None:
+            touched.setdefault(scope, set()).add(table)
+
+    versions: Dict[str, Optional[int]] = session.info.setdefault(_VERSIONS_KEY, {})
+    for scope, tables in touched.items():
+        versions[scope] = _bump_version(session, scope, tables)
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session: Session, flush_context) -> None:
+    changes: Dict[str, Set[int]] = {}
+    dirty = [obj for obj in session.dirty if session.is_modified(obj)]
+    for obj in (*session.new, *dirty, *session.deleted):
+        table = sa_inspect(obj).mapper.local_table.name
+        ids = changes.setdefault(table, set())
+        obj_id = getattr(obj, "id", None)
+        if isinstance(obj_id, int):
+            ids.add(obj_id)
+    if changes:
+        _record(session, changes)
+
+@event.listens_for(Session, "do_orm_execute")
+def _on_bulk_dml(orm_execute_state) -> None:
+    # UPDATE/DELETE masivos del ORM (query(...).update(), update(Modelo)): no
+    # pasan por el flush y no se sabe qué ids tocan
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None:
+        _record(orm_execute_state.session, {mapper.local_table.name: set()})
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session: Session) -> None:
+    pending = session.info.pop(_PENDING_KEY, None)
+    versions = session.info.pop(_VERSIONS_KEY, {})
+    if not pending:
+        return
+    for scope, scope_tables in SCOPES.items():
+        tables = frozenset(t for t in pending if t in scope_tables)
+        if tables:
+            dispatch(CommittedChanges(
+                scope=scope,
+                version=versions.get(scope),
+                tables=tables,
+                entities={t: frozenset(pending[t]) for t in tables},
+            ))
+
+@event.listens_for(Session, "after_transaction_end")
+def _after_transaction_end(session: Session, transaction) -> None:
+    # Rollback o cierre sin commit: se descartan los cambios anotados
+    if transaction.parent is None:
+        session.info.pop(_PENDING_KEY, None)
+        session.info.pop(_VERSIONS_KEY, None)
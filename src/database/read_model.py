@@ -0,0 +1,175 @@
+"""
+Modelo de lectura desnormalizado de platos y vinos
+
+Cada plato guarda el nombre de su categoría y la lista de nombres de sus
+alérgenos, y cada vino los de su tipo, denominación, bodega, enólogo y uvas,
+para que la carta pública se sirva leyendo una sola tabla.
+
+Las columnas se recalculan antes de cada flush a partir de las relaciones en
+memoria cuando cambia un plato o vino (alta, claves ajenas o colecciones) o
+el nombre de un elemento relacionado (categoría, alérgeno, bodega...). Los
+cambios que no pasan por el ORM (DML de Core sobre las tablas intermedias)
+deben llamar a ``refresh``. ``backfill`` rellena las filas que aún no las
+tienen, p. ej. tras añadir las columnas a una base de datos existente.
+"""
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Set, Tuple, Type
+
+from sqlalchemy import event, inspect as sa_inspect, select
+from sqlalchemy.orm import Session, selectinload
+
+from src.entities.alergeno import Alergeno
+from src.entities.bodega import Bodega
+from src.entities.categoria_plato import CategoriaPlato
+from src.entities.categoria_vino import CategoriaVino
+from src.entities.denominacion_origen import DenominacionOrigen
+from src.entities.enologo import Enologo
+from src.entities.plato import Plato
+from src.entities.uva import Uva
+from src.entities.vino import Vino
+
+logger = logging.getLogger(__name__)
+
+@dataclass(frozen=True)
+class ReadModelField:
+    """Columna desnormalizada: nombre(s) de los elementos de una relación"""
+    column: str
+    relationship: str
+    many: bool = False
+
+READ_MODEL_FIELDS: Dict[Type, Tuple[ReadModelField, ...]] = {
+    Plato: (
+        ReadModelField("categoria_nombre", "categoria"),
+        ReadModelField("alergenos_nombres", "alergenos", many=True),
+    ),
+    Vino: (
+        ReadModelField("categoria_nombre", "categoria"),
+        ReadModelField("denominacion_nombre", "denominacion_origen"),
+        ReadModelField("bodega_nombre", "bodega"),
+        ReadModelField("enologo_nombre", "enologo"),
+        ReadModelField("uvas_nombres", "uvas", many=True),
+    ),
+}
+
+# Elementos relacionados cuyo nombre se copia: relación inversa hacia los dependientes
+_LOOKUPS: Dict[Type, str] = {
+    CategoriaPlato: "platos",
+    Alergeno: "platos",
+    CategoriaVino: "vinos",
+    DenominacionOrigen: "vinos",
+    Bodega: "vinos",
+    Enologo: "vinos",
+    Uva: "vinos",
+}
+
+# Marca de fila sin calcular: las listas valen [] como mínimo
+_MARKER_COLUMNS = {Plato: "alergenos_nombres", Vino: "uvas_nombres"}
+
+def refresh(session: Session, obj: Any) -> None:
+    """
+    Recalcula las columnas de un plato o vino cuyas relaciones se han
+    modificado fuera del ORM, volviendo a cargar las colecciones
+    """
+    fields = READ_MODEL_FIELDS[type(obj)]
+    session.expire(obj, [field.relationship for field in fields if field.many])
+    with session.no_autoflush:
+        _apply(session, obj, fields)
+
+def backfill(session: Session, batch_size: int = 500) -> int:
+    """Calcula las columnas de las filas que no las tienen; devuelve cuántas"""
+    total = 0
+    for model, fields in READ_MODEL_FIELDS.items():
+        marker = getattr(model, _MARKER_COLUMNS[model])
+        while True:
+            objs = list(session.scalars(
+                select(model)
+                .options(*(selectinload(getattr(model, field.relationship)) for field in fields))
+                .where(marker.is_(None))
+                .order_by(model.id)
+                .limit(batch_size)
+            ))
+            if not objs:
+                break
+            for obj in objs:
+                _apply(session, obj, fields)
+            session.commit()
+            total += len(objs)
+    if total:
+        logger.info("Modelo de lectura calculado para %d filas", total)
+    return total
+
+def _apply(session: Session, obj: Any, fields: Iterable[ReadModelField]) -> None:
+    for field in fields:
+        if field.many:
+            # En orden de id, como salían de la tabla intermedia (los nuevos al final)
+            targets = sorted(
+                (target for target in getattr(obj, field.relationship) if target not in session.deleted),
+                key=lambda target: (target.id is None, target.id or 0),
+            )
+            value: Any = [target.nombre for target in targets]
+        else:
+            target = _related(session, obj, field.relationship)
+            value = target.nombre if target is not None else None
+        if getattr(obj, field.column) != value:
+            setattr(obj, field.column, value)
+
+def _related(session: Session, obj: Any, name: str) -> Any:
+    """
+    Elemento de una relación many-to-one. Si se cambió la clave ajena sin
+    asignar la relación, la relación cargada sigue apuntando al anterior
+    """
+    state = sa_inspect(obj)
+    relationship = state.mapper.relationships[name]
+    foreign_key = state.mapper.get_property_by_column(next(iter(relationship.local_columns))).key
+    if state.attrs[foreign_key].history.has_changes() and not state.attrs[name].history.has_changes():
+        target_id = getattr(obj, foreign_key)
+        return session.get(relationship.mapper.class_, target_id) if target_id is not None else None
+    return getattr(obj, name)
+
+def _needs_refresh(obj: Any, fields: Iterable[ReadModelField]) -> bool:
+    state = sa_inspect(obj)
+    for field in fields:
+        names = [field.relationship]
+        if not field.many:
+            relationship = state.mapper.relationships[field.relationship]
+            names.extend(state.mapper.get_property_by_column(column).key for column in relationship.local_columns)
+        if any(state.attrs[name].history.has_changes() for name in names):
+            return True
+    return False
+
+@event.listens_for(Session, "before_flush")
+def _before_flush(session: Session, flush_context, instances) -> None:
+    pending: List[Any] = []
+    seen: Set[int] = set()
+
+    def add(obj: Any) -> None:
+        if id(obj) not in seen and obj not in session.deleted:
+            seen.add(id(obj))
+            pending.append(obj)
+
+    with session.no_autoflush:
+        for obj in session.new:
+            if type(obj) in READ_MODEL_FIELDS:
+                add(obj)
+        for obj in (*session.dirty, *session.deleted):
+            fields = READ_MODEL_FIELDS.get(type(obj))
+            if fields is not None:
+                if obj in session.dirty and _needs_refresh(obj, fields):
+                    add(obj)
+                continue
+            backref = _LOOKUPS.get(type(obj))
+            if backref is None:
+                continue
+            state = sa_inspect(obj)
+            if obj in session.deleted or state.attrs["nombre"].history.has_changes():
+                for dependent in getattr(obj, backref):
+                    add(dependent)
+            else:
+                # Asociaciones cambiadas desde el otro lado (alergeno.platos.append(plato))
+                history = state.attrs[backref].history
+                for dependent in (*history.added, *history.deleted):
+                    add(dependent)
+
+        for obj in pending:
+            _apply(session, obj, READ_MODEL_FIELDS[type(obj)])
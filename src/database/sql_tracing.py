@@ -0,0 +1,44 @@
+"""
+Spans de SQL a partir de los eventos del engine
+"""
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from src.core.tracing import SPAN_KIND_CLIENT, current_span, span
+
+# Límite de longitud de la sentencia guardada en el span
+MAX_STATEMENT_LENGTH = 1000
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is None or current_span() is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    current = span(
+        f"SQL {operation}",
+        kind=SPAN_KIND_CLIENT,
+        **{
+            "db.system": conn.dialect.name,
+            "db.operation": operation,
+            "db.statement": statement[:MAX_STATEMENT_LENGTH],
+            "db.executemany": executemany,
+        }
+    )
+    context._trace_span = current
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    current = getattr(context, "_trace_span", None)
+    if current is not None:
+        if cursor.rowcount is not None and cursor.rowcount >= 0:
+            current.set_attribute("db.rowcount", cursor.rowcount)
+        current.end()
+        context._trace_span = None
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    context = exception_context.execution_context
+    current = getattr(context, "_trace_span", None)
+    if current is not None:
+        current.set_error(exception_context.original_exception)
+        current.end()
+        context._trace_span = None
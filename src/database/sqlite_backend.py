@@ -0,0 +1,94 @@
+"""
+SQLite como base de datos embebida (un solo equipo, sin servidor)
+
+En modo WAL los lectores no bloquean al escritor ni al revés, pero solo
+puede escribir una conexión a la vez. pysqlite abre la transacción justo
+antes de la primera sentencia de escritura (las lecturas anteriores van en
+autocommit), así que una transacción nunca escribe sobre una instantánea de
+lectura antigua, que SQLite rechazaría sin esperar.
+
+Dentro de un proceso los escritores hacen cola en un cerrojo de Python en
+vez de reintentar en el manejador de ocupado de SQLite; entre procesos (varios
+workers) se espera hasta ``busy_timeout``. El pool mantiene varias
+conexiones abiertas para las lecturas concurrentes.
+"""
+import logging
+import threading
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_WRITE_OPERATIONS = ("INSERT", "UPDATE", "DELETE", "REPLACE", "CREATE", "DROP", "ALTER")
+# Clave en el `info` de la conexión del pool mientras tiene el cerrojo
+_HOLDS_WRITER_KEY = "sqlite_writer"
+
+class WriterLock:
+    """Un escritor a la vez por proceso: desde la primera escritura hasta el commit o rollback"""
+
+    def __init__(self, timeout: float) -> None:
+        self.timeout = timeout
+        self._lock = threading.Lock()
+
+    def install(self, engine: Engine) -> None:
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "commit", self._release_connection)
+        event.listen(engine, "rollback", self._release_connection)
+        # Conexiones devueltas al pool sin commit ni rollback explícito
+        event.listen(engine.pool, "checkin", self._release_record)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if conn.info.get(_HOLDS_WRITER_KEY) or not _is_write(statement):
+            return
+        if self._lock.acquire(timeout=self.timeout):
+            conn.info[_HOLDS_WRITER_KEY] = True
+        else:
+            # Otra sesión del mismo hilo con escrituras pendientes, o una transacción muy larga:
+            # se deja a SQLite decidir (busy_timeout)
+            logger.warning("Sin cerrojo de escritura de SQLite tras %.1f s", self.timeout)
+
+    def _release_connection(self, conn) -> None:
+        self._release(conn.info)
+
+    def _release_record(self, dbapi_connection, connection_record) -> None:
+        self._release(connection_record.info)
+
+    def _release(self, info: dict) -> None:
+        if info.pop(_HOLDS_WRITER_KEY, False):
+            self._lock.release()
+
+def _is_write(statement: str) -> bool:
+    words = statement.lstrip().split(None, 1)
+    return bool(words) and words[0].upper() in _WRITE_OPERATIONS
+
+def _apply_pragmas(dbapi_connection, connection_record) -> None:
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+        # Valor negativo: tamaño en KiB en vez de en páginas
+        cursor.execute(f"PRAGMA cache_size=-{settings.sqlite_cache_mb * 1024}")
+        cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_mb * 1024 * 1024}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        # Como en InnoDB, las claves foráneas se comprueban
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+def create_sqlite_engine(path: str, **kwargs: Any) -> Engine:
+    """Engine de SQLite con WAL, los pragmas de la configuración y el cerrojo de escritura"""
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"timeout": settings.sqlite_busy_timeout_ms / 1000, "check_same_thread": False},
+        **kwargs
+    )
+    event.listen(engine, "connect", _apply_pragmas)
+    WriterLock(settings.sqlite_busy_timeout_ms / 1000).install(engine)
+    return engine
@@ -4,7 +4,7 @@ Platos del restaurante con relaciones many-to-many con alérgenos
 from __future__ import annotations
 from decimal import Decimal
 from typing import Optional, List
-from sqlalchemy import String, Text, Numeric, ForeignKey, Table, Column, Boolean
+from sqlalchemy import JSON, String, Text, Numeric, ForeignKey, Table, Column, Boolean
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.database import Base
 from src.entities.mixins import AuditMixin
@@ -31,6 +31,11 @@ class Plato(Base, AuditMixin):
         index=True
     )
 
+    # Modelo de lectura: nombres copiados de las relaciones para servir la
+    # carta leyendo solo esta tabla (los mantiene src.database.read_model)
+    categoria_nombre: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    alergenos_nombres: Mapped[Optional[List[str]]] = mapped_column(JSON(none_as_null=True), nullable=True)
+
     # Relationships
     categoria: Mapped["CategoriaPlato"] = relationship(
         "CategoriaPlato", 
@@ -0,0 +1,41 @@
+"""
+Platos eliminados lógicamente y archivados fuera de la tabla principal
+"""
+from __future__ import annotations
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import String, Text, Numeric, ForeignKey, Table, Column, Boolean, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from src.database import Base
+from src.entities.mixins import AuditMixin
+
+# Copia archivada de la relación platos <-> alérgenos
+platos_alergenos_archivo = Table(
+    "platos_alergenos_archivo",
+    Base.metadata,
+    Column("plato_id", ForeignKey("platos_archivo.id"), primary_key=True),
+    Column("alergeno_id", ForeignKey("alergenos.id"), primary_key=True),
+)
+
+class PlatoArchivado(Base, AuditMixin):
+    __tablename__ = "platos_archivo"
+
+    # Conserva el id original para poder restaurar el plato
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    nombre: Mapped[str] = mapped_column(String(100), index=True)
+    precio: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    precio_unidad: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    descripcion: Mapped[Optional[str]] = mapped_column(Text)
+    sugerencias: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    categoria_id: Mapped[int] = mapped_column(
+        ForeignKey("categoria_platos.id"),
+        index=True
+    )
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=func.now(),
+        nullable=False,
+        comment="Fecha y hora de archivado"
+    )
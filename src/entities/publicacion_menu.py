@@ -0,0 +1,35 @@
+"""
+Publicaciones del menú: versiones inmutables de la carta pública
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Text, Integer, DateTime
+from sqlalchemy.dialects.mysql import LONGTEXT
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from src.database import Base
+
+# TEXT de MySQL se queda en 64 KB
+_Document = Text().with_variant(LONGTEXT(), "mysql")
+
+class PublicacionMenu(Base):
+    __tablename__ = "publicaciones_menu"
+
+    # Versión publicada (creciente); nunca se modifica una fila existente
+    id: Mapped[int] = mapped_column(primary_key=True)
+    autor: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    nota: Mapped[Optional[str]] = mapped_column(String(200), nullable=True)
+    platos_total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    vinos_total: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    catalogo: Mapped[str] = mapped_column(
+        _Document,
+        nullable=False,
+        comment="Registros públicos de platos y vinos (JSON) con los que se construye el catálogo"
+    )
+    platos_json: Mapped[str] = mapped_column(_Document, nullable=False, comment="Cuerpo de /public/platos")
+    vinos_json: Mapped[str] = mapped_column(_Document, nullable=False, comment="Cuerpo de /public/vinos")
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=func.now(),
+        nullable=False
+    )
@@ -2,14 +2,17 @@
 Modelo de usuario para autenticación
 """
 from typing import TYPE_CHECKING
-from sqlalchemy import String, Boolean
-from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy import String, Boolean, Integer, event
+from sqlalchemy.orm import Mapped, mapped_column, attributes
 from src.database import Base
 from src.entities.mixins import AuditMixin
 
 if TYPE_CHECKING:
     pass
 
+# Campos cuyo cambio invalida los tokens ya emitidos
+TOKEN_FIELDS = ("username", "hashed_password", "is_active", "is_admin")
+
 class User(Base, AuditMixin):
     __tablename__ = "users"
 
@@ -18,3 +21,17 @@ class User(Base, AuditMixin):
     email: Mapped[str] = mapped_column(String(100), unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String(255))
     is_admin: Mapped[bool] = mapped_column(Boolean, default=False)
+    token_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+        comment="Se incrementa al cambiar credenciales, rol o estado; los tokens llevan la versión con la que se emitieron"
+    )
+
+# Solo cubre los cambios hechos con el ORM; los demás los detecta el registro
+# de tokens comparando nombre, rol y contraseña con los claims
+@event.listens_for(User, "before_update")
+def _bump_token_version(mapper, connection, target: User) -> None:
+    if any(attributes.get_history(target, name).has_changes() for name in TOKEN_FIELDS):
+        target.token_version = (target.token_version or 0) + 1
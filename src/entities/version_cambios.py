@@ -0,0 +1,26 @@
+"""
+Versión de cambios confirmados por ámbito (coordinación entre workers)
+"""
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, BigInteger, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from src.database import Base
+
+class VersionCambios(Base):
+    __tablename__ = "versiones_cambios"
+
+    ambito: Mapped[str] = mapped_column(String(30), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+    tablas: Mapped[Optional[str]] = mapped_column(
+        String(500),
+        nullable=True,
+        comment="Tablas modificadas en el último cambio confirmado"
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=func.now(),
+        onupdate=func.now(),
+        nullable=False
+    )
@@ -4,7 +4,7 @@ Vinos del restaurante con relaciones múltiples
 from __future__ import annotations
 from decimal import Decimal
 from typing import Optional, List
-from sqlalchemy import String, Numeric, ForeignKey, Table, Column
+from sqlalchemy import JSON, String, Numeric, ForeignKey, Table, Column
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from src.database import Base
 from src.entities.mixins import AuditMixin
@@ -46,6 +46,14 @@ class Vino(Base, AuditMixin):
         index=True
     )
 
+    # Modelo de lectura: nombres copiados de las relaciones para servir la
+    # carta leyendo solo esta tabla (los mantiene src.database.read_model)
+    categoria_nombre: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
+    denominacion_nombre: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    bodega_nombre: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    enologo_nombre: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    uvas_nombres: Mapped[Optional[List[str]]] = mapped_column(JSON(none_as_null=True), nullable=True)
+
     # Relationships
     categoria: Mapped["CategoriaVino"] = relationship(
         "CategoriaVino", 
@@ -0,0 +1,51 @@
+"""
+Vinos eliminados lógicamente y archivados fuera de la tabla principal
+"""
+from __future__ import annotations
+from datetime import datetime
+from decimal import Decimal
+from typing import Optional
+from sqlalchemy import String, Numeric, ForeignKey, Table, Column, DateTime
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.sql import func
+from src.database import Base
+from src.entities.mixins import AuditMixin
+
+# Copia archivada de la relación vinos <-> uvas
+vinos_uvas_archivo = Table(
+    "vinos_uvas_archivo",
+    Base.metadata,
+    Column("vino_id", ForeignKey("vinos_archivo.id"), primary_key=True),
+    Column("uva_id", ForeignKey("uvas.id"), primary_key=True),
+)
+
+class VinoArchivado(Base, AuditMixin):
+    __tablename__ = "vinos_archivo"
+
+    # Conserva el id original para poder restaurar el vino
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=False)
+    nombre: Mapped[str] = mapped_column(String(100), index=True)
+    precio: Mapped[Decimal] = mapped_column(Numeric(10, 2), nullable=False)
+    precio_unidad: Mapped[Optional[str]] = mapped_column(String(20), nullable=True)
+    categoria_id: Mapped[int] = mapped_column(
+        ForeignKey("categoria_vinos.id"),
+        index=True
+    )
+    bodega_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("bodegas.id"),
+        nullable=True
+    )
+    denominacion_origen_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("denominaciones_origen.id"),
+        nullable=True
+    )
+    enologo_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("enologos.id"),
+        nullable=True
+    )
+    archived_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=func.now(),
+        nullable=False,
+        comment="Fecha y hora de archivado"
+    )
@@ -0,0 +1 @@
+# Tareas programadas y comandos de mantenimiento
@@ -0,0 +1,56 @@
+"""
+Tarea periódica de archivado de registros eliminados lógicamente.
+
+Uso manual:
+    python -m src.jobs.archival [--retention-days 90] [--batch-size 500]
+"""
+import argparse
+import asyncio
+import logging
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from src.core.config import settings
+from src.database import SessionLocal
+from src.services.archival_service import ArchivalService
+
+logger = logging.getLogger(__name__)
+
+def run_archival(retention_days: Optional[int] = None, batch_size: Optional[int] = None) -> Dict[str, int]:
+    """Ejecuta una pasada de archivado con su propia sesión"""
+    db = SessionLocal()
+    try:
+        return ArchivalService(db).archive_soft_deleted(
+            retention_days=retention_days,
+            batch_size=batch_size
+        )
+    finally:
+        db.close()
+
+async def run_archival_scheduler() -> None:
+    """Bucle del worker: archiva cada `archival_interval_minutes`"""
+    interval = settings.archival_interval_minutes * 60
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            archived = await run_in_threadpool(run_archival)
+            if any(archived.values()):
+                logger.info("Registros archivados: %s", archived)
+        except Exception:
+            logger.exception("Error en el archivado programado")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archiva platos y vinos eliminados lógicamente")
+    parser.add_argument("--retention-days", type=int, default=None,
+                        help=f"Días desde el borrado lógico (por defecto {settings.archival_retention_days})")
+    parser.add_argument("--batch-size", type=int, default=None,
+                        help=f"Registros por transacción (por defecto {settings.archival_batch_size})")
+    args = parser.parse_args()
+
+    archived = run_archival(args.retention_days, args.batch_size)
+    for entidad, total in archived.items():
+        print(f"✅ {total} {entidad} archivados")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""
+Exportación del menú público a ficheros estáticos.
+
+Uso:
+    python -m src.jobs.export_snapshots [--output var/snapshots] [--force]
+"""
+import argparse
+import logging
+from typing import Any, Dict, Optional
+
+from src.core.config import settings
+from src.database import SessionLocal
+from src.services.snapshot_service import SnapshotService
+
+logger = logging.getLogger(__name__)
+
+def run_snapshot_export(output_dir: Optional[str] = None, force: bool = False) -> Dict[str, Any]:
+    """Ejecuta una exportación con su propia sesión"""
+    db = SessionLocal()
+    try:
+        result = SnapshotService(db, output_dir).export(force=force)
+        logger.info("Snapshots exportados: %s", result)
+        return result
+    finally:
+        db.close()
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Exporta el menú público a ficheros estáticos")
+    parser.add_argument("--output", default=None,
+                        help=f"Directorio de salida (por defecto {settings.snapshot_dir})")
+    parser.add_argument("--force", action="store_true",
+                        help="Regenerar todos los presets aunque no hayan cambiado")
+    args = parser.parse_args()
+
+    result = run_snapshot_export(args.output, args.force)
+    print(f"✅ {result['presets']} presets exportados, {len(result['written'])} reescritos")
+    for name in result["written"]:
+        print(f"   📝 {name}")
+
+if __name__ == "__main__":
+    main()
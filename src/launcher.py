@@ -0,0 +1,189 @@
+"""
+Arranque multiproceso con precarga (pre-fork)
+
+El proceso maestro importa la aplicación una sola vez, la calienta (catálogo
+en memoria, índice de maridajes, cachés del menú y de los repositorios,
+tabla de versiones de token), congela el heap con ``gc.freeze()`` y crea los
+workers con ``fork``. Los workers comparten esas páginas (copy-on-write)
+mientras nadie las escriba; sacar los objetos precargados del recolector de
+ciclos evita que este las toque y fuerce la copia.
+
+Cada worker descarta las conexiones heredadas del pool, comprueba que el
+menú no ha cambiado desde la precarga y atiende peticiones con uvicorn
+sobre el socket que abrió el maestro. El maestro solo vigila: reenvía
+SIGTERM/SIGINT a los workers y sustituye a los que terminan inesperadamente.
+
+Uso::
+
+    python -m src.launcher --workers 4 --port 8000
+"""
+import argparse
+import gc
+import importlib
+import logging
+import os
+import signal
+import socket
+import time
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+
+from src.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Un worker que muere antes de este tiempo no se sustituye de inmediato
+MIN_WORKER_UPTIME_SECONDS = 1.0
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Socket de escucha compartido por todos los workers"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+class PreforkLauncher:
+    """Proceso maestro: precarga la aplicación y mantiene `workers` procesos hijos"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        workers: int,
+        app: str = "src.main:app",
+        uvicorn_options: Optional[Dict[str, Any]] = None
+    ) -> None:
+        self.app_path = app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.uvicorn_options = uvicorn_options or {}
+        self.children: Dict[int, float] = {}
+        self.stopping = False
+        # Versión de cada ámbito del menú en el maestro tras la precarga
+        self.menu_versions: Dict[str, Optional[int]] = {}
+        self._app: Any = None
+        self._sock: Optional[socket.socket] = None
+
+    def run(self) -> None:
+        start = time.perf_counter()
+        # Sin recolección durante la precarga: lo que se crea ahora vive siempre
+        gc.disable()
+        self._sock = _bind(self.host, self.port)
+        self._preload()
+        gc.freeze()
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+        for _ in range(self.workers):
+            self._spawn()
+        gc.enable()
+        logger.info(
+            "Maestro %d escuchando en %s:%d con %d workers (precarga en %.0f ms, %d objetos congelados)",
+            os.getpid(), self.host, self.port, self.workers,
+            (time.perf_counter() - start) * 1000, gc.get_freeze_count(),
+        )
+        self._supervise()
+
+    def _preload(self) -> None:
+        module, _, attribute = self.app_path.partition(":")
+        self._app = getattr(importlib.import_module(module), attribute or "app")
+
+        from src.database import SessionLocal, engine
+        from src.database.change_tracking import MENU_SCOPE, PUBLICATION_SCOPE, read_version
+        from src.services.warmup_service import warmup
+
+        warmup.run()
+        with SessionLocal() as db:
+            for scope in (MENU_SCOPE, PUBLICATION_SCOPE):
+                row = read_version(db, scope)
+                self.menu_versions[scope] = row[0] if row else None
+        # Las conexiones no se comparten entre procesos: cada worker abre las suyas
+        engine.dispose()
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                code = self._run_worker()
+            except Exception:
+                logger.exception("Error en el worker %d", os.getpid())
+            finally:
+                os._exit(code)
+        self.children[pid] = time.monotonic()
+
+    def _run_worker(self) -> int:
+        from src.database import engine
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        # close=False: los sockets heredados son del maestro, no se cierran desde aquí
+        engine.dispose(close=False)
+        gc.enable()
+        self._check_menu_version()
+
+        server = uvicorn.Server(uvicorn.Config(self._app, **self.uvicorn_options))
+        server.run(sockets=[self._sock])
+        return 0 if server.started else 3
+
+    def _check_menu_version(self) -> None:
+        """
+        Un worker sustituido tiempo después de la precarga hereda cachés que
+        pueden estar desfasadas: si la versión del menú (o de sus
+        publicaciones) cambió, se invalidan
+        """
+        from src.database import SessionLocal
+        from src.database.change_tracking import CommittedChanges, dispatch, read_version
+
+        with SessionLocal() as db:
+            rows = {scope: read_version(db, scope) for scope in self.menu_versions}
+        for scope, row in rows.items():
+            version = row[0] if row else None
+            if version is None or version != self.menu_versions[scope]:
+                dispatch(CommittedChanges(scope=scope, version=None, tables=frozenset(), local=False))
+
+    def _supervise(self) -> None:
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            logger.warning("Worker %d terminado (código %d), se sustituye", pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < MIN_WORKER_UPTIME_SECONDS:
+                time.sleep(MIN_WORKER_UPTIME_SECONDS)
+            if not self.stopping:
+                self._spawn()
+
+    def _stop(self, signum: int, frame: Any) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Arranque multiproceso con precarga de la aplicación")
+    parser.add_argument("--app", default="src.main:app", help="Aplicación ASGI (módulo:atributo)")
+    parser.add_argument("--host", default=settings.launcher_host)
+    parser.add_argument("--port", type=int, default=settings.launcher_port)
+    parser.add_argument("--workers", type=int, default=settings.launcher_workers)
+    parser.add_argument("--proxy-headers", action="store_true", help="Confiar en X-Forwarded-* (detrás de un proxy)")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level.upper(), format="%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s")
+    options: Dict[str, Any] = {"log_level": args.log_level}
+    if args.proxy_headers:
+        options.update(proxy_headers=True, forwarded_allow_ips="*")
+    PreforkLauncher(args.host, args.port, max(args.workers, 1), args.app, options).run()
+
+if __name__ == "__main__":
+    main()
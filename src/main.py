@@ -1,12 +1,43 @@
 """
 FastAPI Backend para gestión de carta de restaurante
 """
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.core.config import settings
+from src.core.tracing import span_exporter
 from src.database import init_db
+from src.middleware.concurrency import ConcurrencyLimitMiddleware
+from src.middleware.profiling import ProfilingMiddleware
+from src.middleware.rate_limit import RateLimitMiddleware
+from src.middleware.tracing import TracingMiddleware
 from src.routes.public import router as public_router
 from src.routes.admin import router as admin_router
+from src.routes.auth import router as auth_router
+from src.routes.health import router as health_router
+from src.services.menu_events import menu_event_broker
+from src.jobs.archival import run_archival_scheduler
+from src.services.warmup_service import run_warmup, warmup
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Arranque y parada de las tareas en segundo plano del worker"""
+    await menu_event_broker.start()
+    tasks = []
+    if settings.warmup_enabled:
+        tasks.append(asyncio.create_task(run_warmup()))
+    else:
+        warmup.ready = True
+    if settings.archival_enabled:
+        tasks.append(asyncio.create_task(run_archival_scheduler()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        await menu_event_broker.stop()
+        span_exporter.shutdown()
 
 # Crear la aplicación FastAPI
 app = FastAPI(
@@ -14,9 +45,23 @@ app = FastAPI(
     description="API de gestión para una carta de restaurante",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
+# Trazas por capas de las peticiones muestreadas (lo más interno: sin tiempo en cola)
+app.add_middleware(TracingMiddleware)
+
+# Limitar la concurrencia por grupo de rutas (dentro de CORS, para que los 503 lleven sus cabeceras)
+app.add_middleware(ConcurrencyLimitMiddleware)
+
+# Limitar peticiones por cliente antes de que ocupen un hueco de concurrencia
+app.add_middleware(RateLimitMiddleware)
+
+# Perfilado bajo demanda de peticiones marcadas por un administrador
+if settings.profiling_enabled:
+    app.add_middleware(ProfilingMiddleware)
+
 # Configurar CORS
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +74,8 @@ app.add_middleware(
 # Incluir rutas
 app.include_router(public_router, prefix="/api/v1")
 app.include_router(admin_router, prefix="/api/v1")
+app.include_router(auth_router, prefix="/api/v1")
+app.include_router(health_router)
 
 # Inicializar base de datos
 try:
@@ -0,0 +1 @@
+# Middlewares ASGI de la aplicación
@@ -0,0 +1,331 @@
+"""
+Limitación adaptativa de concurrencia por grupo de rutas y descarte de carga
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+
+# Límites de los cubos del histograma de tiempo en cola (ms)
+QUEUE_TIME_BUCKETS_MS = (1, 5, 10, 50, 100, 250, 500, 1000, 2500, 5000)
+
+class Overloaded(Exception):
+    """No hay hueco ni sitio en la cola del grupo de rutas"""
+
+class AIMDLimit:
+    """
+    Límite de concurrencia AIMD: sube de uno en uno tras una ventana de
+    respuestas por debajo de la latencia objetivo y se reduce de forma
+    multiplicativa ante respuestas lentas o esperas agotadas
+    """
+
+    def __init__(
+        self,
+        initial: int,
+        min_limit: int,
+        max_limit: int,
+        latency_target: float,
+        backoff: float = 0.9,
+        adaptive: bool = True
+    ) -> None:
+        self.limit = float(initial)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.backoff = backoff
+        self.adaptive = adaptive
+        self._good = 0
+
+    @property
+    def current(self) -> int:
+        return int(self.limit)
+
+    def on_response(self, latency: float) -> None:
+        if not self.adaptive:
+            return
+        if latency > self.latency_target:
+            self.on_overload()
+            return
+        self._good += 1
+        if self._good >= self.current:
+            self._good = 0
+            self.limit = min(self.max_limit, self.limit + 1)
+
+    def on_overload(self) -> None:
+        if not self.adaptive:
+            return
+        self._good = 0
+        self.limit = max(self.min_limit, self.limit * self.backoff)
+
+class RouteGroupLimiter:
+    """
+    Semáforo con cola acotada para un grupo de rutas. Vive en el bucle de
+    eventos del worker, así que no necesita bloqueos
+    """
+
+    def __init__(self, name: str, limit: AIMDLimit, queue_size: int, queue_timeout: float) -> None:
+        self.name = name
+        self.limit = limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Métricas
+        self.served = 0
+        self.shed = 0
+        self.timeouts = 0
+        self.queued = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+        self.latency_total = 0.0
+        self.queue_time_buckets = [0] * (len(QUEUE_TIME_BUCKETS_MS) + 1)
+
+    async def acquire(self) -> float:
+        """Ocupa un hueco y devuelve el tiempo pasado en cola (s)"""
+        if self.in_flight < self.limit.current and not self._waiters:
+            self.in_flight += 1
+            self._observe_queue_time(0.0)
+            return 0.0
+
+        if len(self._waiters) >= self.queue_size:
+            self.shed += 1
+            raise Overloaded()
+
+        start = time.monotonic()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        self._admit()
+        try:
+            # El hueco se transfiere al resolver el futuro (ver `release`)
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # El hueco llegó justo al agotarse la espera: se devuelve
+                self.release()
+            self._discard(waiter)
+            self.timeouts += 1
+            self.shed += 1
+            self.limit.on_overload()
+            raise Overloaded()
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            self._discard(waiter)
+            raise
+
+        queue_time = time.monotonic() - start
+        self._observe_queue_time(queue_time)
+        return queue_time
+
+    def release(self, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            self.served += 1
+            self.latency_total += latency
+            self.limit.on_response(latency)
+        self.in_flight -= 1
+        self._admit()
+
+    def retry_after(self) -> int:
+        """Estimación en segundos de cuándo habrá hueco"""
+        avg_latency = self.latency_total / self.served if self.served else self.queue_timeout
+        pending = len(self._waiters) + 1
+        return max(1, math.ceil(avg_latency * pending / max(1, self.limit.current)))
+
+    def _admit(self) -> None:
+        while self._waiters and self.in_flight < self.limit.current:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _discard(self, waiter: asyncio.Future) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _observe_queue_time(self, queue_time: float) -> None:
+        self.queue_time_total += queue_time
+        self.queue_time_max = max(self.queue_time_max, queue_time)
+        ms = queue_time * 1000
+        for index, bound in enumerate(QUEUE_TIME_BUCKETS_MS):
+            if ms <= bound:
+                self.queue_time_buckets[index] += 1
+                break
+        else:
+            self.queue_time_buckets[-1] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        admitted = sum(self.queue_time_buckets)
+        buckets = {f"le_{bound}ms": count for bound, count in zip(QUEUE_TIME_BUCKETS_MS, self.queue_time_buckets)}
+        buckets["gt"] = self.queue_time_buckets[-1]
+        return {
+            "limit": self.limit.current,
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "served": self.served,
+            "queued": self.queued,
+            "shed": self.shed,
+            "timeouts": self.timeouts,
+            "queue_time_avg_ms": round(self.queue_time_total / admitted * 1000, 3) if admitted else 0.0,
+            "queue_time_max_ms": round(self.queue_time_max * 1000, 3),
+            "queue_time_buckets": buckets,
+        }
+
+class StaleResponseStore:
+    """Última respuesta correcta de cada lectura pública, para servirla bajo sobrecarga"""
+
+    def __init__(self, max_entries: int = 64, max_body_bytes: int = 4 * 1024 * 1024) -> None:
+        self.max_entries = max_entries
+        self.max_body_bytes = max_body_bytes
+        self._data: "OrderedDict[str, Tuple[List[Tuple[bytes, bytes]], bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Tuple[List[Tuple[bytes, bytes]], bytes]]:
+        return self._data.get(key)
+
+    def put(self, key: str, headers: List[Tuple[bytes, bytes]], body: bytes) -> None:
+        self._data[key] = (headers, body)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+def _build_limiter(name: str, initial: int) -> RouteGroupLimiter:
+    return RouteGroupLimiter(
+        name,
+        AIMDLimit(
+            initial=initial,
+            min_limit=1,
+            max_limit=initial * 4,
+            latency_target=settings.concurrency_latency_target_ms / 1000,
+            adaptive=settings.concurrency_adaptive,
+        ),
+        queue_size=settings.concurrency_queue_size,
+        queue_timeout=settings.concurrency_queue_timeout_ms / 1000,
+    )
+
+# Grupos de rutas por prefijo (se comprueban en orden)
+route_limiters: Dict[str, RouteGroupLimiter] = {
+    "public": _build_limiter("public", settings.concurrency_public_limit),
+    "admin": _build_limiter("admin", settings.concurrency_admin_limit),
+    "auth": _build_limiter("auth", settings.concurrency_auth_limit),
+}
+ROUTE_GROUPS: Tuple[Tuple[str, str], ...] = (
+    ("/api/v1/public", "public"),
+    ("/api/v1/admin", "admin"),
+    ("/api/v1/auth", "auth"),
+)
+# Conexiones de larga duración que no deben ocupar huecos
+EXCLUDED_PATHS: Tuple[str, ...] = ("/api/v1/public/eventos",)
+# Lecturas que se pueden degradar a la última respuesta conocida
+STALE_PATHS: Tuple[str, ...] = ("/api/v1/public/platos", "/api/v1/public/vinos")
+
+class ConcurrencyLimitMiddleware:
+    """
+    Aplica el límite de concurrencia de cada grupo de rutas: encola con
+    tiempo máximo de espera y descarta el exceso con 503 y `Retry-After`.
+    Las lecturas públicas del menú descartadas reciben la última respuesta
+    correcta conocida en lugar de un error
+    """
+
+    def __init__(self, app: ASGIApp, stale_store: Optional[StaleResponseStore] = None) -> None:
+        self.app = app
+        self.stale_store = stale_store or StaleResponseStore()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        limiter = self._match(path)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        stale_key = self._stale_key(scope)
+        try:
+            queue_time = await limiter.acquire()
+        except Overloaded:
+            await self._reject(limiter, stale_key, send)
+            return
+
+        start = time.monotonic()
+        capture = stale_key is not None
+        stale_headers: List[Tuple[bytes, bytes]] = []
+        body_parts: List[bytes] = []
+        body_size = 0
+        # Latencia hasta el primer byte: una descarga larga o un cliente lento no es sobrecarga
+        first_byte: Optional[float] = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal capture, body_size, first_byte
+            if message["type"] == "http.response.start":
+                first_byte = time.monotonic() - start
+                headers = list(message.get("headers", []))
+                capture = capture and message["status"] == 200
+                stale_headers.extend((k, v) for k, v in headers if k.lower() != b"content-length")
+                headers.append((b"server-timing", f"queue;dur={queue_time * 1000:.1f}".encode()))
+                message = {**message, "headers": headers}
+            elif message["type"] == "http.response.body" and capture:
+                body_parts.append(message.get("body", b""))
+                body_size += len(body_parts[-1])
+                if body_size > self.stale_store.max_body_bytes:
+                    capture = False
+                elif not message.get("more_body", False):
+                    self.stale_store.put(stale_key, stale_headers, b"".join(body_parts))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            # El hueco se libera al terminar el cuerpo
+            limiter.release(first_byte if first_byte is not None else time.monotonic() - start)
+
+    def _match(self, path: str) -> Optional[RouteGroupLimiter]:
+        if not settings.concurrency_limits_enabled or path.startswith(EXCLUDED_PATHS):
+            return None
+        for prefix, group in ROUTE_GROUPS:
+            if path.startswith(prefix):
+                return route_limiters[group]
+        return None
+
+    @staticmethod
+    def _stale_key(scope: Scope) -> Optional[str]:
+        if scope["method"] != "GET" or scope["path"] not in STALE_PATHS:
+            return None
+        return scope["path"] + "?" + scope.get("query_string", b"").decode("latin-1")
+
+    async def _reject(self, limiter: RouteGroupLimiter, stale_key: Optional[str], send: Send) -> None:
+        retry_after = str(limiter.retry_after()).encode()
+        stale = self.stale_store.get(stale_key) if stale_key is not None else None
+        if stale is not None:
+            headers, body = stale
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": headers + [
+                    (b"content-length", str(len(body)).encode()),
+                    (b"x-menu-snapshot", b"stale"),
+                    (b"retry-after", retry_after),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        body = b'{"detail":"Servicio saturado, vuelve a intentarlo en unos segundos"}'
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", retry_after),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,247 @@
+"""
+Perfilado bajo demanda de peticiones individuales
+
+Una petición con la cabecera ``X-Profile: 1`` (o ``?__profile=1``) y un token
+de administrador se ejecuta con un muestreador de pilas y su perfil se guarda
+como JSON de speedscope (https://www.speedscope.app), descargable desde
+``/admin/perfiles``. Sin la cabecera el middleware solo comprueba su presencia.
+"""
+import contextvars
+import functools
+import json
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+import anyio.to_thread
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.config import settings
+from src.database import SessionLocal
+from src.auth.dependencies import authenticate_token
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = b"__profile="
+PROFILE_ID_PATTERN = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{8}$")
+SPEEDSCOPE_SUFFIX = ".speedscope.json"
+
+# Solo se conservan las pilas que pasan por el código de la aplicación
+_APP_ROOT = str(Path(__file__).resolve().parent.parent)
+
+Frame = Tuple[str, str, int]
+
+# Muestreador de la petición en curso; lo ven las llamadas al threadpool hechas desde ella
+_active_sampler: contextvars.ContextVar[Optional["StackSampler"]] = contextvars.ContextVar(
+    "active_sampler", default=None
+)
+
+class StackSampler:
+    """
+    Muestrea periódicamente las pilas de los hilos que atienden una petición:
+    el del bucle de eventos y los del threadpool mientras ejecutan trabajo
+    lanzado desde ella, que se anotan a sí mismos en `serving`
+    """
+
+    def __init__(self, interval: float, loop_thread: Optional[int] = None) -> None:
+        self.interval = interval
+        self.loop_thread = loop_thread
+        self.serving: Set[int] = set()
+        self.samples: Dict[int, List[Tuple[float, Tuple[Frame, ...]]]] = defaultdict(list)
+        self.thread_names: Dict[int, str] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self.started = 0.0
+        self.finished = 0.0
+
+    def start(self) -> None:
+        self.started = time.perf_counter()
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.finished = time.perf_counter()
+
+    def run_serving(self, func, *args):
+        """Ejecuta `func` en el hilo actual anotándolo como parte de la petición"""
+        thread_id = threading.get_ident()
+        self.serving.add(thread_id)
+        try:
+            return func(*args)
+        finally:
+            self.serving.discard(thread_id)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            now = time.perf_counter() - self.started
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != self.loop_thread and thread_id not in self.serving:
+                    continue
+                stack = self._stack(frame)
+                if stack:
+                    self.samples[thread_id].append((now, stack))
+        for thread in threading.enumerate():
+            self.thread_names[thread.ident] = thread.name
+
+    @staticmethod
+    def _stack(frame) -> Optional[Tuple[Frame, ...]]:
+        stack: List[Frame] = []
+        in_app = False
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_name, code.co_filename, code.co_firstlineno))
+            in_app = in_app or code.co_filename.startswith(_APP_ROOT)
+            frame = frame.f_back
+        if not in_app:
+            return None
+        stack.reverse()
+        return tuple(stack)
+
+    def to_speedscope(self, name: str) -> Dict[str, Any]:
+        """Formato 'sampled' de speedscope, un perfil por hilo"""
+        frame_index: Dict[Frame, int] = {}
+        frames: List[Dict[str, Any]] = []
+        profiles = []
+        duration_ms = (self.finished - self.started) * 1000
+
+        for thread_id, thread_samples in self.samples.items():
+            samples, weights = [], []
+            for _, stack in thread_samples:
+                indices = []
+                for frame in stack:
+                    if frame not in frame_index:
+                        frame_index[frame] = len(frames)
+                        frames.append({"name": frame[0], "file": frame[1], "line": frame[2]})
+                    indices.append(frame_index[frame])
+                samples.append(indices)
+                weights.append(self.interval * 1000)
+            profiles.append({
+                "type": "sampled",
+                "name": self.thread_names.get(thread_id, str(thread_id)),
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": duration_ms,
+                "samples": samples,
+                "weights": weights,
+            })
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": settings.app_name,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+_run_sync = anyio.to_thread.run_sync
+
+async def _run_sync_profiled(func, *args, **kwargs):
+    """
+    `anyio.to_thread.run_sync` (el que usan Starlette y FastAPI para el
+    threadpool) que, durante una petición perfilada, anota el hilo que la atiende
+    """
+    sampler = _active_sampler.get()
+    if sampler is not None:
+        func = functools.partial(sampler.run_serving, func)
+    return await _run_sync(func, *args, **kwargs)
+
+if settings.profiling_enabled:
+    anyio.to_thread.run_sync = _run_sync_profiled
+
+def profile_dir() -> Path:
+    return Path(settings.profile_dir)
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Perfiles guardados, del más reciente al más antiguo"""
+    paths = sorted(profile_dir().glob("*" + SPEEDSCOPE_SUFFIX), reverse=True)
+    return [
+        {"id": path.name[:-len(SPEEDSCOPE_SUFFIX)], "size": path.stat().st_size}
+        for path in paths
+    ]
+
+def profile_path(profile_id: str) -> Optional[Path]:
+    """Ruta del perfil, o None si el id no es válido o no existe"""
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+    path = profile_dir() / (profile_id + SPEEDSCOPE_SUFFIX)
+    return path if path.exists() else None
+
+def _save_profile(profile_id: str, profile: Dict[str, Any]) -> None:
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = directory / f".{profile_id}.tmp"
+    tmp_path.write_text(json.dumps(profile), encoding="utf-8")
+    tmp_path.replace(directory / (profile_id + SPEEDSCOPE_SUFFIX))
+    # Conservar solo los más recientes
+    for stale in sorted(directory.glob("*" + SPEEDSCOPE_SUFFIX), reverse=True)[settings.profile_max_artifacts:]:
+        stale.unlink(missing_ok=True)
+
+def _is_admin_token(authorization: Optional[str]) -> bool:
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return False
+    db = SessionLocal()
+    try:
+        user = authenticate_token(authorization[7:].strip(), db)
+        return user.is_active and user.is_admin
+    except Exception:
+        return False
+    finally:
+        db.close()
+
+class ProfilingMiddleware:
+    """Perfila las peticiones marcadas por un administrador"""
+
+    # Un solo perfil a la vez: el hilo del bucle de eventos es compartido
+    _busy = threading.Lock()
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self._requested(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        if not await run_in_threadpool(_is_admin_token, authorization) or not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = time.strftime("%Y%m%dT%H%M%S", time.gmtime()) + "-" + uuid.uuid4().hex[:8]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]}
+            await send(message)
+
+        sampler = StackSampler(settings.profile_sample_interval_ms / 1000, loop_thread=threading.get_ident())
+        try:
+            sampler.start()
+            token = _active_sampler.set(sampler)
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                _active_sampler.reset(token)
+                sampler.stop()
+            name = f"{scope['method']} {scope['path']}"
+            await run_in_threadpool(_save_profile, profile_id, sampler.to_speedscope(name))
+        finally:
+            self._busy.release()
+
+    @staticmethod
+    def _requested(scope: Scope) -> bool:
+        if PROFILE_QUERY in scope.get("query_string", b""):
+            values = parse_qs(scope["query_string"].decode("latin-1")).get("__profile", [])
+            return any(v not in ("", "0", "false") for v in values)
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return value not in (b"", b"0", b"false")
+        return False
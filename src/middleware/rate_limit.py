@@ -0,0 +1,138 @@
+"""
+Limitación de peticiones con cubos de tokens por IP de cliente y por usuario
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from src.core.config import settings
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600}
+
+def parse_rate(spec: str) -> Tuple[float, int]:
+    """
+    Convierte "<n>/<second|minute|hour>" en (tokens por segundo, ráfaga).
+    La ráfaga es `n`: se pueden hacer las `n` peticiones de golpe
+    """
+    amount, _, period = spec.partition("/")
+    tokens = int(amount)
+    if tokens <= 0 or period not in _PERIODS:
+        raise ValueError(f"Límite no válido: {spec!r} (formato '<n>/<second|minute|hour>')")
+    return tokens / _PERIODS[period], tokens
+
+class TokenBucketStore:
+    """
+    Cubos de tokens por clave, repartidos en shards con su propio bloqueo y
+    LRU acotado: la memoria no crece con el número de clientes y los hilos
+    solo compiten cuando sus claves caen en el mismo shard.
+
+    Con el shard lleno se descarta siempre el cubo menos reciente, así que una
+    clave nueva nunca se rechaza por falta de sitio. Para que olvidar un cubo
+    vacío no lo devuelva lleno, cada shard guarda el nivel más bajo de los
+    cubos descartados (rellenándose al ritmo normal) y las claves nuevas
+    empiezan en ese nivel, con al menos un uso. `max_keys` debe cubrir las
+    claves distintas que se esperan en el tiempo de rellenado (`burst / rate`):
+    por debajo, los clientes legítimos pierden su ráfaga durante un ataque
+    con claves basura, pero no se les bloquea.
+    """
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000, shards: int = 16) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys_per_shard = max(1, max_keys // shards)
+        self._shards: List[Tuple[threading.Lock, "OrderedDict[str, Tuple[float, float]]"]] = [
+            (threading.Lock(), OrderedDict()) for _ in range(shards)
+        ]
+        # Por shard: (tokens, instante) del cubo descartado más vacío
+        self._floors: List[Tuple[float, float]] = [(float(burst), 0.0)] * shards
+
+    def consume(self, key: str, cost: float = 1.0) -> float:
+        """Gasta `cost` tokens: devuelve 0 si se permite o los segundos hasta que haya tokens"""
+        shard = hash(key) % len(self._shards)
+        lock, buckets = self._shards[shard]
+        now = time.monotonic()
+        with lock:
+            state = buckets.get(key)
+            if state is None:
+                floor = self._refill(self._floors[shard], now)
+                if len(buckets) >= self.max_keys_per_shard:
+                    _, evicted = buckets.popitem(last=False)
+                    floor = min(floor, self._refill(evicted, now))
+                    self._floors[shard] = (floor, now)
+                tokens = min(float(self.burst), max(cost, floor))
+            else:
+                tokens = self._refill(state, now)
+            if tokens >= cost:
+                buckets[key] = (tokens - cost, now)
+                wait = 0.0
+            else:
+                buckets[key] = (tokens, now)
+                wait = (cost - tokens) / self.rate
+            buckets.move_to_end(key)
+        return wait
+
+    def _refill(self, state: Tuple[float, float], now: float) -> float:
+        tokens, last = state
+        return min(float(self.burst), tokens + (now - last) * self.rate)
+
+def _build_rules() -> List[Tuple[str, TokenBucketStore]]:
+    rules = []
+    for prefix, spec in settings.rate_limit_rules.items():
+        rate, burst = parse_rate(spec)
+        rules.append((prefix, TokenBucketStore(rate, burst, max_keys=settings.rate_limit_max_keys)))
+    # Gana el prefijo más largo
+    return sorted(rules, key=lambda rule: len(rule[0]), reverse=True)
+
+# Límite por IP para cada prefijo de ruta configurado
+route_rate_limits: List[Tuple[str, TokenBucketStore]] = _build_rules()
+
+# Límite de intentos de login por nombre de usuario (fuerza bruta distribuida)
+_login_rate, _login_burst = parse_rate(settings.rate_limit_login_username)
+login_rate_limiter = TokenBucketStore(_login_rate, _login_burst, max_keys=settings.rate_limit_max_keys)
+
+def too_many_requests_body(wait: float) -> Tuple[bytes, bytes]:
+    retry_after = str(max(1, math.ceil(wait))).encode()
+    return b'{"detail":"Demasiadas peticiones, vuelve a intentarlo m\\u00e1s tarde"}', retry_after
+
+class RateLimitMiddleware:
+    """Responde 429 con `Retry-After` cuando una IP agota los tokens de su ruta"""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.rate_limit_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        bucket = self._match(scope["path"])
+        if bucket is not None:
+            prefix, store = bucket
+            client = scope.get("client")
+            wait = store.consume(f"{prefix}|{client[0] if client else '-'}")
+            if wait > 0:
+                body, retry_after = too_many_requests_body(wait)
+                await send({
+                    "type": "http.response.start",
+                    "status": 429,
+                    "headers": [
+                        (b"content-type", b"application/json"),
+                        (b"content-length", str(len(body)).encode()),
+                        (b"retry-after", retry_after),
+                    ],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+
+        await self.app(scope, receive, send)
+
+    @staticmethod
+    def _match(path: str) -> Optional[Tuple[str, TokenBucketStore]]:
+        for prefix, store in route_rate_limits:
+            if path.startswith(prefix):
+                return prefix, store
+        return None
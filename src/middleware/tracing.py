@@ -0,0 +1,62 @@
+"""
+Traza raíz de cada petición HTTP muestreada
+"""
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.tracing import NOOP_SPAN, SPAN_KIND_INTERNAL, STATUS_ERROR, Span, start_trace
+
+# Conexiones de larga duración (su traza no se cerraría nunca) y sondas de salud
+EXCLUDED_PATHS = ("/api/v1/public/eventos", "/health")
+
+class TracingMiddleware:
+    """
+    Abre la traza de la petición y, al empezar la respuesta, añade el span
+    ``response.serialize``: el tiempo entre el final del endpoint y el envío
+    de cabeceras, que es la validación y serialización del `response_model`
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(EXCLUDED_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        root = start_trace(
+            f"{scope['method']} {scope['path']}",
+            **{
+                "http.method": scope["method"],
+                "http.target": scope["path"],
+                "http.query": scope.get("query_string", b"").decode("latin-1") or None,
+            }
+        )
+        if root is NOOP_SPAN:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                if message["status"] >= 500:
+                    root.status = STATUS_ERROR
+                self._serialize_span(root)
+                message = {
+                    **message,
+                    "headers": [*message.get("headers", []), (b"x-trace-id", root.trace.trace_id.encode())],
+                }
+            await send(message)
+
+        with root:
+            await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _serialize_span(root: Span) -> None:
+        children_end = [s.end_ns for s in root.trace.spans if s.parent_id == root.span_id]
+        if not children_end:
+            return
+        serialize = Span(root.trace, "response.serialize", root.span_id, SPAN_KIND_INTERNAL, {})
+        serialize.start_ns = max(children_end)
+        serialize.end(time.time_ns())
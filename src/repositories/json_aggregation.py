@@ -0,0 +1,73 @@
+"""
+Agregación JSON en la base de datos
+
+Construye con funciones SQL los objetos y listas JSON de las respuestas
+agrupadas, para que la consulta devuelva el documento completo en una sola
+fila: ``JSON_OBJECT`` / ``JSON_ARRAYAGG`` / ``JSON_OBJECTAGG`` en MySQL y
+``json_object`` / ``json_group_array`` / ``json_group_object`` en SQLite.
+"""
+from typing import Any
+
+from sqlalchemy import Float, cast, func, literal
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import ColumnElement
+
+SUPPORTED_DIALECTS = ("mysql", "sqlite")
+
+class JsonAggregation:
+    """Expresiones JSON del dialecto de la sesión"""
+
+    def __init__(self, dialect: str) -> None:
+        if dialect not in SUPPORTED_DIALECTS:
+            raise NotImplementedError(f"Agregación JSON no disponible para {dialect}")
+        self.dialect = dialect
+
+    @classmethod
+    def for_session(cls, db: Session) -> "JsonAggregation":
+        return cls(db.get_bind().dialect.name)
+
+    @classmethod
+    def supported(cls, db: Session) -> bool:
+        return db.get_bind().dialect.name in SUPPORTED_DIALECTS
+
+    def object(self, **fields: Any) -> ColumnElement:
+        """Objeto con los campos en el orden dado"""
+        args = []
+        for name, value in fields.items():
+            args.extend((literal(name), value))
+        return func.json_object(*args)
+
+    def array_agg(self, value: ColumnElement) -> ColumnElement:
+        if self.dialect == "mysql":
+            return func.json_arrayagg(value)
+        return func.json_group_array(self.nested(value))
+
+    def object_agg(self, key: ColumnElement, value: ColumnElement) -> ColumnElement:
+        if self.dialect == "mysql":
+            return func.json_objectagg(key, value)
+        return func.json_group_object(key, self.nested(value))
+
+    def nested(self, value: ColumnElement) -> ColumnElement:
+        """
+        JSON ya construido (columna JSON o agregado de una subconsulta): en
+        SQLite es texto y hay que marcarlo para que no se escape como cadena
+        """
+        if self.dialect == "mysql":
+            return value
+        return func.json(value)
+
+    def array(self, value: ColumnElement) -> ColumnElement:
+        """Columna con una lista JSON; NULL equivale a lista vacía"""
+        if self.dialect == "mysql":
+            return func.coalesce(value, func.json_array())
+        return func.json(func.coalesce(value, "[]"))
+
+    def price(self, value: ColumnElement) -> ColumnElement:
+        """
+        Precio como número; 0 equivale a sin precio, como en las respuestas
+        agrupadas. MySQL lo deja en DECIMAL (12.50): mismo valor en JSON
+        """
+        value = func.nullif(value, 0)
+        if self.dialect == "mysql":
+            return value
+        return cast(value, Float)
@@ -1,16 +1,32 @@
 """
 Repository para manejar queries de menú
 """
-from typing import List, Optional
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import and_
+from typing import Iterator, List, Optional, Sequence
+from sqlalchemy.orm import Session
+from sqlalchemy import Row, or_, select
+from src.core.cache import cache_key
 from src.entities.plato import Plato
-from src.entities.categoria_plato import CategoriaPlato
+from src.core.tracing import traced
+from src.repositories.json_aggregation import JsonAggregation
+from src.repositories.query_cache import load_detached, normalize_price_bounds, normalize_text, repository_cache
+
+# Tablas que lee la consulta de platos (invalidación de la caché de resultados).
+# Los nombres de categoría y alérgenos salen del modelo de lectura de la propia
+# tabla, que se reescribe cuando cambian
+PLATOS_TABLES = frozenset({Plato.__tablename__})
+
+# Orden dentro de cada grupo para `sort` (los empates, por id)
+_SORT_COLUMNS = {
+    "precio": (Plato.precio,),
+    "-precio": (Plato.precio.desc(),),
+    "nombre": (Plato.nombre,),
+}
 
 class MenuRepository:
     def __init__(self, db: Session) -> None:
         self.db = db
     
+    @traced()
     def get_platos_with_filters(
         self, 
         categoria: Optional[str] = None,
@@ -20,20 +36,97 @@ class MenuRepository:
         is_active: Optional[bool] = None
     ) -> List[Plato]:
         """
-        SOLO query - devuelve lista de objetos Plato
+        SOLO query - devuelve lista de objetos Plato (desligados y de solo
+        lectura si pasan por la caché de resultados)
         """
-        # Construir query base
-        query = (
-            self.db.query(Plato)
-            .join(CategoriaPlato)
-            .options(selectinload(Plato.alergenos))
+        categoria = normalize_text(categoria)
+        precio_min, precio_max = normalize_price_bounds(precio_min, precio_max)
+        filters = self._filters(categoria, sugerencias, precio_min, precio_max, is_active)
+
+        def query(session: Session) -> List[Plato]:
+            return list(session.scalars(select(Plato).where(*filters)))
+
+        if not repository_cache.enabled:
+            return query(self.db)
+        key = cache_key(
+            "platos",
+            categoria=categoria,
+            sugerencias=sugerencias,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            is_active=is_active
         )
-        
+        return repository_cache.get_or_load(key, PLATOS_TABLES, lambda: load_detached(self.db, query))
+
+    @traced()
+    def get_platos_grouped_json(
+        self,
+        categoria: Optional[str] = None,
+        sugerencias: Optional[bool] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        is_active: Optional[bool] = None
+    ) -> str:
+        """
+        Platos agrupados por categoría como documento JSON construido por la
+        base de datos en una sola consulta: ``{"<categoria>": [plato, ...]}``
+        """
+        categoria = normalize_text(categoria)
+        precio_min, precio_max = normalize_price_bounds(precio_min, precio_max)
+        agg = JsonAggregation.for_session(self.db)
+
+        items = (
+            select(
+                Plato.categoria_nombre.label("grupo"),
+                agg.object(
+                    id=Plato.id,
+                    nombre=Plato.nombre,
+                    descripcion=Plato.descripcion,
+                    precio=agg.price(Plato.precio),
+                    precio_unidad=Plato.precio_unidad,
+                    alergenos=agg.array(Plato.alergenos_nombres),
+                ).label("item"),
+            )
+            .where(*self._filters(categoria, sugerencias, precio_min, precio_max, is_active))
+            .order_by(Plato.categoria_nombre, Plato.id)
+            .subquery()
+        )
+        groups = (
+            select(items.c.grupo, agg.array_agg(items.c.item).label("platos"))
+            .group_by(items.c.grupo)
+            .subquery()
+        )
+        document = self.db.execute(select(agg.object_agg(groups.c.grupo, groups.c.platos))).scalar()
+        return document or "{}"
+
+    def get_platos_by_ids(self, ids: Sequence[int]) -> List[Plato]:
+        """
+        Platos visibles en la API pública (activos o sugerencias) con los
+        ids dados, en una sola consulta IN
+        """
+        if not ids:
+            return []
+        return list(self.db.scalars(
+            select(Plato)
+            .where(Plato.id.in_(ids), or_(Plato.is_active == True, Plato.sugerencias == True))
+        ))
+
+    def _filters(
+        self,
+        categoria: Optional[str],
+        sugerencias: Optional[bool],
+        precio_min: Optional[float],
+        precio_max: Optional[float],
+        is_active: Optional[bool]
+    ) -> list:
+        """
+        Condiciones comunes a las consultas de platos
+        """
         # Aplicar filtros básicos
         filters = []
         
         if categoria:
-            filters.append(CategoriaPlato.nombre.ilike(f"%{categoria}%"))
+            filters.append(Plato.categoria_nombre.ilike(f"%{categoria}%"))
         
         if precio_min is not None:
             filters.append(Plato.precio >= precio_min)
@@ -47,7 +140,35 @@ class MenuRepository:
         if is_active is not None:
             filters.append(Plato.is_active == is_active)
         
-        if filters:
-            query = query.filter(and_(*filters))
-        
-        return query.all()  # Devuelve objetos Plato, NO diccionarios
\ No newline at end of file
+        return filters
+
+    def iter_platos_rows(
+        self,
+        categoria: Optional[str] = None,
+        sugerencias: Optional[bool] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        is_active: Optional[bool] = None,
+        sort: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[Row]:
+        """
+        Una fila por plato con cursor de servidor, ordenadas por categoría
+        y plato (o por `sort` dentro de cada categoría)
+        """
+        order = (Plato.categoria_nombre, *_SORT_COLUMNS.get(sort, ()), Plato.id)
+        query = (
+            select(
+                Plato.id,
+                Plato.nombre,
+                Plato.descripcion,
+                Plato.precio,
+                Plato.precio_unidad,
+                Plato.categoria_nombre.label("categoria"),
+                Plato.alergenos_nombres.label("alergenos"),
+            )
+            .where(*self._filters(categoria, sugerencias, precio_min, precio_max, is_active))
+            .order_by(*order)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        return iter(self.db.execute(query))
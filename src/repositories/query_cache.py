@@ -0,0 +1,184 @@
+"""
+Caché de resultados de los repositorios
+
+Cada entrada guarda la lista de entidades devuelta por una consulta junto a
+las tablas que leyó, y solo se invalida cuando un commit modifica alguna de
+ellas. Las entidades se cargan en una sesión propia que se cierra al
+terminar, así que quedan desligadas de cualquier sesión con sus relaciones
+ya cargadas: se comparten entre peticiones e hilos y son de solo lectura.
+"""
+import threading
+import time
+from collections import OrderedDict
+from decimal import ROUND_CEILING, ROUND_FLOOR, Decimal
+from typing import Any, Callable, Dict, FrozenSet, Iterable, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.database.change_tracking import MENU_SCOPE, CommittedChanges, register_commit_listener
+
+_CENT = Decimal("0.01")
+
+def normalize_text(value: Optional[str]) -> Optional[str]:
+    """
+    Sin espacios extremos y en minúsculas; vacío equivale a no filtrar. Los
+    filtros de texto son `ilike`, que compara ``lower()`` de ambos lados, así
+    que el resultado no cambia (``casefold`` sí podría: "ß" pasaría a "ss")
+    """
+    if value is None:
+        return None
+    value = value.strip().lower()
+    return value or None
+
+def normalize_price_bounds(precio_min: Optional[float], precio_max: Optional[float]) -> Tuple[Optional[float], Optional[float]]:
+    """
+    Límites de precio canónicos: los precios tienen dos decimales, así que
+    el mínimo se redondea al céntimo hacia arriba y el máximo hacia abajo
+    (10.001 y 10.01 dan el mismo resultado). Un mínimo <= 0 no filtra nada
+    """
+    if precio_min is not None:
+        precio_min = float(Decimal(str(precio_min)).quantize(_CENT, rounding=ROUND_CEILING))
+        if precio_min <= 0:
+            precio_min = None
+    if precio_max is not None:
+        precio_max = float(Decimal(str(precio_max)).quantize(_CENT, rounding=ROUND_FLOOR))
+    return precio_min, precio_max
+
+def load_detached(db: Session, query: Callable[[Session], Any]) -> Any:
+    """Ejecuta la consulta en una sesión propia y devuelve sus objetos desligados"""
+    with Session(db.get_bind()) as session:
+        return query(session)
+
+class QueryResultCache:
+    """LRU con TTL cuyas entradas se invalidan por tabla"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+        self.evicted = 0
+        self._data: "OrderedDict[str, Tuple[float, FrozenSet[str], Any]]" = OrderedDict()
+        self._keys_by_table: Dict[str, Set[str]] = {}
+        # Generaciones por tabla y global (invalidaciones completas): un
+        # resultado calculado mientras cambiaba alguna de sus tablas no se guarda
+        self._generations: Dict[str, int] = {}
+        self._generation = 0
+        self._applied_version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get_or_load(self, key: str, tables: FrozenSet[str], load: Callable[[], Any]) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] >= time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[2]
+            if item is not None:
+                self._remove(key)
+            self.misses += 1
+            generations = self._snapshot(tables)
+
+        value = load()
+
+        with self._lock:
+            if generations == self._snapshot(tables):
+                self._remove(key)
+                self._data[key] = (time.monotonic() + self.ttl_seconds, tables, value)
+                for table in tables:
+                    self._keys_by_table.setdefault(table, set()).add(key)
+                while len(self._data) > self.max_entries:
+                    self._remove(next(iter(self._data)))
+                    self.evicted += 1
+        return value
+
+    def invalidate(self, tables: Optional[Iterable[str]] = None) -> None:
+        """Invalida las entradas que leen alguna de las tablas (todas si es None)"""
+        with self._lock:
+            self._invalidate(tables)
+
+    def apply_changes(self, changes: CommittedChanges) -> None:
+        """
+        Las versiones de cambios son consecutivas: si falta alguna (commit de
+        otro worker que no se ha visto) no se sabe qué tablas cambiaron y se
+        invalida todo
+        """
+        with self._lock:
+            version = changes.version
+            if version is None:
+                self._invalidate(changes.tables if changes.local and changes.tables else None)
+                return
+            if version <= self._applied_version:
+                if not changes.local:
+                    return
+                self._invalidate(changes.tables or None)
+                return
+            consecutive = version == self._applied_version + 1
+            self._applied_version = version
+            self._invalidate(changes.tables if consecutive and changes.tables else None)
+
+    def sync_version(self, version: Optional[int]) -> None:
+        """
+        Vacía la caché y toma `version` como la última aplicada, para que el
+        primer cambio posterior se pueda invalidar por tablas. Si ya es la
+        aplicada (worker creado con fork tras precargar) se conserva
+        """
+        with self._lock:
+            if version is not None and version == self._applied_version:
+                return
+            self._invalidate(None)
+            if version is not None:
+                self._applied_version = version
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidated": self.invalidated,
+                "evicted": self.evicted,
+            }
+
+    def _snapshot(self, tables: FrozenSet[str]) -> Tuple[int, ...]:
+        return (self._generation, *(self._generations.get(table, 0) for table in sorted(tables)))
+
+    def _invalidate(self, tables: Optional[Iterable[str]]) -> None:
+        if tables is None:
+            self._generation += 1
+            self.invalidated += len(self._data)
+            self._data.clear()
+            self._keys_by_table.clear()
+            return
+        for table in tables:
+            self._generations[table] = self._generations.get(table, 0) + 1
+            for key in list(self._keys_by_table.get(table, ())):
+                if key in self._data:
+                    self._remove(key)
+                    self.invalidated += 1
+
+    def _remove(self, key: str) -> None:
+        item = self._data.pop(key, None)
+        if item is None:
+            return
+        for table in item[1]:
+            keys = self._keys_by_table.get(table)
+            if keys is not None:
+                keys.discard(key)
+
+repository_cache = QueryResultCache(
+    max_entries=settings.repository_cache_max_entries,
+    ttl_seconds=settings.repository_cache_ttl_seconds,
+)
+
+@register_commit_listener
+def _invalidate_repository_cache(changes: CommittedChanges) -> None:
+    if changes.scope == MENU_SCOPE:
+        repository_cache.apply_changes(changes)
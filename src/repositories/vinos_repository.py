@@ -1,18 +1,35 @@
 """
 Repository para manejar queries de vinos
 """
-from typing import List, Optional
-from sqlalchemy.orm import Session, selectinload
-from sqlalchemy import and_
+from typing import Iterator, List, Optional, Sequence
+from sqlalchemy.orm import Session
+from sqlalchemy import Row, func, select
+from src.core.cache import cache_key
 from src.entities.vino import Vino
-from src.entities.categoria_vino import CategoriaVino
-from src.entities.denominacion_origen import DenominacionOrigen
-from src.entities.bodega import Bodega
+from src.core.tracing import traced
+from src.repositories.json_aggregation import JsonAggregation
+from src.repositories.query_cache import load_detached, normalize_price_bounds, normalize_text, repository_cache
+
+# Tablas que lee la consulta de vinos (invalidación de la caché de resultados).
+# Los nombres de tipo, denominación, bodega, enólogo y uvas salen del modelo
+# de lectura de la propia tabla, que se reescribe cuando cambian
+VINOS_TABLES = frozenset({Vino.__tablename__})
+
+# Orden dentro de cada grupo para `sort` (los empates, por id)
+_SORT_COLUMNS = {
+    "precio": (Vino.precio,),
+    "-precio": (Vino.precio.desc(),),
+    "nombre": (Vino.nombre,),
+}
+
+# Grupo de los vinos sin denominación de origen
+SIN_DENOMINACION = "Sin denominación"
 
 class VinosRepository:
     def __init__(self, db: Session) -> None:
         self.db = db
 
+    @traced()
     def get_vinos_with_filters(
         self,
         tipo: Optional[str] = None,
@@ -22,32 +39,123 @@ class VinosRepository:
         incluir_inactivos: bool = False
     ) -> List[Vino]:
         """
-        SOLO query - devuelve lista de objetos Vino
+        SOLO query - devuelve lista de objetos Vino (desligados y de solo
+        lectura si pasan por la caché de resultados)
         """
-        # Construir query base
-        query = (
-            self.db.query(Vino)
-            .join(CategoriaVino)
-            .outerjoin(DenominacionOrigen)  # outerjoin para vinos sin denominación
-            .join(Bodega)
-            .options(
-                selectinload(Vino.uvas),
-                selectinload(Vino.enologo)
+        tipo = normalize_text(tipo)
+        denominacion = normalize_text(denominacion)
+        precio_min, precio_max = normalize_price_bounds(precio_min, precio_max)
+        filters = self._filters(tipo, denominacion, precio_min, precio_max, incluir_inactivos)
+
+        def query(session: Session) -> List[Vino]:
+            return list(session.scalars(
+                select(Vino)
+                .where(*filters)
+                .order_by(Vino.categoria_nombre, Vino.denominacion_nombre, Vino.bodega_nombre)
+            ))
+
+        if not repository_cache.enabled:
+            return query(self.db)
+        key = cache_key(
+            "vinos",
+            tipo=tipo,
+            denominacion=denominacion,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            incluir_inactivos=incluir_inactivos
+        )
+        return repository_cache.get_or_load(key, VINOS_TABLES, lambda: load_detached(self.db, query))
+
+    @traced()
+    def get_vinos_grouped_json(
+        self,
+        tipo: Optional[str] = None,
+        denominacion: Optional[str] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        incluir_inactivos: bool = False
+    ) -> str:
+        """
+        Vinos agrupados por tipo y denominación como documento JSON
+        construido por la base de datos en una sola consulta:
+        ``{"<tipo>": {"<denominacion>": [vino, ...]}}``
+        """
+        tipo = normalize_text(tipo)
+        denominacion = normalize_text(denominacion)
+        precio_min, precio_max = normalize_price_bounds(precio_min, precio_max)
+        agg = JsonAggregation.for_session(self.db)
+
+        denominacion_nombre = func.coalesce(Vino.denominacion_nombre, SIN_DENOMINACION)
+        items = (
+            select(
+                Vino.categoria_nombre.label("tipo"),
+                denominacion_nombre.label("denominacion"),
+                agg.object(
+                    id=Vino.id,
+                    nombre=Vino.nombre,
+                    precio=agg.price(Vino.precio),
+                    precio_unidad=Vino.precio_unidad,
+                    bodega=Vino.bodega_nombre,
+                    uvas=agg.array(Vino.uvas_nombres),
+                    enologo=Vino.enologo_nombre,
+                ).label("item"),
             )
+            .where(*self._filters(tipo, denominacion, precio_min, precio_max, incluir_inactivos))
+            .order_by(Vino.categoria_nombre, denominacion_nombre, Vino.bodega_nombre, Vino.id)
+            .subquery()
         )
-        
+        by_denominacion = (
+            select(items.c.tipo, items.c.denominacion, agg.array_agg(items.c.item).label("vinos"))
+            .group_by(items.c.tipo, items.c.denominacion)
+            .subquery()
+        )
+        by_tipo = (
+            select(
+                by_denominacion.c.tipo,
+                agg.object_agg(by_denominacion.c.denominacion, by_denominacion.c.vinos).label("denominaciones"),
+            )
+            .group_by(by_denominacion.c.tipo)
+            .subquery()
+        )
+        document = self.db.execute(select(agg.object_agg(by_tipo.c.tipo, by_tipo.c.denominaciones))).scalar()
+        return document or "{}"
+
+    def get_vinos_by_ids(self, ids: Sequence[int]) -> List[Vino]:
+        """
+        Vinos visibles en la API pública (activos y con bodega) con los ids
+        dados, en una sola consulta IN
+        """
+        if not ids:
+            return []
+        return list(self.db.scalars(
+            select(Vino)
+            .where(Vino.id.in_(ids), Vino.is_active == True, Vino.bodega_id.isnot(None))
+        ))
+
+    def _filters(
+        self,
+        tipo: Optional[str],
+        denominacion: Optional[str],
+        precio_min: Optional[float],
+        precio_max: Optional[float],
+        incluir_inactivos: bool
+    ) -> list:
+        """
+        Condiciones comunes a las consultas de vinos
+        """
         # Aplicar filtros básicos
-        filters = []
+        # Solo vinos con bodega (antes lo imponía el join con bodegas)
+        filters = [Vino.bodega_id.isnot(None)]
         
         # Filtro por estado activo (por defecto solo activos)
         if not incluir_inactivos:
             filters.append(Vino.is_active == True)
 
         if tipo:
-            filters.append(CategoriaVino.nombre.ilike(f"%{tipo}%"))
+            filters.append(Vino.categoria_nombre.ilike(f"%{tipo}%"))
         
         if denominacion:
-            filters.append(DenominacionOrigen.nombre.ilike(f"%{denominacion}%"))
+            filters.append(Vino.denominacion_nombre.ilike(f"%{denominacion}%"))
         
         if precio_min is not None:
             filters.append(Vino.precio >= precio_min)
@@ -55,7 +163,37 @@ class VinosRepository:
         if precio_max is not None:
             filters.append(Vino.precio <= precio_max)
         
-        if filters:
-            query = query.filter(and_(*filters))
-        
-        return query.order_by(CategoriaVino.nombre, DenominacionOrigen.nombre, Bodega.nombre).all()
\ No newline at end of file
+        return filters
+
+    def iter_vinos_rows(
+        self,
+        tipo: Optional[str] = None,
+        denominacion: Optional[str] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        sort: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[Row]:
+        """
+        Una fila por vino con cursor de servidor, ordenadas por tipo,
+        denominación, bodega y vino (con `sort`, por tipo, denominación y
+        ese orden)
+        """
+        order = (Vino.categoria_nombre, Vino.denominacion_nombre, *_SORT_COLUMNS.get(sort, (Vino.bodega_nombre,)), Vino.id)
+        query = (
+            select(
+                Vino.id,
+                Vino.nombre,
+                Vino.precio,
+                Vino.precio_unidad,
+                Vino.categoria_nombre.label("tipo"),
+                Vino.denominacion_nombre.label("denominacion"),
+                Vino.bodega_nombre.label("bodega"),
+                Vino.enologo_nombre.label("enologo"),
+                Vino.uvas_nombres.label("uvas"),
+            )
+            .where(*self._filters(tipo, denominacion, precio_min, precio_max, False))
+            .order_by(*order)
+            .execution_options(stream_results=True, yield_per=batch_size)
+        )
+        return iter(self.db.execute(query))
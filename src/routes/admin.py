@@ -1,10 +1,26 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import date
+from typing import Literal, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, File, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 from sqlalchemy.orm import Session
+from src.auth.dependencies import get_current_admin_user
+from src.core.config import settings
 from src.database import get_db
+from src.auth.token_registry import TokenUser
+from src.middleware.concurrency import route_limiters
+from src.middleware.profiling import list_profiles, profile_path
 from src.repositories.menu_repository import MenuRepository
+from src.repositories.query_cache import repository_cache
+from src.schemas.import_schema import ImportSummary
 from src.schemas.menu_schema import PlatosGroupedResponse
 from src.schemas.wines_schema import VinosGroupedResponse
+from src.services.archival_service import ArchivalService
+from src.services.export_service import export_stream
+from src.services.import_service import ImportService
+from src.services.catalog_service import catalog_store
+from src.services.menu_cache import menu_cache
+from src.services.publication_service import PublicationService
+from src.jobs.export_snapshots import run_snapshot_export
 
 router = APIRouter(prefix="/admin", tags=["Admin"])
 @router.get(
@@ -12,3 +28,230 @@ router = APIRouter(prefix="/admin", tags=["Admin"])
 )
 async def saludo():
     return {"mensaje": "Hola, Admin!"}
+
+@router.post(
+    "/archivo/ejecutar",
+    summary="Archivar registros eliminados",
+    description="Mueve a las tablas de archivo los platos y vinos eliminados lógicamente hace más del periodo de retención"
+)
+def ejecutar_archivado(
+    retention_days: Optional[int] = Query(
+        None,
+        ge=0,
+        description="Días desde el borrado lógico (por defecto el configurado)"
+    ),
+    db: Session = Depends(get_db),
+    _: TokenUser = Depends(get_current_admin_user)
+):
+    archivados = ArchivalService(db).archive_soft_deleted(retention_days=retention_days)
+    return {"archivados": archivados}
+
+@router.post(
+    "/archivo/{entidad}/{item_id}/restaurar",
+    summary="Restaurar un registro archivado",
+    description="Devuelve un plato o vino archivado a la tabla principal junto con sus relaciones"
+)
+def restaurar_archivado(
+    entidad: Literal["platos", "vinos"],
+    item_id: int,
+    reactivar: bool = Query(False, description="Marcar el registro como activo tras restaurarlo"),
+    db: Session = Depends(get_db),
+    _: TokenUser = Depends(get_current_admin_user)
+):
+    if not ArchivalService(db).restore(entidad, item_id, reactivar=reactivar):
+        raise HTTPException(status_code=404, detail=f"No existe {entidad} archivado con id {item_id}")
+    return {"restaurado": True, "entidad": entidad, "id": item_id}
+
+@router.get(
+    "/metricas/concurrencia",
+    summary="Métricas del limitador de concurrencia",
+    description="Límite actual, peticiones en curso y en cola, descartes y tiempos en cola por grupo de rutas"
+)
+async def metricas_concurrencia(_: TokenUser = Depends(get_current_admin_user)):
+    return {group: limiter.stats() for group, limiter in route_limiters.items()}
+
+@router.get(
+    "/metricas/cache",
+    summary="Métricas de las cachés",
+    description="Aciertos, fallos e invalidaciones de la caché de respuestas del menú y de la de resultados de los repositorios"
+)
+async def metricas_cache(_: TokenUser = Depends(get_current_admin_user)):
+    return {"menu": menu_cache.stats(), "repositorios": repository_cache.stats()}
+
+@router.post(
+    "/snapshots",
+    status_code=202,
+    summary="Regenerar la exportación estática del menú",
+    description="Lanza en segundo plano la exportación de /public/platos y /public/vinos a ficheros estáticos"
+)
+async def regenerar_snapshots(
+    background_tasks: BackgroundTasks,
+    force: bool = Query(False, description="Regenerar todos los presets aunque no hayan cambiado"),
+    _: TokenUser = Depends(get_current_admin_user)
+):
+    background_tasks.add_task(run_snapshot_export, force=force)
+    return {"mensaje": "Exportación programada"}
+
+@router.get(
+    "/perfiles",
+    summary="Perfiles de peticiones guardados",
+    description="Perfiles capturados con la cabecera X-Profile, del más reciente al más antiguo"
+)
+async def listar_perfiles(_: TokenUser = Depends(get_current_admin_user)):
+    return {"perfiles": list_profiles()}
+
+@router.get(
+    "/perfiles/{profile_id}",
+    summary="Descargar un perfil",
+    description="Perfil en formato JSON de speedscope (https://www.speedscope.app)"
+)
+async def descargar_perfil(profile_id: str, _: TokenUser = Depends(get_current_admin_user)):
+    path = profile_path(profile_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No existe el perfil {profile_id}")
+    return FileResponse(path, media_type="application/json", filename=path.name)
+
+@router.get(
+    "/exportar/{entidad}",
+    response_class=StreamingResponse,
+    summary="Exportar platos o vinos completos",
+    description="CSV o NDJSON con todos los registros, incluidos los inactivos y los campos de auditoría"
+)
+async def exportar(
+    entidad: Literal["platos", "vinos"],
+    formato: Literal["csv", "ndjson"] = Query("csv", description="Formato de salida"),
+    _: TokenUser = Depends(get_current_admin_user)
+):
+    """
+    Descarga por partes el listado completo, ordenado por id.
+    
+    En CSV las listas (alérgenos, uvas) van separadas por `|` y los booleanos
+    como 0/1; en NDJSON hay un objeto JSON por línea.
+    """
+    media_type = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
+    filename = f"{entidad}-{date.today().isoformat()}.{formato}"
+    return StreamingResponse(
+        export_stream(entidad, formato, settings.export_batch_size),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.post(
+    "/importar/{entidad}",
+    response_model=ImportSummary,
+    summary="Importar platos o vinos desde CSV",
+    description="Crea o actualiza registros en lotes a partir de un CSV con el formato de /admin/exportar"
+)
+def importar(
+    entidad: Literal["platos", "vinos"],
+    fichero: UploadFile = File(..., description="CSV en UTF-8 separado por comas, punto y coma o tabuladores"),
+    dry_run: bool = Query(False, description="Validar y calcular el resumen sin guardar nada"),
+    crear_referencias: bool = Query(
+        False,
+        description="Crear las categorías, bodegas, uvas... que no existan en lugar de rechazar la fila"
+    ),
+    db: Session = Depends(get_db),
+    _: TokenUser = Depends(get_current_admin_user)
+):
+    """
+    Las filas con `id` actualizan ese registro; sin `id` se buscan por nombre
+    (y categoría o bodega si vienen en el fichero) y, si no existen, se crean.
+    
+    Solo se modifican las columnas presentes en el CSV, así que basta con
+    `nombre;precio` para actualizar una lista de precios. Las filas que no
+    cambian nada no generan escrituras.
+    """
+    service = ImportService(
+        db,
+        batch_size=settings.import_batch_size,
+        create_references=crear_referencias,
+        dry_run=dry_run
+    )
+    try:
+        return service.import_csv(entidad, fichero.file)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"CSV no válido: {e}")
+
+def _publicacion_resumen(publicacion) -> dict:
+    return {
+        "version": publicacion.id,
+        "autor": publicacion.autor,
+        "nota": publicacion.nota,
+        "platos": publicacion.platos_total,
+        "vinos": publicacion.vinos_total,
+        "creada": publicacion.created_at,
+    }
+
+def _require_publication() -> None:
+    if not settings.menu_publication_enabled:
+        raise HTTPException(
+            status_code=409,
+            detail="Las publicaciones del menú están desactivadas (MENU_PUBLICATION_ENABLED): los cambios se publican al guardarlos"
+        )
+
+@router.post(
+    "/menu/publicar",
+    summary="Publicar el menú",
+    description="Publica como una nueva versión los platos y vinos actuales (el borrador)"
+)
+def publicar_menu(
+    background_tasks: BackgroundTasks,
+    nota: Optional[str] = Query(None, max_length=200, description="Descripción de los cambios publicados"),
+    db: Session = Depends(get_db),
+    user: TokenUser = Depends(get_current_admin_user)
+):
+    """
+    La carta pública pasa de golpe a la nueva versión: hasta entonces los
+    cambios en platos y vinos no son visibles.
+    """
+    _require_publication()
+    publicacion = PublicationService(db).publish(autor=user.username, nota=nota)
+    # Este worker cambia de versión ya; los demás al recibir el aviso del commit
+    catalog_store.refresh()
+    # La exportación estática sigue a la versión publicada, no al borrador
+    background_tasks.add_task(run_snapshot_export)
+    return _publicacion_resumen(publicacion)
+
+@router.get(
+    "/menu/publicaciones",
+    summary="Versiones publicadas del menú",
+    description="Publicaciones del menú, de la más reciente a la más antigua"
+)
+def listar_publicaciones(
+    limite: int = Query(50, ge=1, le=500, description="Número máximo de versiones"),
+    db: Session = Depends(get_db),
+    _: TokenUser = Depends(get_current_admin_user)
+):
+    _require_publication()
+    return {"publicaciones": [_publicacion_resumen(p) for p in PublicationService(db).list_publications(limite)]}
+
+@router.get(
+    "/menu/borrador",
+    summary="Cambios pendientes de publicar",
+    description="IDs de platos y vinos nuevos, modificados y retirados respecto a la última versión publicada"
+)
+def cambios_borrador(
+    db: Session = Depends(get_db),
+    _: TokenUser = Depends(get_current_admin_user)
+):
+    _require_publication()
+    return PublicationService(db).draft_changes()
+
+@router.post(
+    "/menu/publicaciones/{version}/restaurar",
+    summary="Volver a publicar una versión anterior",
+    description="Publica como una nueva versión el contenido de una versión anterior (el borrador no cambia)"
+)
+def restaurar_publicacion(
+    version: int,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db),
+    user: TokenUser = Depends(get_current_admin_user)
+):
+    _require_publication()
+    publicacion = PublicationService(db).restore(version, autor=user.username)
+    if publicacion is None:
+        raise HTTPException(status_code=404, detail=f"No existe la versión {version} del menú")
+    catalog_store.refresh()
+    background_tasks.add_task(run_snapshot_export)
+    return _publicacion_resumen(publicacion)
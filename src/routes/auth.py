@@ -0,0 +1,45 @@
+import math
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+from src.auth.service import AuthService
+from src.database import get_db
+from src.middleware.rate_limit import login_rate_limiter
+from src.schemas.auth_schema import TokenResponse
+
+router = APIRouter(prefix="/auth", tags=["Auth"])
+
+@router.post(
+    "/token",
+    response_model=TokenResponse,
+    summary="Obtener token de acceso",
+    description="Autentica con usuario y contraseña (formulario OAuth2) y devuelve un token JWT"
+)
+def login(
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: Session = Depends(get_db)
+):
+    # Límite por usuario, además del límite por IP del middleware
+    wait = login_rate_limiter.consume(form_data.username.strip().casefold())
+    if wait > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Demasiados intentos de acceso, vuelve a intentarlo más tarde",
+            headers={"Retry-After": str(max(1, math.ceil(wait)))},
+        )
+    
+    user = AuthService.authenticate_user(db, form_data.username, form_data.password)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario o contraseña incorrectos",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Usuario inactivo"
+        )
+    
+    access_token = AuthService.create_access_token(data=AuthService.token_claims(user))
+    return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+from src.services.warmup_service import database_status, warmup
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+@router.get(
+    "/live",
+    summary="Comprobación de vida",
+    description="Responde mientras el proceso atiende peticiones, sin tocar la base de datos"
+)
+async def live():
+    return {"estado": "ok"}
+
+@router.get(
+    "/ready",
+    summary="Comprobación de disponibilidad",
+    description="200 cuando el worker ha terminado el calentamiento y la base de datos responde; 503 en otro caso"
+)
+async def ready():
+    """
+    Incluye la duración y los pasos del calentamiento y el estado actual de
+    la base de datos y del pool de conexiones.
+    """
+    status = await run_in_threadpool(database_status)
+    listo = warmup.ready and status["base_datos"]["ok"]
+    body = {
+        "estado": "listo" if listo else ("calentando" if not warmup.ready else "sin_base_datos"),
+        "calentamiento": warmup.status(),
+        **status,
+    }
+    return JSONResponse(body, status_code=200 if listo else 503)
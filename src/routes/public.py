@@ -1,21 +1,70 @@
-from typing import Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Callable, Iterator, List, Literal, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import Response, StreamingResponse
 from sqlalchemy.orm import Session
-from src.database import get_db
+from src.core.config import settings
+from src.core.tracing import traced
+from src.database import SessionLocal, get_db
+from src.services.menu_events import menu_event_broker
+from src.services.catalog_service import CatalogService
+from src.services.fuzzy_search import SEARCH_FIELDS, vinos_search
 from src.services.menu_service import MenuService
+from src.services.pairing_service import pairing_index
 from src.services.vinos_service import VinosService
-from src.schemas.menu_schema import PlatosGroupedResponse
-from src.schemas.wines_schema import VinosGroupedResponse
+from src.schemas.menu_schema import (
+    FacetsResponse, MaridajeResponse, PlatoDetalleResponse, PlatosGroupedResponse, PlatosLoteResponse
+)
+from src.schemas.wines_schema import BusquedaVinosResponse, VinoDetalleResponse, VinosGroupedResponse, VinosLoteResponse
 
 router = APIRouter(prefix="/public", tags=["Public"])
 
+# Valores de `sort` (catalog_service.SORT_OPTIONS)
+SortOption = Literal["precio", "-precio", "nombre"]
+
+def _streaming_response(build: Callable[[Session], Iterator[bytes]]) -> StreamingResponse:
+    """
+    Respuesta JSON por partes con su propia sesión: la de `get_db` puede
+    cerrarse antes de que termine de enviarse el cuerpo
+    """
+    def body() -> Iterator[bytes]:
+        db = SessionLocal()
+        try:
+            yield from build(db)
+        finally:
+            db.close()
+    
+    return StreamingResponse(body(), media_type="application/json")
+
+def _grouped_json_response(root: str, document: str) -> Response:
+    """Respuesta agrupada con el documento JSON que ha construido la base de datos"""
+    return Response(content=f'{{"{root}":{document}}}'.encode("utf-8"), media_type="application/json")
+
+def _parse_ids(ids: List[str]) -> List[int]:
+    """IDs separados por comas o en parámetros repetidos, sin repetidos y en el orden dado"""
+    try:
+        parsed = list(dict.fromkeys(int(part) for value in ids for part in value.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids debe ser una lista de enteros separados por comas")
+    if not parsed:
+        raise HTTPException(status_code=422, detail="ids no puede estar vacío")
+    if len(parsed) > settings.lote_max_ids:
+        raise HTTPException(status_code=422, detail=f"Como máximo {settings.lote_max_ids} ids por petición")
+    return parsed
+
+def _item_response(entidad: str, item_id: int, db: Session) -> Response:
+    data = CatalogService(db=db).get_items_json(entidad, [item_id]).get(item_id)
+    if data is None:
+        raise HTTPException(status_code=404, detail=f"No existe el {entidad[:-1]} {item_id}")
+    return Response(content=data, media_type="application/json")
+
 @router.get(
     "/platos",
     response_model=PlatosGroupedResponse,
     summary="Obtener platos agrupados por categoría",
     description="Devuelve todos los platos agrupados por categoría con filtros opcionales"
 )
-async def get_platos(
+@traced("route.get_platos")
+def get_platos(
     db: Session = Depends(get_db),
     categoria: Optional[str] = Query(
         None, 
@@ -38,6 +87,15 @@ async def get_platos(
         ge=0,
         description="Precio máximo en euros",
         example=25.0
+    ),
+    sort: Optional[SortOption] = Query(
+        None,
+        description="Orden dentro de cada grupo: precio, -precio (descendente) o nombre (sin distinguir tildes)",
+        example="precio"
+    ),
+    stream: bool = Query(
+        False,
+        description="Enviar la respuesta por partes (catálogos muy grandes, sin caché)"
     )
 ):
     """
@@ -47,6 +105,8 @@ async def get_platos(
     - **categoria**: Busca categorías que contengan este texto
     - **precio_min**: Filtra platos con precio mayor o igual
     - **precio_max**: Filtra platos con precio menor o igual
+    - **sort**: Ordena los platos de cada categoría por precio o nombre
+    - **stream**: Escribe el JSON por partes mientras lee la base de datos
     
     **Estructura de respuesta:**
     ```json
@@ -65,26 +125,114 @@ async def get_platos(
     }
     ```
     """
+    # Con publicaciones se sirve la versión publicada, nunca las tablas (el borrador)
+    if settings.menu_publication_enabled:
+        body = CatalogService().get_listing_json(
+            "platos",
+            sort=sort,
+            categoria=categoria,
+            sugerencias=sugerencias,
+            precio_min=precio_min,
+            precio_max=precio_max
+        )
+        return Response(content=body, media_type="application/json")
+
+    if stream:
+        return _streaming_response(lambda session: MenuService(session).stream_platos_public(
+            categoria=categoria,
+            sugerencias=sugerencias,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            sort=sort,
+            batch_size=settings.stream_batch_size
+        ))
+    
+    # La agregación en SQL no garantiza el orden de los registros
+    if settings.sql_json_aggregation and sort is None:
+        document = MenuService(db).get_platos_public_json(
+            categoria=categoria,
+            sugerencias=sugerencias,
+            precio_min=precio_min,
+            precio_max=precio_max
+        )
+        if document is not None:
+            return _grouped_json_response("platos", document)
+    
     try:
         menu_repo = MenuService(db)
         platos_agrupados = menu_repo.get_platos_public(
             categoria=categoria,
             sugerencias=sugerencias,
             precio_min=precio_min,
-            precio_max=precio_max
+            precio_max=precio_max,
+            sort=sort
         )
         return {"platos": platos_agrupados}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener platos: {str(e)}")
 
+@router.get(
+    "/platos/lote",
+    response_model=PlatosLoteResponse,
+    summary="Obtener varios platos por id",
+    description="Devuelve los platos públicos con los ids dados, en el mismo orden, y los ids no encontrados"
+)
+@traced("route.get_platos_lote")
+def get_platos_lote(
+    ids: List[str] = Query(..., description="IDs separados por comas (o ?ids=1&ids=4)", example=["1,4,7"]),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene varios platos en una sola petición.
+    
+    Los ids repetidos se devuelven una vez; los que no existen o no están
+    activos (salvo sugerencias) se listan en `no_encontrados`.
+    """
+    body = CatalogService(db=db).get_lote_json("platos", _parse_ids(ids))
+    return Response(content=body, media_type="application/json")
+
+@router.get(
+    "/platos/{plato_id}",
+    response_model=PlatoDetalleResponse,
+    summary="Obtener un plato por id",
+    description="Devuelve un plato activo o sugerido con su categoría"
+)
+@traced("route.get_plato")
+def get_plato(plato_id: int, db: Session = Depends(get_db)):
+    """
+    Obtiene un plato por su id, desde el catálogo en memoria si está al día.
+    """
+    return _item_response("platos", plato_id, db)
+
+@router.get(
+    "/platos/{plato_id}/maridaje",
+    response_model=MaridajeResponse,
+    summary="Vinos sugeridos para un plato",
+    description="Devuelve los vinos activos que mejor maridan con el plato, de un índice precalculado"
+)
+@traced("route.get_maridaje")
+def get_maridaje(plato_id: int):
+    """
+    Obtiene los vinos sugeridos para un plato.
+    
+    La afinidad combina el perfil del plato (categoría, descripción,
+    alérgenos) con el del vino (tipo, uvas, denominación) y su franja de
+    precio. El índice se recalcula tras cada cambio en la carta.
+    """
+    vinos = pairing_index.get(plato_id)
+    if vinos is None:
+        raise HTTPException(status_code=404, detail=f"No existe el plato {plato_id}")
+    return {"plato_id": plato_id, "vinos": vinos}
+
 @router.get(
     "/vinos",
     response_model=VinosGroupedResponse,
     summary="Obtener vinos agrupados por tipo y denominación",
     description="Devuelve todos los vinos agrupados por tipo y denominación de origen con filtros opcionales"
 )
-async def get_vinos(
+@traced("route.get_vinos")
+def get_vinos(
     db: Session = Depends(get_db),
     tipo: Optional[str] = Query(
         None,
@@ -107,6 +255,15 @@ async def get_vinos(
         ge=0,
         description="Precio máximo en euros",
         example=50.0
+    ),
+    sort: Optional[SortOption] = Query(
+        None,
+        description="Orden dentro de cada grupo: precio, -precio (descendente) o nombre (sin distinguir tildes)",
+        example="precio"
+    ),
+    stream: bool = Query(
+        False,
+        description="Enviar la respuesta por partes (catálogos muy grandes, sin caché)"
     )
 ):
     """
@@ -117,6 +274,8 @@ async def get_vinos(
     - **denominacion**: Busca denominaciones que contengan este texto
     - **precio_min**: Filtra vinos con precio mayor o igual
     - **precio_max**: Filtra vinos con precio menor o igual
+    - **sort**: Ordena los vinos de cada denominación por precio o nombre
+    - **stream**: Escribe el JSON por partes mientras lee la base de datos
     
     **Estructura de respuesta:**
     ```json
@@ -138,15 +297,206 @@ async def get_vinos(
     }
     ```
     """
+    # Con publicaciones se sirve la versión publicada, nunca las tablas (el borrador)
+    if settings.menu_publication_enabled:
+        body = CatalogService().get_listing_json(
+            "vinos",
+            sort=sort,
+            tipo=tipo,
+            denominacion=denominacion,
+            precio_min=precio_min,
+            precio_max=precio_max
+        )
+        return Response(content=body, media_type="application/json")
+
+    if stream:
+        return _streaming_response(lambda session: VinosService(session).stream_vinos_public(
+            tipo=tipo,
+            denominacion=denominacion,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            sort=sort,
+            batch_size=settings.stream_batch_size
+        ))
+    
+    # La agregación en SQL no garantiza el orden de los registros
+    if settings.sql_json_aggregation and sort is None:
+        document = VinosService(db).get_vinos_public_json(
+            tipo=tipo,
+            denominacion=denominacion,
+            precio_min=precio_min,
+            precio_max=precio_max
+        )
+        if document is not None:
+            return _grouped_json_response("vinos", document)
+    
     try:
         vinos_service = VinosService(db)
         vinos_agrupados = vinos_service.get_vinos_public(
             tipo=tipo,
             denominacion=denominacion,
             precio_min=precio_min,
-            precio_max=precio_max
+            precio_max=precio_max,
+            sort=sort
         )
         return {"vinos": vinos_agrupados}
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error al obtener vinos: {str(e)}")
+
+@router.get(
+    "/vinos/lote",
+    response_model=VinosLoteResponse,
+    summary="Obtener varios vinos por id",
+    description="Devuelve los vinos públicos con los ids dados, en el mismo orden, y los ids no encontrados"
+)
+@traced("route.get_vinos_lote")
+def get_vinos_lote(
+    ids: List[str] = Query(..., description="IDs separados por comas (o ?ids=2&ids=3)", example=["2,3,5"]),
+    db: Session = Depends(get_db)
+):
+    """
+    Obtiene varios vinos en una sola petición.
+    
+    Los ids repetidos se devuelven una vez; los que no existen, no están
+    activos o no tienen bodega se listan en `no_encontrados`.
+    """
+    body = CatalogService(db=db).get_lote_json("vinos", _parse_ids(ids))
+    return Response(content=body, media_type="application/json")
+
+@router.get(
+    "/vinos/buscar",
+    response_model=BusquedaVinosResponse,
+    summary="Búsqueda aproximada de vinos",
+    description="Devuelve los vinos, bodegas, uvas, enólogos y denominaciones más parecidos al texto, tolerando erratas"
+)
+@traced("route.buscar_vinos")
+def buscar_vinos(
+    q: str = Query(..., min_length=2, max_length=100, description="Texto a buscar", example="tempranilo"),
+    campos: Optional[str] = Query(
+        None,
+        description="Campos separados por comas (vino, bodega, uva, enologo, denominacion); por defecto, todos",
+        example="bodega,uva"
+    ),
+    limite: int = Query(10, ge=1, le=50, description="Número máximo de resultados")
+):
+    """
+    Busca por parecido, sin distinguir tildes ni mayúsculas y tolerando
+    erratas y nombres incompletos ("tempranilo", "Riscal", "Hurtado").
+    
+    Cada resultado indica el campo y el valor encontrado, su puntuación y
+    los ids de los vinos públicos que lo tienen, listos para
+    `/public/vinos/lote`. Se sirve desde un índice de trigramas en memoria
+    que se reconstruye con el catálogo tras cada cambio en la carta.
+    """
+    selected = tuple(SEARCH_FIELDS)
+    if campos:
+        selected = tuple(dict.fromkeys(part.strip() for part in campos.split(",") if part.strip()))
+        unknown = [campo for campo in selected if campo not in SEARCH_FIELDS]
+        if unknown or not selected:
+            raise HTTPException(
+                status_code=422,
+                detail=f"campos debe ser una lista de: {', '.join(SEARCH_FIELDS)}"
+            )
+    resultados = vinos_search.search(
+        q,
+        campos=selected,
+        limite=limite,
+        min_score=settings.fuzzy_min_score,
+        max_ids=settings.lote_max_ids
+    )
+    return {"q": q, "resultados": resultados}
+
+@router.get(
+    "/vinos/{vino_id}",
+    response_model=VinoDetalleResponse,
+    summary="Obtener un vino por id",
+    description="Devuelve un vino activo con su tipo y denominación de origen"
+)
+@traced("route.get_vino")
+def get_vino(vino_id: int, db: Session = Depends(get_db)):
+    """
+    Obtiene un vino por su id, desde el catálogo en memoria si está al día.
+    """
+    return _item_response("vinos", vino_id, db)
+
+@router.get(
+    "/facets",
+    response_model=FacetsResponse,
+    summary="Recuentos por faceta para los filtros de la carta",
+    description="Devuelve cuántos platos o vinos hay por cada valor de faceta dentro del resultado filtrado"
+)
+@traced("route.get_facets")
+def get_facets(
+    entidad: Literal["platos", "vinos"] = Query("vinos", description="Entidad sobre la que contar"),
+    categoria: Optional[str] = Query(None, description="Platos: categoría (búsqueda parcial)"),
+    sugerencias: Optional[bool] = Query(None, description="Platos: solo sugerencias"),
+    tipo: Optional[str] = Query(None, description="Vinos: tipo (búsqueda parcial)"),
+    denominacion: Optional[str] = Query(None, description="Vinos: denominación de origen (búsqueda parcial)"),
+    bodega: Optional[str] = Query(None, description="Vinos: bodega (búsqueda parcial)"),
+    uva: Optional[str] = Query(None, description="Vinos: variedad de uva (búsqueda parcial)"),
+    precio_min: Optional[float] = Query(None, ge=0, description="Precio mínimo en euros"),
+    precio_max: Optional[float] = Query(None, ge=0, description="Precio máximo en euros")
+):
+    """
+    Recuentos para construir los filtros de la carta.
+    
+    **Facetas:**
+    - **platos**: `categoria`, `alergeno`, `precio`
+    - **vinos**: `tipo`, `denominacion`, `bodega`, `uva`, `precio`
+    
+    Los filtros usan el mismo criterio que `/public/platos` y `/public/vinos`
+    y los recuentos se calculan sobre el resultado filtrado. Se sirven desde
+    el catálogo en memoria, sin consultas a la base de datos.
+    """
+    total, facets = CatalogService().get_facets(
+        entidad,
+        categoria=categoria,
+        sugerencias=sugerencias,
+        tipo=tipo,
+        denominacion=denominacion,
+        bodega=bodega,
+        uva=uva,
+        precio_min=precio_min,
+        precio_max=precio_max
+    )
+    return {"entidad": entidad, "total": total, "facets": facets}
+
+@router.get(
+    "/eventos",
+    response_class=StreamingResponse,
+    summary="Suscribirse a las actualizaciones del menú",
+    description="Canal Server-Sent Events que notifica cada nueva versión del menú"
+)
+async def menu_events(
+    last_event_id: Optional[str] = Header(
+        None,
+        alias="Last-Event-ID",
+        description="Última versión recibida (la envía el navegador al reconectar)"
+    )
+):
+    """
+    Mantiene abierta una conexión `text/event-stream` y envía un evento
+    `menu-version` cada vez que se confirma un cambio en platos, vinos o
+    tablas auxiliares. Al conectar se envía la versión actual.
+    
+    **Formato de evento:**
+    ```text
+    id: 42
+    event: menu-version
+    data: {"version": 42, "tablas": ["platos"], "entidades": {"platos": [7]}}
+    ```
+    
+    Los clientes solo necesitan volver a pedir `/public/platos` o
+    `/public/vinos` cuando cambia la versión.
+    """
+    try:
+        last_version = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_version = None
+    
+    return StreamingResponse(
+        menu_event_broker.stream(last_version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
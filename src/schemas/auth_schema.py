@@ -0,0 +1,9 @@
+"""
+Schemas para la autenticación
+"""
+from pydantic import BaseModel, Field
+
+class TokenResponse(BaseModel):
+    """Modelo de respuesta del login"""
+    access_token: str = Field(..., description="Token JWT de acceso")
+    token_type: str = Field("bearer", description="Tipo de token")
@@ -0,0 +1,99 @@
+"""
+Schemas para la importación masiva de platos y vinos desde CSV
+"""
+from decimal import Decimal
+from typing import List, Optional
+from pydantic import BaseModel, ConfigDict, Field, field_validator
+
+# Separador de los valores de listas (alérgenos, uvas), igual que en la exportación
+LIST_SEPARATOR = "|"
+
+class ImportRowBase(BaseModel):
+    """
+    Fila de CSV. Todos los campos son opcionales: las columnas que no
+    aparecen en el fichero no se modifican en los registros existentes
+    """
+    model_config = ConfigDict(extra="ignore", str_strip_whitespace=True)
+
+    id: Optional[int] = Field(None, description="ID del registro a actualizar")
+    nombre: Optional[str] = Field(None, min_length=1, max_length=100)
+    precio: Optional[Decimal] = Field(None, ge=0, max_digits=10, decimal_places=2)
+    precio_unidad: Optional[str] = Field(None, max_length=20)
+    is_active: Optional[bool] = None
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _empty_as_none(cls, value):
+        if isinstance(value, str) and not value.strip():
+            return None
+        return value
+
+    @field_validator("precio", mode="before")
+    @classmethod
+    def _decimal_comma(cls, value):
+        # Las hojas de cálculo en español exportan "12,50"
+        if isinstance(value, str):
+            return value.strip().replace(",", ".")
+        return value
+
+    @field_validator("is_active", mode="before")
+    @classmethod
+    def _is_active_bool(cls, value):
+        return _spanish_bool(value)
+
+def _spanish_bool(value):
+    """Además de 1/0, true/false y yes/no, acepta sí/si"""
+    if isinstance(value, str) and value.strip().lower() in ("si", "sí"):
+        return True
+    return value
+
+def _split_list(value):
+    """Celda "a|b|c" -> ["a", "b", "c"]; una celda vacía es una lista vacía"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(LIST_SEPARATOR) if item.strip()]
+    return value
+
+class PlatoImportRow(ImportRowBase):
+    descripcion: Optional[str] = None
+    sugerencias: Optional[bool] = None
+    categoria: Optional[str] = None
+    alergenos: Optional[List[str]] = None
+
+    @field_validator("sugerencias", mode="before")
+    @classmethod
+    def _sugerencias_bool(cls, value):
+        return _spanish_bool(value)
+
+    @field_validator("alergenos", mode="before")
+    @classmethod
+    def _alergenos_list(cls, value):
+        return _split_list(value)
+
+class VinoImportRow(ImportRowBase):
+    tipo: Optional[str] = None
+    bodega: Optional[str] = None
+    denominacion: Optional[str] = None
+    enologo: Optional[str] = None
+    uvas: Optional[List[str]] = None
+
+    @field_validator("uvas", mode="before")
+    @classmethod
+    def _uvas_list(cls, value):
+        return _split_list(value)
+
+class ImportRowError(BaseModel):
+    linea: int = Field(..., description="Línea del fichero (la cabecera es la 1)")
+    error: str = Field(..., description="Motivo por el que no se importó la fila")
+
+class ImportSummary(BaseModel):
+    """Resultado de una importación"""
+    entidad: str
+    filas: int = Field(..., description="Filas leídas (sin la cabecera)")
+    creados: int
+    actualizados: int
+    sin_cambios: int = Field(..., description="Filas cuyo contenido ya coincidía con la base de datos")
+    con_errores: int
+    errores: List[ImportRowError] = Field(default_factory=list, description="Primeros errores encontrados")
+    dry_run: bool = Field(..., description="Si es true no se ha guardado nada")
@@ -13,6 +13,42 @@ class PlatoResponse(BaseModel):
     precio_unidad: Optional[str] = Field(None, description="Unidad del precio, e.g., 'ración', 'Kg'")
     alergenos: List[str] = Field(default_factory=list, description="Lista de alérgenos")
 
+class PlatoDetalleResponse(PlatoResponse):
+    """Modelo de respuesta para un plato consultado por id"""
+    categoria: str = Field(..., description="Categoría del plato")
+
+class PlatosLoteResponse(BaseModel):
+    """Modelo de respuesta para varios platos consultados por id"""
+    platos: List[PlatoDetalleResponse] = Field(..., description="Platos encontrados, en el orden pedido")
+    no_encontrados: List[int] = Field(default_factory=list, description="IDs que no existen o no son públicos")
+
 class PlatosGroupedResponse(BaseModel):
     """Modelo de respuesta para platos agrupados"""
     platos: Dict[str, List[PlatoResponse]] = Field(..., description="Platos agrupados por categoría")
+
+class VinoMaridajeResponse(BaseModel):
+    """Vino sugerido para un plato"""
+    id: int = Field(..., description="ID único del vino")
+    nombre: str = Field(..., description="Nombre del vino")
+    precio: Optional[float] = Field(None, description="Precio del vino en euros")
+    precio_unidad: Optional[str] = Field(None, description="Unidad del precio, e.g., 'copa', 'botella'")
+    tipo: Optional[str] = Field(None, description="Tipo de vino")
+    denominacion: Optional[str] = Field(None, description="Denominación de origen")
+    bodega: Optional[str] = Field(None, description="Nombre de la bodega")
+    uvas: List[str] = Field(default_factory=list, description="Variedades de uva")
+    enologo: Optional[str] = Field(None, description="Nombre del enólogo")
+    afinidad: float = Field(..., description="Puntuación de maridaje (mayor es mejor)")
+
+class MaridajeResponse(BaseModel):
+    """Modelo de respuesta para el maridaje de un plato"""
+    plato_id: int = Field(..., description="ID del plato")
+    vinos: List[VinoMaridajeResponse] = Field(..., description="Vinos sugeridos, de mayor a menor afinidad")
+
+class FacetsResponse(BaseModel):
+    """Modelo de respuesta para los recuentos por faceta"""
+    entidad: str = Field(..., description="Entidad consultada (platos o vinos)")
+    total: int = Field(..., description="Elementos que cumplen los filtros")
+    facets: Dict[str, Dict[str, int]] = Field(
+        ...,
+        description="Recuento por valor de cada faceta dentro del resultado filtrado"
+    )
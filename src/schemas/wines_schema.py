@@ -14,9 +14,32 @@ class VinoResponse(BaseModel):
     uvas: List[str] = Field(default_factory=list, description="Variedades de uva")
     enologo: Optional[str] = Field(None, description="Nombre del enólogo")
 
+class VinoDetalleResponse(VinoResponse):
+    """Modelo de respuesta para un vino consultado por id"""
+    tipo: str = Field(..., description="Tipo de vino")
+    denominacion: str = Field(..., description="Denominación de origen")
+
+class VinosLoteResponse(BaseModel):
+    """Modelo de respuesta para varios vinos consultados por id"""
+    vinos: List[VinoDetalleResponse] = Field(..., description="Vinos encontrados, en el orden pedido")
+    no_encontrados: List[int] = Field(default_factory=list, description="IDs que no existen o no son públicos")
+
 class VinosGroupedResponse(BaseModel):
     """Modelo de respuesta para vinos agrupados"""
     vinos: Dict[str, Dict[str, List[VinoResponse]]] = Field(
         ..., 
         description="Vinos agrupados por tipo y denominación de origen"
-    )
\ No newline at end of file
+    )
+
+class CoincidenciaVinoResponse(BaseModel):
+    """Valor encontrado por la búsqueda aproximada de vinos"""
+    campo: str = Field(..., description="Campo en el que se ha encontrado (vino, bodega, uva, enologo, denominacion)")
+    valor: str = Field(..., description="Valor encontrado, p. ej. 'Tempranillo'")
+    puntuacion: float = Field(..., description="Parecido con la búsqueda, de 0 a 1 (mayor es mejor)")
+    total: int = Field(..., description="Vinos públicos con ese valor")
+    ids: List[int] = Field(default_factory=list, description="IDs de esos vinos (como mucho LOTE_MAX_IDS)")
+
+class BusquedaVinosResponse(BaseModel):
+    """Modelo de respuesta para la búsqueda aproximada de vinos"""
+    q: str = Field(..., description="Texto buscado")
+    resultados: List[CoincidenciaVinoResponse] = Field(..., description="Coincidencias, de mayor a menor puntuación")
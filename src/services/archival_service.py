@@ -0,0 +1,176 @@
+"""
+Servicio de archivado de platos y vinos eliminados lógicamente
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional
+from sqlalchemy import Table, select, insert, delete, update, func
+from sqlalchemy.orm import Session
+from src.core.config import settings
+from src.database import read_model
+from src.database.change_tracking import mark_changed
+from src.entities.plato import Plato, platos_alergenos
+from src.entities.plato_archivado import PlatoArchivado, platos_alergenos_archivo
+from src.entities.vino import Vino, vinos_uvas
+from src.entities.vino_archivado import VinoArchivado, vinos_uvas_archivo
+
+class ArchiveSpec(NamedTuple):
+    """Tablas implicadas en el archivado de una entidad"""
+    model: type
+    hot: Table
+    archive: Table
+    association: Table
+    association_archive: Table
+    owner_column: str
+
+ARCHIVE_SPECS: Dict[str, ArchiveSpec] = {
+    "platos": ArchiveSpec(
+        model=Plato,
+        hot=Plato.__table__,
+        archive=PlatoArchivado.__table__,
+        association=platos_alergenos,
+        association_archive=platos_alergenos_archivo,
+        owner_column="plato_id",
+    ),
+    "vinos": ArchiveSpec(
+        model=Vino,
+        hot=Vino.__table__,
+        archive=VinoArchivado.__table__,
+        association=vinos_uvas,
+        association_archive=vinos_uvas_archivo,
+        owner_column="vino_id",
+    ),
+}
+
+class ArchivalService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def archive_soft_deleted(
+        self,
+        retention_days: Optional[int] = None,
+        batch_size: Optional[int] = None
+    ) -> Dict[str, int]:
+        """
+        Mueve a las tablas de archivo los registros eliminados lógicamente
+        hace más de `retention_days`, por lotes y junto a sus relaciones
+        """
+        retention_days = settings.archival_retention_days if retention_days is None else retention_days
+        batch_size = batch_size or settings.archival_batch_size
+        cutoff = self._db_now() - timedelta(days=retention_days)
+
+        return {
+            entidad: self._archive_entity(spec, cutoff, batch_size)
+            for entidad, spec in ARCHIVE_SPECS.items()
+        }
+
+    def restore(self, entidad: str, item_id: int, reactivar: bool = False) -> bool:
+        """
+        Devuelve un registro archivado (y sus relaciones) a la tabla principal.
+        Por defecto sigue eliminado lógicamente; con `reactivar` vuelve a estar activo.
+        """
+        spec = ARCHIVE_SPECS[entidad]
+        archived = self.db.execute(
+            select(spec.archive.c.id).where(spec.archive.c.id == item_id).with_for_update()
+        ).scalar_one_or_none()
+        if archived is None:
+            return False
+
+        try:
+            # Orden inverso al del archivado, para respetar las FKs: primero el
+            # registro, luego sus relaciones, y se borran relaciones antes que el registro
+            item_where = spec.archive.c.id == item_id
+            association_where = spec.association_archive.c[spec.owner_column] == item_id
+            self._copy(spec.archive, spec.hot, _archived_columns(spec), item_where)
+            self._copy(
+                spec.association_archive,
+                spec.association,
+                [c.name for c in spec.association.columns],
+                association_where
+            )
+            self.db.execute(delete(spec.association_archive).where(association_where))
+            self.db.execute(delete(spec.archive).where(item_where))
+            if reactivar:
+                self.db.execute(
+                    update(spec.hot)
+                    .where(spec.hot.c.id == item_id)
+                    .values(is_active=True, deleted_at=None)
+                )
+            mark_changed(self.db, spec.hot.name, [item_id])
+            # Los nombres pueden haber cambiado mientras estaba archivado
+            read_model.refresh(self.db, self.db.get(spec.model, item_id))
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return True
+
+    def _archive_entity(self, spec: ArchiveSpec, cutoff: datetime, batch_size: int) -> int:
+        """Archiva una entidad en transacciones de `batch_size` registros"""
+        hot = spec.hot
+        columns = _archived_columns(spec)
+        archived = 0
+
+        while True:
+            ids: List[int] = list(self.db.execute(
+                select(hot.c.id)
+                .where(
+                    hot.c.is_active == False,
+                    hot.c.deleted_at.is_not(None),
+                    hot.c.deleted_at < cutoff
+                )
+                .order_by(hot.c.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+            ).scalars())
+            if not ids:
+                break
+
+            try:
+                # Primero el registro y luego sus relaciones, para respetar las FKs
+                self.db.execute(
+                    insert(spec.archive).from_select(
+                        columns + ["archived_at"],
+                        select(*[hot.c[name] for name in columns], func.now()).where(hot.c.id.in_(ids))
+                    )
+                )
+                self._move(
+                    spec.association,
+                    spec.association_archive,
+                    [c.name for c in spec.association.columns],
+                    spec.association.c[spec.owner_column].in_(ids)
+                )
+                self.db.execute(delete(hot).where(hot.c.id.in_(ids)))
+                mark_changed(self.db, hot.name, ids)
+                self.db.commit()
+            except Exception:
+                self.db.rollback()
+                raise
+
+            archived += len(ids)
+            if len(ids) < batch_size:
+                break
+
+        return archived
+
+    def _copy(self, source: Table, target: Table, columns: List[str], where) -> None:
+        """Copia las filas que cumplen `where` de `source` a `target`"""
+        self.db.execute(
+            insert(target).from_select(
+                columns,
+                select(*[source.c[name] for name in columns]).where(where)
+            )
+        )
+
+    def _move(self, source: Table, target: Table, columns: List[str], where) -> None:
+        """Copia las filas que cumplen `where` de `source` a `target` y las borra del origen"""
+        self._copy(source, target, columns, where)
+        self.db.execute(delete(source).where(where))
+
+    def _db_now(self) -> datetime:
+        """Hora actual según la base de datos (la misma que usa `soft_delete`)"""
+        now = self.db.execute(select(func.now())).scalar_one()
+        return datetime.fromisoformat(now) if isinstance(now, str) else now
+
+def _archived_columns(spec: ArchiveSpec) -> List[str]:
+    """Columnas que se copian al archivo: el modelo de lectura se recalcula al restaurar"""
+    return [c.name for c in spec.hot.columns if c.name in spec.archive.c]
@@ -0,0 +1,646 @@
+"""
+Catálogo público en memoria con índices por faceta
+
+Una instantánea inmutable de los platos y vinos visibles, con un listado de
+filas (postings) por valor de cada faceta y los precios ordenados. Filtrar
+es unir/intersecar postings y cortar el rango de precios; contar facetas
+recorre solo las filas del resultado. Los listados ordenados salen de
+permutaciones precalculadas (grupo y criterio de orden), de las que solo hay
+que quedarse con las filas filtradas. La instantánea se reconstruye en la
+primera consulta tras un cambio confirmado del menú.
+
+Con ``MENU_PUBLICATION_ENABLED`` la instantánea sale de la última publicación del
+menú (``publicaciones_menu``) en vez de las tablas, solo se reconstruye al
+publicar y, mientras se construye la nueva, se sigue sirviendo la anterior.
+"""
+import json
+import logging
+import threading
+import unicodedata
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from src.core.config import settings
+from src.core.tracing import traced
+from src.database import SessionLocal
+from src.database.change_tracking import MENU_SCOPE, PUBLICATION_SCOPE, CommittedChanges, register_commit_listener
+from src.entities.plato import Plato
+from src.entities.publicacion_menu import PublicacionMenu
+from src.entities.vino import Vino
+from src.repositories.menu_repository import MenuRepository
+from src.repositories.query_cache import normalize_price_bounds, normalize_text
+from src.repositories.vinos_repository import VinosRepository
+
+logger = logging.getLogger(__name__)
+
+# Límites de las franjas de precio (euros)
+PRICE_BUCKETS = (10.0, 15.0, 20.0, 30.0)
+
+# Órdenes de los listados públicos (`sort`)
+SORT_OPTIONS = ("precio", "-precio", "nombre")
+
+# Ámbito de cambios que invalida la instantánea
+CATALOG_SCOPE = PUBLICATION_SCOPE if settings.menu_publication_enabled else MENU_SCOPE
+
+def fold(text: str) -> str:
+    """Minúsculas y sin tildes, como la colación *_ci de MySQL"""
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return text.casefold()
+
+def collation_key(text: Optional[str]) -> Tuple[str, str]:
+    """Orden alfabético sin distinguir tildes ni mayúsculas; desempata el texto original"""
+    text = text or ""
+    return fold(text), text
+
+def _ranks(keys: Sequence[Any]) -> np.ndarray:
+    """Posición de cada elemento en el orden de sus claves (iguales, misma posición)"""
+    ordered = sorted(set(keys))
+    position = {key: rank for rank, key in enumerate(ordered)}
+    return np.array([position[key] for key in keys], dtype=np.int64)
+
+def _price_labels(buckets: Sequence[float]) -> List[str]:
+    edges = [f"{b:g}" for b in buckets]
+    return [f"<{edges[0]}"] + [f"{a}-{b}" for a, b in zip(edges, edges[1:])] + [f">={edges[-1]}"]
+
+PRICE_LABELS = _price_labels(PRICE_BUCKETS)
+
+class FacetField:
+    """
+    Faceta de una entidad: etiquetas, postings (filas ordenadas por valor) y
+    valores de cada fila en formato CSR (`offsets` + `codes`)
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.labels: List[str] = []
+        self._codes_by_label: Dict[str, int] = {}
+        self._row_codes: List[List[int]] = []
+        self.postings: List[np.ndarray] = []
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.codes = np.zeros(0, dtype=np.int64)
+        self._folded: List[str] = []
+
+    def add_row(self, labels: Sequence[Optional[str]]) -> None:
+        row_codes = []
+        for label in labels:
+            if label is None:
+                continue
+            code = self._codes_by_label.get(label)
+            if code is None:
+                code = self._codes_by_label[label] = len(self.labels)
+                self.labels.append(label)
+            row_codes.append(code)
+        self._row_codes.append(row_codes)
+
+    def freeze(self) -> None:
+        lengths = [len(codes) for codes in self._row_codes]
+        self.offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+        self.codes = np.array([c for codes in self._row_codes for c in codes], dtype=np.int64)
+        rows_by_code: List[List[int]] = [[] for _ in self.labels]
+        for row, codes in enumerate(self._row_codes):
+            for code in codes:
+                rows_by_code[code].append(row)
+        self.postings = [np.array(rows, dtype=np.int64) for rows in rows_by_code]
+        self._folded = [fold(label) for label in self.labels]
+        self._row_codes = []
+
+    def rows_matching(self, term: str) -> np.ndarray:
+        """Filas con algún valor que contiene `term` (mismo criterio que ILIKE '%term%')"""
+        needle = fold(term)
+        matches = [self.postings[code] for code, label in enumerate(self._folded) if needle in label]
+        if not matches:
+            return np.zeros(0, dtype=np.int64)
+        return matches[0] if len(matches) == 1 else np.unique(np.concatenate(matches))
+
+    def codes_of(self, rows: np.ndarray) -> np.ndarray:
+        """Valores de las filas dadas (coste proporcional al resultado)"""
+        starts = self.offsets[rows]
+        lengths = self.offsets[rows + 1] - starts
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(0, dtype=np.int64)
+        shift = np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+        return self.codes[np.arange(total) + shift]
+
+    def counts(self, rows: np.ndarray) -> Dict[str, int]:
+        counts = np.bincount(self.codes_of(rows), minlength=len(self.labels))
+        nonzero = np.flatnonzero(counts)
+        ordered = sorted(nonzero, key=lambda code: (-counts[code], self.labels[code]))
+        return {self.labels[code]: int(counts[code]) for code in ordered}
+
+class EntityCatalog:
+    """
+    Filas de una entidad (platos o vinos) con sus facetas, precios y órdenes
+    de listado. `group_fields` son los campos por los que se agrupa el
+    listado público (categoría; tipo y denominación) y `listing_fields` los
+    que ordenan cada grupo cuando no se pide otro orden
+    """
+
+    def __init__(
+        self,
+        facet_names: Sequence[str],
+        group_fields: Sequence[str] = (),
+        listing_fields: Sequence[str] = ()
+    ) -> None:
+        self.group_fields = tuple(group_fields)
+        self.listing_fields = tuple(listing_fields)
+        self.ids: List[int] = []
+        self.items: List[Dict[str, Any]] = []
+        self.row_by_id: Dict[int, int] = {}
+        self.fields: Dict[str, FacetField] = {name: FacetField(name) for name in facet_names}
+        self.fields["precio"] = FacetField("precio")
+        self._prices: List[float] = []
+        self.prices = np.zeros(0)
+        self.price_order = np.zeros(0, dtype=np.int64)
+        self.sorted_prices = np.zeros(0)
+        self.orders: Dict[Optional[str], np.ndarray] = {}
+        self._json: Dict[int, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(self, item: Dict[str, Any], precio: float, facets: Dict[str, Sequence[Optional[str]]]) -> None:
+        self.row_by_id[item["id"]] = len(self.ids)
+        self.ids.append(item["id"])
+        self.items.append(item)
+        for name, labels in facets.items():
+            self.fields[name].add_row(labels)
+        self._prices.append(precio)
+        self.fields["precio"].add_row([PRICE_LABELS[int(np.searchsorted(PRICE_BUCKETS, precio, side="right"))]])
+
+    def freeze(self) -> None:
+        for field in self.fields.values():
+            field.freeze()
+        self.prices = np.array(self._prices, dtype=np.float64)
+        self.price_order = np.argsort(self.prices, kind="stable")
+        self.sorted_prices = self.prices[self.price_order]
+        self._prices = []
+        self._build_orders()
+
+    def _build_orders(self) -> None:
+        """
+        Permutaciones de las filas por grupo y, dentro del grupo, por cada
+        criterio de `SORT_OPTIONS` (None: `listing_fields`); los empates
+        siguen el orden de id
+        """
+        rows = self.all_rows()
+        groups = _ranks([
+            tuple(collation_key(item[name]) for name in self.group_fields) for item in self.items
+        ])
+        names = _ranks([collation_key(item["nombre"]) for item in self.items])
+        listing = [_ranks([collation_key(item[name]) for item in self.items]) for name in reversed(self.listing_fields)]
+        # np.lexsort ordena por la última clave y desempata con las anteriores
+        self.orders = {
+            None: np.lexsort((rows, *listing, groups)),
+            "precio": np.lexsort((rows, self.prices, groups)),
+            "-precio": np.lexsort((rows, -self.prices, groups)),
+            "nombre": np.lexsort((rows, names, groups)),
+        }
+
+    def item_json(self, row: int) -> bytes:
+        """Registro serializado; se memoriza porque la instantánea no cambia"""
+        data = self._json.get(row)
+        if data is None:
+            data = self._json[row] = encode_item(self.items[row])
+        return data
+
+    def all_rows(self) -> np.ndarray:
+        return np.arange(len(self.ids), dtype=np.int64)
+
+    def price_range(self, precio_min: Optional[float], precio_max: Optional[float]) -> np.ndarray:
+        """Filas con precio en [min, max], ordenadas por fila"""
+        lo = 0 if precio_min is None else int(np.searchsorted(self.sorted_prices, precio_min, side="left"))
+        hi = len(self.ids) if precio_max is None else int(np.searchsorted(self.sorted_prices, precio_max, side="right"))
+        return np.sort(self.price_order[lo:max(lo, hi)])
+
+    def select(
+        self,
+        terms: Dict[str, Optional[str]],
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        base: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """Filas que cumplen todos los filtros (intersección de postings)"""
+        sets = [] if base is None else [base]
+        for name, term in terms.items():
+            if term:
+                sets.append(self.fields[name].rows_matching(term))
+        if precio_min is not None or precio_max is not None:
+            sets.append(self.price_range(precio_min, precio_max))
+        if not sets:
+            return self.all_rows()
+        # Empezar por el conjunto más pequeño acota el coste de las intersecciones
+        sets.sort(key=len)
+        rows = sets[0]
+        for other in sets[1:]:
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        return rows
+
+    def facets(self, rows: np.ndarray) -> Dict[str, Dict[str, int]]:
+        return {name: field.counts(rows) for name, field in self.fields.items()}
+
+    def ordered(self, rows: np.ndarray, sort: Optional[str]) -> np.ndarray:
+        """Las filas dadas en el orden precalculado `sort` (sin ordenar nada)"""
+        mask = np.zeros(len(self.ids), dtype=bool)
+        mask[rows] = True
+        order = self.orders[sort]
+        return order[mask[order]]
+
+    def grouped(self, rows: np.ndarray, sort: Optional[str]) -> Dict[str, Any]:
+        """
+        Listado agrupado como el de la API pública: grupos en orden
+        alfabético y registros en el orden `sort` (o el del listado por
+        defecto), sin los campos de grupo
+        """
+        result: Dict[str, Any] = {}
+        for row in self.ordered(rows, sort).tolist():
+            item = self.items[row]
+            target = result
+            for name in self.group_fields[:-1]:
+                target = target.setdefault(item[name], {})
+            target.setdefault(item[self.group_fields[-1]], []).append(
+                {key: value for key, value in item.items() if key not in self.group_fields}
+            )
+        return result
+
+class CatalogSnapshot:
+    """Instantánea inmutable del catálogo público"""
+
+    def __init__(
+        self,
+        platos: EntityCatalog,
+        vinos: EntityCatalog,
+        active_platos: np.ndarray,
+        sugerencias: np.ndarray,
+        publication: Optional["PublishedMenu"] = None
+    ) -> None:
+        self.platos = platos
+        self.vinos = vinos
+        self.active_platos = active_platos
+        self.sugerencias = sugerencias
+        self.publication = publication
+        # Platos que se pueden consultar por id: los del listado por defecto y las sugerencias
+        self.public_platos = frozenset(np.union1d(active_platos, sugerencias).tolist())
+
+    def plato_rows(self, sugerencias: Optional[bool]) -> np.ndarray:
+        """Filas base de platos con el mismo criterio que MenuService"""
+        if sugerencias:
+            # Las sugerencias incluyen platos inactivos
+            return self.sugerencias
+        if sugerencias is False:
+            return np.setdiff1d(self.active_platos, self.sugerencias, assume_unique=True)
+        return self.active_platos
+
+@dataclass(frozen=True)
+class PublishedMenu:
+    """Publicación de la que sale la instantánea, con los listados ya serializados"""
+    version: int
+    created_at: datetime
+    platos_json: bytes
+    vinos_json: bytes
+
+def encode_item(item: Dict[str, Any]) -> bytes:
+    """JSON compacto, igual que el de las respuestas de FastAPI"""
+    return json.dumps(item, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+def _plato_item(plato: Plato) -> Dict[str, Any]:
+    return {
+        "id": plato.id,
+        "nombre": plato.nombre,
+        "descripcion": plato.descripcion,
+        "precio": float(plato.precio) if plato.precio else None,
+        "precio_unidad": plato.precio_unidad,
+        "alergenos": list(plato.alergenos_nombres or []),
+        "categoria": plato.categoria_nombre,
+    }
+
+def _vino_item(vino: Vino) -> Dict[str, Any]:
+    return {
+        "id": vino.id,
+        "nombre": vino.nombre,
+        "precio": float(vino.precio) if vino.precio else None,
+        "precio_unidad": vino.precio_unidad,
+        "bodega": vino.bodega_nombre,
+        "uvas": list(vino.uvas_nombres or []),
+        "enologo": vino.enologo_nombre,
+        "tipo": vino.categoria_nombre,
+        "denominacion": vino.denominacion_nombre or "Sin denominación",
+    }
+
+def catalog_entries(db: Session) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Registros del catálogo leídos de las tablas: cada plato con su precio y
+    si está activo o sugerido, y los vinos visibles (activos y con bodega)
+    """
+    platos = [
+        {"item": _plato_item(plato), "precio": float(plato.precio), "activo": plato.is_active, "sugerencia": plato.sugerencias}
+        for plato in db.query(Plato).order_by(Plato.id)
+    ]
+    query = (
+        db.query(Vino)
+        # Mismo criterio que /public/vinos: solo activos y con bodega
+        .filter(Vino.is_active == True, Vino.bodega_id.isnot(None))
+        .order_by(Vino.id)
+    )
+    vinos = [{"item": _vino_item(vino), "precio": float(vino.precio)} for vino in query]
+    return {"platos": platos, "vinos": vinos}
+
+def snapshot_from_entries(
+    entries: Dict[str, List[Dict[str, Any]]],
+    publication: Optional[PublishedMenu] = None
+) -> CatalogSnapshot:
+    platos = EntityCatalog(("categoria", "alergeno"), group_fields=("categoria",))
+    active, sugerencias = [], []
+    for entry in entries["platos"]:
+        item = entry["item"]
+        row = len(platos)
+        platos.add(item, entry["precio"], {"categoria": [item["categoria"]], "alergeno": item["alergenos"]})
+        if entry["activo"]:
+            active.append(row)
+        if entry["sugerencia"]:
+            sugerencias.append(row)
+    platos.freeze()
+
+    vinos = EntityCatalog(
+        ("tipo", "denominacion", "bodega", "uva"),
+        group_fields=("tipo", "denominacion"),
+        listing_fields=("bodega",)
+    )
+    for entry in entries["vinos"]:
+        item = entry["item"]
+        vinos.add(item, entry["precio"], {
+            "tipo": [item["tipo"]],
+            "denominacion": [item["denominacion"]],
+            "bodega": [item["bodega"]],
+            "uva": item["uvas"],
+        })
+    vinos.freeze()
+
+    return CatalogSnapshot(
+        platos,
+        vinos,
+        np.array(active, dtype=np.int64),
+        np.array(sugerencias, dtype=np.int64),
+        publication,
+    )
+
+def snapshot_from_publication(publicacion: PublicacionMenu) -> CatalogSnapshot:
+    return snapshot_from_entries(
+        json.loads(publicacion.catalogo),
+        PublishedMenu(
+            version=publicacion.id,
+            created_at=publicacion.created_at,
+            platos_json=publicacion.platos_json.encode("utf-8"),
+            vinos_json=publicacion.vinos_json.encode("utf-8"),
+        ),
+    )
+
+def build_snapshot(db: Session) -> CatalogSnapshot:
+    if settings.menu_publication_enabled:
+        publicacion = db.query(PublicacionMenu).order_by(PublicacionMenu.id.desc()).first()
+        if publicacion is not None:
+            return snapshot_from_publication(publicacion)
+        logger.warning("No hay ninguna publicación del menú: se sirven las tablas hasta la primera")
+    return snapshot_from_entries(catalog_entries(db))
+
+class CatalogStore:
+    """
+    Mantiene la instantánea vigente y la reconstruye tras cada cambio. Con
+    `serve_stale` (publicaciones) la instantánea anterior se sigue sirviendo
+    mientras se construye la nueva, que la sustituye de una vez
+    """
+
+    def __init__(self, serve_stale: bool = False) -> None:
+        self.serve_stale = serve_stale
+        self._lock = threading.Lock()
+        # Una sola reconstrucción en segundo plano a la vez
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._generation = 0
+        self._built_generation = -1
+
+    def snapshot(self) -> CatalogSnapshot:
+        snapshot = self._snapshot
+        if snapshot is not None and self._built_generation == self._generation:
+            return snapshot
+        if snapshot is not None and self.serve_stale:
+            self._start_rebuild()
+            return snapshot
+        return self.refresh()
+
+    def refresh(self) -> CatalogSnapshot:
+        """Reconstruye la instantánea si está desfasada, esperando a que termine"""
+        with self._lock:
+            generation = self._generation
+            if self._snapshot is None or self._built_generation != generation:
+                with SessionLocal() as db:
+                    self._snapshot = build_snapshot(db)
+                self._built_generation = generation
+                logger.info(
+                    "Catálogo reconstruido: %d platos, %d vinos",
+                    len(self._snapshot.platos), len(self._snapshot.vinos)
+                )
+            return self._snapshot
+
+    def peek(self) -> Optional[CatalogSnapshot]:
+        """
+        Instantánea vigente sin esperar a reconstruirla: si está desfasada
+        lanza la reconstrucción en segundo plano y devuelve None (o la
+        anterior con `serve_stale`)
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and self._built_generation == self._generation:
+            return snapshot
+        self._start_rebuild()
+        return snapshot if self.serve_stale else None
+
+    def invalidate(self) -> None:
+        self._generation += 1
+
+    def _start_rebuild(self) -> None:
+        with self._rebuild_lock:
+            if self._rebuilding:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._rebuild, name="catalog-rebuild", daemon=True).start()
+
+    def _rebuild(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Error al reconstruir el catálogo")
+        finally:
+            with self._rebuild_lock:
+                self._rebuilding = False
+
+catalog_store = CatalogStore(serve_stale=settings.menu_publication_enabled)
+
+@register_commit_listener
+def _invalidate_catalog(changes: CommittedChanges) -> None:
+    if changes.scope == CATALOG_SCOPE:
+        catalog_store.invalidate()
+
+class CatalogService:
+    """Consultas sobre el catálogo en memoria"""
+
+    def __init__(self, store: CatalogStore = catalog_store, db: Optional[Session] = None) -> None:
+        self.store = store
+        self.db = db
+
+    @traced()
+    def get_facets(
+        self,
+        entidad: str,
+        categoria: Optional[str] = None,
+        sugerencias: Optional[bool] = None,
+        tipo: Optional[str] = None,
+        denominacion: Optional[str] = None,
+        bodega: Optional[str] = None,
+        uva: Optional[str] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None
+    ) -> Tuple[int, Dict[str, Dict[str, int]]]:
+        """Total y recuento por valor de cada faceta para los filtros activos"""
+        snapshot = self.store.snapshot()
+        if entidad == "platos":
+            catalog = snapshot.platos
+            rows = catalog.select(
+                {"categoria": categoria},
+                precio_min,
+                precio_max,
+                base=snapshot.plato_rows(sugerencias),
+            )
+        else:
+            catalog = snapshot.vinos
+            rows = catalog.select(
+                {"tipo": tipo, "denominacion": denominacion, "bodega": bodega, "uva": uva},
+                precio_min,
+                precio_max,
+            )
+        return len(rows), catalog.facets(rows)
+
+    @traced()
+    def get_grouped(
+        self,
+        entidad: str,
+        sort: Optional[str],
+        categoria: Optional[str] = None,
+        sugerencias: Optional[bool] = None,
+        tipo: Optional[str] = None,
+        denominacion: Optional[str] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Listado agrupado de /public/platos o /public/vinos con los registros
+        de cada grupo en el orden `sort`, desde la instantánea
+        """
+        return self._grouped(
+            self.store.snapshot(), entidad, sort, categoria, sugerencias, tipo, denominacion, precio_min, precio_max
+        )
+
+    @traced()
+    def get_listing_json(
+        self,
+        entidad: str,
+        sort: Optional[str] = None,
+        categoria: Optional[str] = None,
+        sugerencias: Optional[bool] = None,
+        tipo: Optional[str] = None,
+        denominacion: Optional[str] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None
+    ) -> bytes:
+        """
+        Cuerpo de /public/platos o /public/vinos desde la instantánea; el
+        listado sin filtros de una publicación ya está serializado
+        """
+        snapshot = self.store.snapshot()
+        precio_min, precio_max = normalize_price_bounds(precio_min, precio_max)
+        filtered = any(value is not None for value in (
+            sort, normalize_text(categoria), sugerencias, normalize_text(tipo), normalize_text(denominacion),
+            precio_min, precio_max,
+        ))
+        if snapshot.publication is not None and not filtered:
+            return snapshot.publication.platos_json if entidad == "platos" else snapshot.publication.vinos_json
+        grouped = self._grouped(
+            snapshot, entidad, sort, categoria, sugerencias, tipo, denominacion, precio_min, precio_max
+        )
+        return encode_item({entidad: grouped})
+
+    def _grouped(
+        self,
+        snapshot: CatalogSnapshot,
+        entidad: str,
+        sort: Optional[str],
+        categoria: Optional[str],
+        sugerencias: Optional[bool],
+        tipo: Optional[str],
+        denominacion: Optional[str],
+        precio_min: Optional[float],
+        precio_max: Optional[float]
+    ) -> Dict[str, Any]:
+        precio_min, precio_max = normalize_price_bounds(precio_min, precio_max)
+        if entidad == "platos":
+            catalog = snapshot.platos
+            rows = catalog.select(
+                {"categoria": normalize_text(categoria)},
+                precio_min,
+                precio_max,
+                base=snapshot.plato_rows(sugerencias),
+            )
+        else:
+            catalog = snapshot.vinos
+            rows = catalog.select(
+                {"tipo": normalize_text(tipo), "denominacion": normalize_text(denominacion)},
+                precio_min,
+                precio_max,
+            )
+        return catalog.grouped(rows, sort)
+
+    @traced()
+    def get_items_json(self, entidad: str, ids: Sequence[int]) -> Dict[int, bytes]:
+        """
+        Registros públicos serializados por id; los que no existen o no son
+        visibles no aparecen. Sale de la instantánea si está al día y, si no,
+        de una sola consulta IN con las relaciones cargadas por lotes
+        """
+        snapshot = self.store.peek()
+        if snapshot is None and self.store.serve_stale:
+            # Publicaciones: las tablas son el borrador, no se leen
+            snapshot = self.store.snapshot()
+        if snapshot is None:
+            return self._items_from_database(entidad, ids)
+        catalog = snapshot.platos if entidad == "platos" else snapshot.vinos
+        items = {}
+        for item_id in ids:
+            row = catalog.row_by_id.get(item_id)
+            if row is None or (entidad == "platos" and row not in snapshot.public_platos):
+                continue
+            items[item_id] = catalog.item_json(row)
+        return items
+
+    def get_lote_json(self, entidad: str, ids: Sequence[int]) -> bytes:
+        """Cuerpo de la respuesta de varios ids, en el orden pedido"""
+        items = self.get_items_json(entidad, ids)
+        found = [items[item_id] for item_id in ids if item_id in items]
+        missing = [item_id for item_id in ids if item_id not in items]
+        return b"".join((
+            b'{"', entidad.encode(), b'":[', b",".join(found), b'],"no_encontrados":',
+            json.dumps(missing).encode(), b"}",
+        ))
+
+    def _items_from_database(self, entidad: str, ids: Sequence[int]) -> Dict[int, bytes]:
+        db = self.db or SessionLocal()
+        try:
+            if entidad == "platos":
+                return {plato.id: encode_item(_plato_item(plato)) for plato in MenuRepository(db).get_platos_by_ids(ids)}
+            return {vino.id: encode_item(_vino_item(vino)) for vino in VinosRepository(db).get_vinos_by_ids(ids)}
+        finally:
+            if self.db is None:
+                db.close()
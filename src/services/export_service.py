@@ -0,0 +1,188 @@
+"""
+Exportación completa de platos y vinos (CSV / NDJSON) para integraciones
+
+Incluye registros inactivos y campos de auditoría. Las filas base se leen con
+un cursor de servidor (``stream_results``: ``SSCursor`` en PyMySQL) y, por
+cada lote, las relaciones muchos a muchos se cargan con una consulta ``IN``
+en una segunda conexión, porque con un cursor sin buffer abierto no se
+pueden lanzar otras consultas en la misma.
+"""
+import csv
+import io
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List, NamedTuple, Sequence, Tuple
+
+from sqlalchemy import Table, select
+from sqlalchemy.orm import Session
+
+from src.database import SessionLocal
+from src.entities.alergeno import Alergeno
+from src.entities.bodega import Bodega
+from src.entities.categoria_plato import CategoriaPlato
+from src.entities.categoria_vino import CategoriaVino
+from src.entities.denominacion_origen import DenominacionOrigen
+from src.entities.enologo import Enologo
+from src.entities.plato import Plato, platos_alergenos
+from src.entities.uva import Uva
+from src.entities.vino import Vino, vinos_uvas
+
+class RelatedSpec(NamedTuple):
+    """Relación muchos a muchos exportada como lista de nombres"""
+    name: str
+    table: Table
+    owner_column: str
+    target_column: str
+    target: Any
+
+class ExportSpec(NamedTuple):
+    model: Any
+    columns: Sequence[Tuple[str, Any]]
+    joins: Sequence[Tuple[Any, Any]]
+    related: Sequence[RelatedSpec]
+
+_AUDIT = ("is_active", "created_at", "updated_at", "deleted_at")
+
+EXPORT_SPECS: Dict[str, ExportSpec] = {
+    "platos": ExportSpec(
+        model=Plato,
+        columns=[
+            ("id", Plato.id),
+            ("nombre", Plato.nombre),
+            ("descripcion", Plato.descripcion),
+            ("precio", Plato.precio),
+            ("precio_unidad", Plato.precio_unidad),
+            ("sugerencias", Plato.sugerencias),
+            ("categoria_id", Plato.categoria_id),
+            ("categoria", CategoriaPlato.nombre),
+            *[(name, getattr(Plato, name)) for name in _AUDIT],
+        ],
+        joins=[(CategoriaPlato, Plato.categoria)],
+        related=[RelatedSpec("alergenos", platos_alergenos, "plato_id", "alergeno_id", Alergeno)],
+    ),
+    "vinos": ExportSpec(
+        model=Vino,
+        columns=[
+            ("id", Vino.id),
+            ("nombre", Vino.nombre),
+            ("precio", Vino.precio),
+            ("precio_unidad", Vino.precio_unidad),
+            ("categoria_id", Vino.categoria_id),
+            ("tipo", CategoriaVino.nombre),
+            ("bodega_id", Vino.bodega_id),
+            ("bodega", Bodega.nombre),
+            ("denominacion_origen_id", Vino.denominacion_origen_id),
+            ("denominacion", DenominacionOrigen.nombre),
+            ("enologo_id", Vino.enologo_id),
+            ("enologo", Enologo.nombre),
+            *[(name, getattr(Vino, name)) for name in _AUDIT],
+        ],
+        joins=[
+            (CategoriaVino, Vino.categoria),
+            (Bodega, Vino.bodega),
+            (DenominacionOrigen, Vino.denominacion_origen),
+            (Enologo, Vino.enologo),
+        ],
+        related=[RelatedSpec("uvas", vinos_uvas, "vino_id", "uva_id", Uva)],
+    ),
+}
+
+# Separador de los valores de listas en CSV
+CSV_LIST_SEPARATOR = "|"
+
+class ExportService:
+    def __init__(self, db: Session, lookup_db: Session, batch_size: int = 1000):
+        self.db = db
+        self.lookup_db = lookup_db
+        self.batch_size = batch_size
+
+    def fieldnames(self, entidad: str) -> List[str]:
+        spec = EXPORT_SPECS[entidad]
+        return [name for name, _ in spec.columns] + [related.name for related in spec.related]
+
+    def iter_rows(self, entidad: str) -> Iterator[Dict[str, Any]]:
+        """Todas las filas de la entidad (activas o no), ordenadas por id"""
+        spec = EXPORT_SPECS[entidad]
+        query = select(*[column.label(name) for name, column in spec.columns])
+        for target, relationship in spec.joins:
+            query = query.outerjoin(target, relationship)
+        query = query.order_by(spec.model.id).execution_options(stream_results=True, yield_per=self.batch_size)
+
+        for batch in self.db.execute(query).partitions():
+            ids = [row.id for row in batch]
+            related = {item.name: self._load_related(item, ids) for item in spec.related}
+            for row in batch:
+                data = dict(row._mapping)
+                for name, values in related.items():
+                    data[name] = values.get(row.id, [])
+                yield data
+
+    def _load_related(self, spec: RelatedSpec, ids: List[int]) -> Dict[int, List[str]]:
+        owner = spec.table.c[spec.owner_column]
+        query = (
+            select(owner, spec.target.nombre)
+            .join(spec.target, spec.target.id == spec.table.c[spec.target_column])
+            .where(owner.in_(ids))
+            .order_by(owner, spec.target.nombre)
+        )
+        values: Dict[int, List[str]] = {}
+        for owner_id, nombre in self.lookup_db.execute(query):
+            values.setdefault(owner_id, []).append(nombre)
+        return values
+
+    def iter_csv(self, entidad: str) -> Iterator[bytes]:
+        fieldnames = self.fieldnames(entidad)
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, lineterminator="\r\n")
+        writer.writeheader()
+        for count, row in enumerate(self.iter_rows(entidad), start=1):
+            writer.writerow({key: _csv_value(value) for key, value in row.items()})
+            if count % self.batch_size == 0:
+                yield buffer.getvalue().encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue().encode("utf-8")
+
+    def iter_ndjson(self, entidad: str) -> Iterator[bytes]:
+        lines: List[str] = []
+        for row in self.iter_rows(entidad):
+            lines.append(json.dumps(row, ensure_ascii=False, default=_json_default))
+            if len(lines) >= self.batch_size:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+def _csv_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return CSV_LIST_SEPARATOR.join(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(value).__name__}")
+
+def export_stream(entidad: str, formato: str, batch_size: int) -> Iterator[bytes]:
+    """
+    Generador para `StreamingResponse` con sus propias sesiones: la del
+    cursor de servidor y la de las consultas de relaciones por lote
+    """
+    db = SessionLocal()
+    lookup_db = SessionLocal()
+    try:
+        service = ExportService(db, lookup_db, batch_size=batch_size)
+        if formato == "csv":
+            yield from service.iter_csv(entidad)
+        else:
+            yield from service.iter_ndjson(entidad)
+    finally:
+        lookup_db.close()
+        db.close()
@@ -0,0 +1,201 @@
+"""
+Búsqueda aproximada por trigramas
+
+Índice invertido de trigramas (como pg_trgm: cada palabra, sin tildes ni
+mayúsculas, con dos espacios delante y uno detrás) sobre un conjunto de
+términos. Buscar suma, para cada término, los trigramas que comparte con la
+consulta recorriendo solo los postings de los trigramas de la consulta, así
+que el coste depende de la consulta y no del número de términos.
+
+La puntuación combina la similitud del término completo (trigramas comunes
+entre trigramas de ambos) con la fracción de trigramas de la consulta que
+aparecen en el término, para que "Riscal" encuentre "Marqués de Riscal" y
+"tempranilo", "Tempranillo".
+
+``VinosSearch`` mantiene un índice por campo (vino, bodega, uva, enólogo y
+denominación) de los vinos públicos, construido a partir de la instantánea
+del catálogo. Cuando el catálogo cambia, los índices se reconstruyen en
+segundo plano y mientras tanto se sigue buscando en los anteriores, para que
+ninguna búsqueda espere a la reconstrucción.
+"""
+import logging
+import re
+import threading
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from src.repositories.vinos_repository import SIN_DENOMINACION
+from src.services.catalog_service import CatalogSnapshot, CatalogStore, catalog_store, fold
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+def trigrams(text: str) -> Set[str]:
+    """Trigramas de las palabras del texto, sin tildes ni mayúsculas"""
+    result: Set[str] = set()
+    for word in _WORD.findall(fold(text)):
+        padded = f"  {word} "
+        result.update([padded[i:i + 3] for i in range(len(padded) - 2)])
+    return result
+
+class TrigramIndex:
+    """Índice de trigramas sobre términos (`key`, texto) inmutable tras `freeze`"""
+
+    def __init__(self) -> None:
+        self.keys: List[Hashable] = []
+        self.texts: List[str] = []
+        self._postings: Dict[str, List[int]] = {}
+        self.postings: Dict[str, np.ndarray] = {}
+        self.sizes = np.zeros(0, dtype=np.int64)
+        self._sizes: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def add(self, key: Hashable, text: str) -> None:
+        term = len(self.keys)
+        grams = trigrams(text)
+        self.keys.append(key)
+        self.texts.append(text)
+        self._sizes.append(len(grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(term)
+
+    def freeze(self) -> None:
+        self.postings = {gram: np.array(terms, dtype=np.int64) for gram, terms in self._postings.items()}
+        self.sizes = np.array(self._sizes, dtype=np.int64)
+        self._postings = {}
+        self._sizes = []
+
+    def search(self, query: str, limit: int, min_score: float = 0.3) -> List[Tuple[Hashable, str, float]]:
+        """Los `limit` términos más parecidos a la consulta: (key, texto, puntuación)"""
+        grams = trigrams(query)
+        matches = [self.postings[gram] for gram in grams if gram in self.postings]
+        if not matches or limit <= 0:
+            return []
+        terms, shared = np.unique(np.concatenate(matches), return_counts=True)
+        similarity = shared / (len(grams) + self.sizes[terms] - shared)
+        coverage = shared / len(grams)
+        scores = (similarity + coverage) / 2
+        keep = scores >= min_score
+        terms, scores = terms[keep], scores[keep]
+        if len(terms) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            terms, scores = terms[top], scores[top]
+        # Mayor puntuación primero; a igualdad, el texto más corto y después alfabético
+        ranked = sorted(
+            zip(terms.tolist(), scores.tolist()),
+            key=lambda pair: (-pair[1], len(self.texts[pair[0]]), fold(self.texts[pair[0]]))
+        )
+        return [(self.keys[term], self.texts[term], round(score, 3)) for term, score in ranked]
+
+# Campos de búsqueda de vinos y clave del registro del catálogo de la que salen
+SEARCH_FIELDS = {
+    "vino": "nombre",
+    "bodega": "bodega",
+    "uva": "uvas",
+    "enologo": "enologo",
+    "denominacion": "denominacion",
+}
+
+class VinosSearch:
+    """Índices de trigramas de los vinos de la instantánea vigente del catálogo"""
+
+    def __init__(self, store: CatalogStore = catalog_store) -> None:
+        self.store = store
+        self._lock = threading.Lock()
+        # Una sola reconstrucción en segundo plano a la vez
+        self._rebuild_lock = threading.Lock()
+        self._rebuilding = False
+        # Instantánea, índice por campo y filas de cada término (se sustituyen juntos)
+        self._state: Optional[Tuple[CatalogSnapshot, Dict[str, TrigramIndex], Dict[str, List[np.ndarray]]]] = None
+
+    def refresh(self) -> Tuple[CatalogSnapshot, Dict[str, TrigramIndex], Dict[str, List[np.ndarray]]]:
+        """Índices de la instantánea vigente; se construyen si ha cambiado"""
+        snapshot = self.store.snapshot()
+        state = self._state
+        if state is not None and state[0] is snapshot:
+            return state
+        with self._lock:
+            if self._state is None or self._state[0] is not snapshot:
+                self._state = self._build(snapshot)
+            return self._state
+
+    def current(self) -> Tuple[CatalogSnapshot, Dict[str, TrigramIndex], Dict[str, List[np.ndarray]]]:
+        """
+        Índices para buscar sin esperar: si están desfasados se devuelven los
+        anteriores y se reconstruyen en segundo plano (solo la primera vez se
+        construyen en el momento)
+        """
+        state = self._state
+        if state is None:
+            return self.refresh()
+        snapshot = self.store.peek()
+        # None: el catálogo se está reconstruyendo; la reconstrucción de los índices lo espera
+        if snapshot is not state[0]:
+            with self._rebuild_lock:
+                start, self._rebuilding = not self._rebuilding, True
+            if start:
+                threading.Thread(target=self._refresh_in_background, name="vinos-search-rebuild", daemon=True).start()
+        return state
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Error al reconstruir los índices de búsqueda de vinos")
+        finally:
+            with self._rebuild_lock:
+                self._rebuilding = False
+
+    def _build(self, snapshot: CatalogSnapshot) -> Tuple[CatalogSnapshot, Dict[str, TrigramIndex], Dict[str, List[np.ndarray]]]:
+        indexes: Dict[str, TrigramIndex] = {}
+        rows: Dict[str, List[np.ndarray]] = {}
+        for campo, key in SEARCH_FIELDS.items():
+            rows_by_value: Dict[str, List[int]] = {}
+            for row, item in enumerate(snapshot.vinos.items):
+                values = item[key] if isinstance(item[key], list) else [item[key]]
+                for value in values:
+                    if value and value != SIN_DENOMINACION:
+                        rows_by_value.setdefault(value, []).append(row)
+            index = TrigramIndex()
+            for value in rows_by_value:
+                index.add(len(index), value)
+            index.freeze()
+            indexes[campo] = index
+            rows[campo] = [np.array(value_rows, dtype=np.int64) for value_rows in rows_by_value.values()]
+        return snapshot, indexes, rows
+
+    def search(
+        self,
+        q: str,
+        campos: Sequence[str] = tuple(SEARCH_FIELDS),
+        limite: int = 10,
+        min_score: float = 0.3,
+        max_ids: int = 100
+    ) -> List[Dict[str, Any]]:
+        """
+        Los `limite` valores más parecidos a `q` entre los campos dados, con
+        los ids (hasta `max_ids`) de los vinos que los tienen
+        """
+        snapshot, indexes, rows = self.current()
+        candidates = []
+        for campo in campos:
+            for term, valor, score in indexes[campo].search(q, limite, min_score):
+                candidates.append((score, campo, valor, rows[campo][term]))
+        candidates.sort(key=lambda candidate: (-candidate[0], len(candidate[2]), fold(candidate[2])))
+        ids = snapshot.vinos.ids
+        return [
+            {
+                "campo": campo,
+                "valor": valor,
+                "puntuacion": score,
+                "total": len(value_rows),
+                "ids": [ids[row] for row in value_rows[:max_ids].tolist()],
+            }
+            for score, campo, valor, value_rows in candidates[:limite]
+        ]
+
+vinos_search = VinosSearch()
@@ -0,0 +1,52 @@
+"""
+Escritura incremental de respuestas JSON agrupadas
+"""
+import json
+from typing import Iterable, Iterator, Tuple
+
+# Tamaño aproximado de cada trozo enviado al cliente
+CHUNK_SIZE = 64 * 1024
+
+def _key(value: str) -> str:
+    return json.dumps(value, ensure_ascii=False)
+
+def stream_grouped_json(
+    root: str,
+    records: Iterable[Tuple[Tuple[str, ...], str]],
+    depth: int,
+    chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """
+    Genera ``{"<root>": {"<g1>": {"<g2>": [item, ...]}}}`` a partir de pares
+    (ruta de grupos, item ya serializado). Los registros deben llegar
+    ordenados de forma que los de un mismo grupo sean consecutivos: cada
+    grupo se abre al verlo por primera vez y se cierra al cambiar de ruta,
+    así que la memoria no depende del tamaño del resultado
+    """
+    parts = ["{" + _key(root) + ":{"]
+    size = len(parts[0])
+    current: Tuple[str, ...] = ()
+
+    for path, item in records:
+        if path != current:
+            common = 0
+            if current:
+                while common < depth - 1 and current[common] == path[common]:
+                    common += 1
+                # Cerrar la lista y los objetos por debajo del prefijo común
+                parts.append("]" + "}" * (depth - 1 - common) + ",")
+            for level in range(common, depth):
+                parts.append(_key(path[level]) + (":[" if level == depth - 1 else ":{"))
+            current = path
+        else:
+            parts.append(",")
+        parts.append(item)
+        size += len(item)
+        if size >= chunk_size:
+            yield "".join(parts).encode("utf-8")
+            parts, size = [], 0
+
+    if current:
+        parts.append("]" + "}" * (depth - 1))
+    parts.append("}}")
+    yield "".join(parts).encode("utf-8")
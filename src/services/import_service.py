@@ -0,0 +1,403 @@
+"""
+Importación masiva de platos y vinos desde CSV
+
+Acepta el mismo formato que la exportación (``/admin/exportar``), así que un
+fichero exportado, editado en una hoja de cálculo y vuelto a subir solo toca
+las filas modificadas. El fichero se lee por partes y se procesa en lotes:
+cada lote se valida con Pydantic, resuelve las referencias (categoría,
+bodega...) contra diccionarios cargados una sola vez, carga los registros
+existentes con una consulta ``IN`` y se guarda en su propia transacción.
+Las filas cuyo hash de contenido coincide con el del registro actual no
+generan ninguna escritura.
+"""
+import csv
+import hashlib
+import io
+import json
+from decimal import Decimal
+from itertools import islice
+from typing import IO, Any, Dict, FrozenSet, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import Table, delete, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from src.database import read_model
+from src.database.change_tracking import mark_changed
+from src.entities.alergeno import Alergeno
+from src.entities.bodega import Bodega
+from src.entities.categoria_plato import CategoriaPlato
+from src.entities.categoria_vino import CategoriaVino
+from src.entities.denominacion_origen import DenominacionOrigen
+from src.entities.enologo import Enologo
+from src.entities.plato import Plato, platos_alergenos
+from src.entities.uva import Uva
+from src.entities.vino import Vino, vinos_uvas
+from src.schemas.import_schema import ImportRowError, ImportSummary, PlatoImportRow, VinoImportRow
+from src.services.catalog_service import fold
+
+# Errores de fila devueltos en el resumen; el resto solo se cuentan
+MAX_REPORTED_ERRORS = 100
+
+class ReferenceSpec(NamedTuple):
+    """Columna del CSV con el nombre de una entidad de referencia"""
+    field: str
+    attribute: str
+    target: Any
+    required: bool
+
+class RelatedSpec(NamedTuple):
+    """Columna del CSV con una lista de nombres (relación muchos a muchos)"""
+    field: str
+    table: Table
+    owner_column: str
+    target_column: str
+    target: Any
+
+class ImportSpec(NamedTuple):
+    model: Any
+    row_schema: type
+    scalars: Sequence[str]
+    references: Sequence[ReferenceSpec]
+    related: RelatedSpec
+    # Referencia que distingue registros con el mismo nombre cuando no hay id
+    natural_key: str
+
+IMPORT_SPECS: Dict[str, ImportSpec] = {
+    "platos": ImportSpec(
+        model=Plato,
+        row_schema=PlatoImportRow,
+        scalars=("nombre", "descripcion", "precio", "precio_unidad", "sugerencias", "is_active"),
+        references=[ReferenceSpec("categoria", "categoria_id", CategoriaPlato, True)],
+        related=RelatedSpec("alergenos", platos_alergenos, "plato_id", "alergeno_id", Alergeno),
+        natural_key="categoria_id",
+    ),
+    "vinos": ImportSpec(
+        model=Vino,
+        row_schema=VinoImportRow,
+        scalars=("nombre", "precio", "precio_unidad", "is_active"),
+        references=[
+            ReferenceSpec("tipo", "categoria_id", CategoriaVino, True),
+            ReferenceSpec("bodega", "bodega_id", Bodega, False),
+            ReferenceSpec("denominacion", "denominacion_origen_id", DenominacionOrigen, False),
+            ReferenceSpec("enologo", "enologo_id", Enologo, False),
+        ],
+        related=RelatedSpec("uvas", vinos_uvas, "vino_id", "uva_id", Uva),
+        natural_key="bodega_id",
+    ),
+}
+
+# Columnas imprescindibles para crear un registro nuevo
+_REQUIRED_ON_CREATE = ("nombre", "precio")
+
+class RowError(Exception):
+    """Fila que no se puede importar"""
+
+class _Row(NamedTuple):
+    """Fila validada y con las referencias resueltas a ids"""
+    line: int
+    id: Optional[int]
+    values: Dict[str, Any]
+    related: Optional[FrozenSet[int]]
+
+class LookupCache:
+    """
+    Nombre -> id de una tabla de referencia, cargado una vez por importación.
+    La comparación ignora mayúsculas y tildes, igual que la colación de MySQL
+    """
+
+    def __init__(self, db: Session, model: Any, create_missing: bool) -> None:
+        self.db = db
+        self.model = model
+        self.create_missing = create_missing
+        self.ids = {fold(nombre): id_ for id_, nombre in db.execute(select(model.id, model.nombre))}
+        self._created: List[str] = []
+
+    def resolve(self, nombre: str) -> int:
+        key = fold(nombre)
+        id_ = self.ids.get(key)
+        if id_ is None:
+            if not self.create_missing:
+                raise RowError(f"No existe {self.model.__tablename__} '{nombre}'")
+            item = self.model(nombre=nombre)
+            self.db.add(item)
+            self.db.flush()
+            id_ = self.ids[key] = item.id
+            self._created.append(key)
+        return id_
+
+    def commit(self) -> None:
+        self._created = []
+
+    def rollback(self) -> None:
+        """Olvida las referencias creadas en la transacción descartada"""
+        for key in self._created:
+            self.ids.pop(key, None)
+        self._created = []
+
+class ImportService:
+    def __init__(self, db: Session, batch_size: int = 500, create_references: bool = False, dry_run: bool = False):
+        self.db = db
+        self.batch_size = batch_size
+        self.create_references = create_references
+        self.dry_run = dry_run
+
+    def import_csv(self, entidad: str, stream: IO[bytes]) -> ImportSummary:
+        """
+        Importa el CSV por lotes. Lanza ValueError si la cabecera no sirve;
+        los errores de cada fila se acumulan en el resumen
+        """
+        spec = IMPORT_SPECS[entidad]
+        reader = _open_csv(stream)
+        if not {"id", "nombre"} & set(reader.fieldnames):
+            raise ValueError("El CSV necesita una columna 'id' o 'nombre'")
+
+        self._lookups = {
+            ref.field: LookupCache(self.db, ref.target, self.create_references)
+            for ref in [*spec.references, spec.related]
+        }
+        summary = ImportSummary(
+            entidad=entidad, filas=0, creados=0, actualizados=0, sin_cambios=0, con_errores=0, dry_run=self.dry_run
+        )
+        rows = _numbered(reader)
+        while True:
+            batch = list(islice(rows, self.batch_size))
+            if not batch:
+                break
+            summary.filas += len(batch)
+            self._import_batch(spec, batch, summary)
+        return summary
+
+    def _import_batch(self, spec: ImportSpec, batch: List[Tuple[int, Dict[str, str]]], summary: ImportSummary) -> None:
+        errors: List[ImportRowError] = []
+        rows: List[_Row] = []
+        created = updated = unchanged = 0
+        try:
+            for line, raw in batch:
+                try:
+                    rows.append(self._parse(spec, line, raw))
+                except RowError as e:
+                    errors.append(ImportRowError(linea=line, error=str(e)))
+
+            existing, related = self._load_existing(spec, rows)
+            pending: Dict[Tuple[str, Any], Any] = {}
+            # Relaciones de los registros creados en el lote, que aún no tienen id
+            new_related: Dict[Any, FrozenSet[int]] = {}
+            for row in rows:
+                try:
+                    item = self._match(spec, row, existing, pending)
+                    if item is None:
+                        item = self._create(spec, row)
+                        pending[(fold(item.nombre), getattr(item, spec.natural_key))] = item
+                        new_related[item] = row.related or frozenset()
+                        created += 1
+                        continue
+                    if item.id is None:
+                        current = new_related[item]
+                    else:
+                        current = related.get(item.id, frozenset())
+                    if _content_hash(row.values, row.related) == _content_hash(
+                        {name: getattr(item, name) for name in row.values},
+                        current if row.related is not None else None,
+                    ):
+                        unchanged += 1
+                        continue
+                    self._update(item, row.values)
+                    if row.related is not None and row.related != current:
+                        if item.id is None:
+                            new_related[item] = row.related
+                        else:
+                            self._replace_related(spec, item.id, current, row.related)
+                            related[item.id] = row.related
+                    updated += 1
+                except RowError as e:
+                    errors.append(ImportRowError(linea=row.line, error=str(e)))
+
+            if new_related:
+                self.db.flush()
+                for item, target_ids in new_related.items():
+                    if target_ids:
+                        self._replace_related(spec, item.id, frozenset(), target_ids)
+            if self.dry_run:
+                self._rollback()
+            else:
+                self.db.commit()
+                for lookup in self._lookups.values():
+                    lookup.commit()
+            failed = len(errors)
+        except SQLAlchemyError as e:
+            self._rollback()
+            # Se descarta el lote entero: todas sus filas cuentan como erróneas
+            created = updated = unchanged = 0
+            failed = len(batch)
+            errors = [ImportRowError(
+                linea=batch[0][0],
+                error=f"Lote de las líneas {batch[0][0]}-{batch[-1][0]} descartado: {e.__class__.__name__}",
+            )]
+
+        summary.creados += created
+        summary.actualizados += updated
+        summary.sin_cambios += unchanged
+        summary.con_errores += failed
+        errors.sort(key=lambda error: error.linea)
+        room = MAX_REPORTED_ERRORS - len(summary.errores)
+        summary.errores.extend(errors[:max(room, 0)])
+
+    def _rollback(self) -> None:
+        self.db.rollback()
+        for lookup in self._lookups.values():
+            lookup.rollback()
+
+    def _parse(self, spec: ImportSpec, line: int, raw: Dict[str, str]) -> _Row:
+        try:
+            data = spec.row_schema(**raw).model_dump(exclude_unset=True)
+        except ValidationError as e:
+            raise RowError("; ".join(
+                f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors()
+            ))
+        values = {name: data[name] for name in spec.scalars if name in data}
+        for ref in spec.references:
+            if ref.field not in data:
+                continue
+            nombre = data[ref.field]
+            if nombre is None:
+                if ref.required:
+                    raise RowError(f"{ref.field}: obligatorio")
+                values[ref.attribute] = None
+            else:
+                values[ref.attribute] = self._lookups[ref.field].resolve(nombre)
+        related = None
+        if spec.related.field in data:
+            lookup = self._lookups[spec.related.field]
+            related = frozenset(lookup.resolve(nombre) for nombre in data[spec.related.field])
+        return _Row(line, data.get("id"), values, related)
+
+    def _load_existing(self, spec: ImportSpec, rows: List[_Row]) -> Tuple[Dict[Any, List[Any]], Dict[int, FrozenSet[int]]]:
+        """
+        Registros del lote ya existentes, indexados por id y por nombre
+        normalizado, y los ids de su relación muchos a muchos
+        """
+        model = spec.model
+        ids = {row.id for row in rows if row.id is not None}
+        names = {row.values["nombre"] for row in rows if row.id is None and row.values.get("nombre")}
+        existing: Dict[Any, List[Any]] = {}
+        if ids:
+            for item in self.db.scalars(select(model).where(model.id.in_(ids))):
+                existing[item.id] = [item]
+        if names:
+            for item in self.db.scalars(select(model).where(model.nombre.in_(names))):
+                existing.setdefault(fold(item.nombre), []).append(item)
+
+        related: Dict[int, FrozenSet[int]] = {}
+        owner_ids = {item.id for items in existing.values() for item in items}
+        if owner_ids and any(row.related is not None for row in rows):
+            table = spec.related.table
+            owner = table.c[spec.related.owner_column]
+            target = table.c[spec.related.target_column]
+            grouped: Dict[int, set] = {}
+            for owner_id, target_id in self.db.execute(select(owner, target).where(owner.in_(owner_ids))):
+                grouped.setdefault(owner_id, set()).add(target_id)
+            related = {owner_id: frozenset(values) for owner_id, values in grouped.items()}
+        return existing, related
+
+    def _match(self, spec: ImportSpec, row: _Row, existing: Dict[Any, List[Any]], pending: Dict[Tuple[str, Any], Any]):
+        """Registro al que se aplica la fila, o None si hay que crearlo"""
+        if row.id is not None:
+            items = existing.get(row.id)
+            if not items:
+                raise RowError(f"No existe {spec.model.__tablename__} con id {row.id}")
+            return items[0]
+
+        nombre = row.values.get("nombre")
+        if not nombre:
+            raise RowError("nombre: obligatorio si no se indica el id")
+        key = row.values.get(spec.natural_key)
+        candidates = [
+            item for item in existing.get(fold(nombre), [])
+            if spec.natural_key not in row.values or getattr(item, spec.natural_key) == key
+        ]
+        candidates += [
+            item for (pending_name, pending_key), item in pending.items()
+            if pending_name == fold(nombre) and (spec.natural_key not in row.values or pending_key == key)
+        ]
+        if len(candidates) > 1:
+            raise RowError(f"'{nombre}' coincide con varios registros: indica el id")
+        return candidates[0] if candidates else None
+
+    def _create(self, spec: ImportSpec, row: _Row):
+        if row.id is not None:
+            raise RowError(f"No existe {spec.model.__tablename__} con id {row.id}")
+        required = [(name, name) for name in _REQUIRED_ON_CREATE]
+        required += [(ref.attribute, ref.field) for ref in spec.references if ref.required]
+        missing = [field for name, field in required if row.values.get(name) is None]
+        if missing:
+            raise RowError(f"Faltan datos para crear el registro: {', '.join(missing)}")
+        item = spec.model(**{name: value for name, value in row.values.items() if name != "is_active"})
+        self.db.add(item)
+        if row.values.get("is_active") is False:
+            item.soft_delete()
+        return item
+
+    def _update(self, item: Any, values: Dict[str, Any]) -> None:
+        for name, value in values.items():
+            if name == "is_active":
+                if value and not item.is_active:
+                    item.restore()
+                elif not value and item.is_active:
+                    item.soft_delete()
+            elif getattr(item, name) != value:
+                setattr(item, name, value)
+
+    def _replace_related(self, spec: ImportSpec, owner_id: int, current: FrozenSet[int], wanted: FrozenSet[int]) -> None:
+        related = spec.related
+        owner = related.table.c[related.owner_column]
+        target = related.table.c[related.target_column]
+        removed = current - wanted
+        added = wanted - current
+        if removed:
+            self.db.execute(delete(related.table).where(owner == owner_id, target.in_(removed)))
+        if added:
+            self.db.execute(insert(related.table), [
+                {related.owner_column: owner_id, related.target_column: target_id} for target_id in added
+            ])
+        # Los cambios en la tabla intermedia no pasan por el flush del ORM
+        mark_changed(self.db, spec.model.__tablename__, [owner_id])
+        read_model.refresh(self.db, self.db.get(spec.model, owner_id))
+
+def _open_csv(stream: IO[bytes]) -> csv.DictReader:
+    """
+    Lector sobre el fichero subido sin cargarlo en memoria. Detecta el
+    separador (',' ';' o tabulador, según la configuración regional de la
+    hoja de cálculo) a partir de la cabecera
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    header = text.readline()
+    if not header.strip():
+        raise ValueError("El CSV está vacío")
+    delimiter = max(",;\t", key=header.count)
+    fieldnames = [name.strip().lower() for name in next(csv.reader([header], delimiter=delimiter))]
+    return csv.DictReader(text, fieldnames=fieldnames, delimiter=delimiter)
+
+def _numbered(reader: csv.DictReader) -> Iterator[Tuple[int, Dict[str, str]]]:
+    """Filas no vacías con su línea en el fichero (la cabecera es la 1)"""
+    for raw in reader:
+        if not any(value and value.strip() for key, value in raw.items() if key is not None):
+            continue
+        raw.pop(None, None)
+        yield reader.line_num + 1, raw
+
+def _normalized(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return str(value.quantize(Decimal("0.01")))
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    return value
+
+def _content_hash(values: Dict[str, Any], related: Optional[FrozenSet[int]]) -> str:
+    """Hash de los campos presentes en la fila, comparable con el del registro actual"""
+    content = {name: _normalized(value) for name, value in values.items()}
+    if related is not None:
+        content["_related"] = _normalized(related)
+    encoded = json.dumps(content, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
@@ -0,0 +1,18 @@
+"""
+Caché compartida de las respuestas agrupadas del menú
+"""
+from src.core.cache import build_cache
+from src.core.config import settings
+from src.core.singleflight import SingleFlight
+from src.database.change_tracking import MENU_SCOPE, CommittedChanges, register_commit_listener
+
+menu_cache = build_cache("menu")
+
+# Las consultas idénticas simultáneas con la caché fría comparten un único cálculo
+menu_flight = SingleFlight(wait_timeout=settings.cache_flight_wait_seconds)
+
+@register_commit_listener
+def _invalidate_menu_cache(changes: CommittedChanges) -> None:
+    """Invalida la caché con cada cambio confirmado del menú (local o de otro worker)"""
+    if changes.scope == MENU_SCOPE:
+        menu_cache.invalidate(changes.version, local=changes.local)
@@ -0,0 +1,196 @@
+"""
+Canal de eventos de versión del menú para clientes SSE
+"""
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
+
+from starlette.concurrency import run_in_threadpool
+
+from src.core.config import settings
+from src.database import SessionLocal
+from src.database.change_tracking import (
+    MENU_SCOPE,
+    PUBLICATION_SCOPE,
+    CommittedChanges,
+    dispatch,
+    read_version,
+    register_commit_listener,
+)
+
+logger = logging.getLogger(__name__)
+
+# Máximo de ids por tabla incluidos en un evento
+MAX_IDS_PER_TABLE = 200
+
+class MenuEventBroker:
+    """
+    Difunde la versión del menú a todas las conexiones SSE de un worker.
+
+    Todas las conexiones esperan sobre un único futuro compartido que se
+    sustituye en cada publicación, así que una conexión ociosa solo cuesta
+    una corrutina suspendida. Entre workers se coordina sondeando las filas
+    ``versiones_cambios`` de `scopes` desde una única tarea por worker; a los
+    clientes solo se anuncia el primero (con publicaciones, "publicacion").
+    """
+
+    def __init__(
+        self,
+        poll_interval: float,
+        heartbeat_interval: float,
+        scopes: Sequence[str] = (MENU_SCOPE,)
+    ) -> None:
+        self.poll_interval = poll_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.scope = scopes[0]
+        # Última versión vista de los ámbitos que se sondean pero no se anuncian
+        self._seen: Dict[str, int] = {scope: 0 for scope in scopes[1:]}
+        self.version = 0
+        self.last_event: Dict[str, Any] = {"version": 0}
+        self.subscribers = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Future] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._poller: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Arranca el sondeo de versión en el bucle de eventos actual"""
+        self._loop = asyncio.get_running_loop()
+        self._changed = self._loop.create_future()
+        self._wakeup = asyncio.Event()
+        try:
+            rows = await run_in_threadpool(self._read_versions)
+        except Exception as e:
+            logger.warning("No se pudo leer la versión del menú: %s", e)
+            rows = {}
+        for scope, row in rows.items():
+            if not row:
+                continue
+            if scope == self.scope:
+                self._publish({"version": row[0]})
+            else:
+                self._seen[scope] = row[0]
+        if self.poll_interval > 0:
+            self._poller = asyncio.create_task(self._poll_loop())
+
+    async def stop(self) -> None:
+        """Detiene el sondeo y libera a los suscriptores"""
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        if self._changed is not None and not self._changed.done():
+            self._changed.set_result(None)
+        self._loop = None
+
+    def on_commit(self, changes: CommittedChanges) -> None:
+        """Listener de commits: se invoca desde cualquier hilo"""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        if changes.scope in self._seen:
+            if changes.version is not None:
+                loop.call_soon_threadsafe(self._see, changes.scope, changes.version)
+            return
+        if changes.scope != self.scope:
+            return
+        if changes.version is None:
+            # Versión desconocida: que el sondeo lea la de la base de datos
+            loop.call_soon_threadsafe(self._wakeup.set)
+            return
+        event = {
+            "version": changes.version,
+            "tablas": sorted(changes.tables),
+            "entidades": {
+                table: sorted(ids)
+                for table, ids in changes.entities.items()
+                if ids and len(ids) <= MAX_IDS_PER_TABLE
+            },
+        }
+        loop.call_soon_threadsafe(self._publish, event)
+
+    async def stream(self, last_event_id: Optional[int] = None) -> AsyncIterator[str]:
+        """Genera los mensajes SSE de una conexión"""
+        self.subscribers += 1
+        try:
+            yield f"retry: {int(self.poll_interval * 1000) + 1000}\n\n"
+            sent = last_event_id if last_event_id is not None else -1
+            while True:
+                if self.version > sent:
+                    event = self.last_event
+                    sent = event["version"]
+                    yield self._format(event)
+                changed = self._changed
+                if changed is None:
+                    return
+                try:
+                    event = await asyncio.wait_for(asyncio.shield(changed), self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    return
+        finally:
+            self.subscribers -= 1
+
+    def _publish(self, event: Dict[str, Any]) -> None:
+        if self.version and event["version"] <= self.version:
+            return
+        self.version = event["version"]
+        self.last_event = event
+        changed, self._changed = self._changed, self._loop.create_future()
+        if changed is not None and not changed.done():
+            changed.set_result(event)
+
+    def _see(self, scope: str, version: int) -> None:
+        self._seen[scope] = max(self._seen[scope], version)
+
+    async def _poll_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                rows = await run_in_threadpool(self._read_versions)
+            except Exception as e:
+                logger.warning("Error al sondear la versión del menú: %s", e)
+                continue
+            for scope, row in rows.items():
+                seen = self.version if scope == self.scope else self._seen[scope]
+                if row and row[0] > seen:
+                    if scope in self._seen:
+                        self._seen[scope] = row[0]
+                    tablas = frozenset(filter(None, (row[1] or "").split(",")))
+                    # Cambio confirmado por otro worker (o sin versión local)
+                    dispatch(CommittedChanges(
+                        scope=scope,
+                        version=row[0],
+                        tables=tablas,
+                        local=False,
+                    ))
+
+    def _read_versions(self) -> Dict[str, Optional[tuple]]:
+        db = SessionLocal()
+        try:
+            return {scope: read_version(db, scope) for scope in (self.scope, *self._seen)}
+        finally:
+            db.close()
+
+    @staticmethod
+    def _format(event: Dict[str, Any]) -> str:
+        data = json.dumps(event, ensure_ascii=False)
+        return f"id: {event['version']}\nevent: menu-version\ndata: {data}\n\n"
+
+menu_event_broker = MenuEventBroker(
+    poll_interval=settings.menu_events_poll_seconds,
+    heartbeat_interval=settings.menu_events_heartbeat_seconds,
+    # Con publicaciones la carta pública solo cambia al publicar
+    scopes=(PUBLICATION_SCOPE, MENU_SCOPE) if settings.menu_publication_enabled else (MENU_SCOPE,),
+)
+register_commit_listener(menu_event_broker.on_commit)
@@ -1,25 +1,145 @@
 """
 Servicio para lógica de negocio del menú
 """
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 from sqlalchemy.orm import Session
+from src.core.cache import cache_key
+from src.core.tracing import traced
+from src.repositories.json_aggregation import JsonAggregation
 from src.repositories.menu_repository import MenuRepository
+from src.schemas.menu_schema import PlatoResponse
+from src.services.catalog_service import CatalogService
+from src.services.grouped_stream import stream_grouped_json
+from src.services.menu_cache import menu_cache, menu_flight
 
 class MenuService:
     def __init__(self, db: Session):
         self.db = db
         self.menu_repo = MenuRepository(db)
     
+    @traced()
     def get_platos_public(
         self, 
         categoria: Optional[str] = None,
         sugerencias: Optional[bool] = None,
         precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        sort: Optional[str] = None
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Lógica de negocio + transformación para API pública. Con `sort`, los
+        registros de cada grupo salen en ese orden (precio, -precio, nombre)
+        """
+        key = cache_key(
+            "platos",
+            categoria=categoria,
+            sugerencias=sugerencias,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            sort=sort
+        )
+        return menu_cache.get_or_set(
+            key,
+            lambda: self._build_platos_public(categoria, sugerencias, precio_min, precio_max, sort),
+            flight=menu_flight
+        )
+    
+    @traced()
+    def get_platos_public_json(
+        self,
+        categoria: Optional[str] = None,
+        sugerencias: Optional[bool] = None,
+        precio_min: Optional[float] = None,
         precio_max: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Mismos platos que `get_platos_public`, agrupados por la base de datos
+        y ya serializados (el orden de las claves lo decide la base de datos).
+        None si la base de datos no admite la agregación JSON
+        """
+        if not JsonAggregation.supported(self.db):
+            return None
+        key = cache_key(
+            "platos_json",
+            categoria=categoria,
+            sugerencias=sugerencias,
+            precio_min=precio_min,
+            precio_max=precio_max
+        )
+        return menu_cache.get_or_set(
+            key,
+            lambda: self.menu_repo.get_platos_grouped_json(
+                categoria=categoria,
+                sugerencias=sugerencias,
+                precio_min=precio_min,
+                precio_max=precio_max,
+                is_active=self._determine_active_filter(sugerencias)
+            ),
+            flight=menu_flight
+        )
+    
+    def stream_platos_public(
+        self,
+        categoria: Optional[str] = None,
+        sugerencias: Optional[bool] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        sort: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[bytes]:
+        """
+        Mismo JSON que `get_platos_public` escrito por partes desde un cursor
+        de servidor, sin caché y con memoria constante. Las categorías salen
+        en orden alfabético. La sesión tiene que seguir abierta mientras se
+        consume el generador
+        """
+        rows = self.menu_repo.iter_platos_rows(
+            categoria=categoria,
+            sugerencias=sugerencias,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            is_active=self._determine_active_filter(sugerencias),
+            sort=sort,
+            batch_size=batch_size
+        )
+        
+        def records():
+            for plato in rows:
+                item = PlatoResponse(
+                    id=plato.id,
+                    nombre=plato.nombre,
+                    descripcion=plato.descripcion,
+                    precio=float(plato.precio) if plato.precio else None,
+                    precio_unidad=plato.precio_unidad,
+                    alergenos=plato.alergenos or []
+                )
+                yield (plato.categoria,), item.model_dump_json()
+        
+        return stream_grouped_json("platos", records(), depth=1)
+    
+    @traced()
+    def _build_platos_public(
+        self,
+        categoria: Optional[str],
+        sugerencias: Optional[bool],
+        precio_min: Optional[float],
+        precio_max: Optional[float],
+        sort: Optional[str] = None
     ) -> Dict[str, List[Dict[str, Any]]]:
         """
-        Lógica de negocio + transformación para API pública
+        Consulta y agrupación sin caché. Los listados ordenados salen de las
+        permutaciones precalculadas del catálogo en memoria
         """
+        if sort is not None:
+            return CatalogService().get_grouped(
+                "platos",
+                sort,
+                categoria=categoria,
+                sugerencias=sugerencias,
+                precio_min=precio_min,
+                precio_max=precio_max
+            )
+        
         # LÓGICA DE NEGOCIO: determinar qué platos mostrar
         is_active = self._determine_active_filter(sugerencias)
         
@@ -47,6 +167,7 @@ class MenuService:
             # Comportamiento por defecto: solo activos
             return True
     
+    @traced()
     def _group_platos_by_category(self, platos: List) -> Dict[str, List[Dict[str, Any]]]:
         """
         TRANSFORMACIÓN: convertir objetos Plato a estructura para API
@@ -54,7 +175,7 @@ class MenuService:
         platos_agrupados = {}
         
         for plato in platos:
-            categoria_nombre = plato.categoria.nombre
+            categoria_nombre = plato.categoria_nombre
             
             # Crear la categoría si no existe
             if categoria_nombre not in platos_agrupados:
@@ -68,7 +189,7 @@ class MenuService:
                 "precio": float(plato.precio) if plato.precio else None,
                 "precio_unidad": plato.precio_unidad,
                 "sugerencias": plato.sugerencias,
-                "alergenos": [alergeno.nombre for alergeno in plato.alergenos] if plato.alergenos else []
+                "alergenos": list(plato.alergenos_nombres or [])
             }
             
             platos_agrupados[categoria_nombre].append(plato_dict)
@@ -0,0 +1,470 @@
+"""
+Maridaje precalculado de platos con vinos
+
+Platos y vinos se proyectan sobre un mismo espacio de perfiles (carne roja,
+pescado, marisco, queso...) a partir de reglas de palabras clave sobre su
+categoría, descripción, alérgenos, uvas y denominación. La afinidad es el
+coseno entre perfiles más un ajuste por franja de precio, y el top-K de cada
+plato se calcula para todo el catálogo con una multiplicación de matrices y
+``argpartition``. Las consultas son una búsqueda en un diccionario; tras un
+cambio confirmado, la siguiente consulta recalcula solo lo afectado.
+
+Con ``MENU_PUBLICATION_ENABLED`` el índice sale de la versión publicada (la
+instantánea del catálogo) y se reconstruye entero al publicar; los cambios
+en el borrador no le afectan.
+"""
+import logging
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.orm import Session, selectinload
+
+from src.core.config import settings
+from src.database import SessionLocal
+from src.database.change_tracking import MENU_SCOPE, CommittedChanges, register_commit_listener
+from src.entities.plato import Plato
+from src.entities.vino import Vino
+from src.repositories.vinos_repository import SIN_DENOMINACION
+from src.services.catalog_service import CATALOG_SCOPE, CatalogSnapshot, catalog_store
+
+logger = logging.getLogger(__name__)
+
+PROFILES = (
+    "carne_roja",
+    "carne_blanca",
+    "pescado",
+    "marisco",
+    "queso",
+    "embutido",
+    "verdura",
+    "picante",
+    "dulce",
+    "frito",
+    "arroz_pasta",
+)
+_PROFILE_INDEX = {name: index for index, name in enumerate(PROFILES)}
+
+# Palabras clave (sin tildes, admiten plural) de platos -> pesos por perfil
+PLATO_RULES: Dict[str, Dict[str, float]] = {
+    "ternera|buey|solomillo|chuleton|entrecot|cordero|rabo|carrillera|hamburguesa|burger|costilla|foie|lasana de carne": {"carne_roja": 1.0},
+    "pollo|pato|conejo|cerdo|secreto|presa|pluma|cochinillo|pavo|pate": {"carne_blanca": 1.0},
+    "atun|bacalao|merluza|corvina|salmon|lubina|dorada|rape|boqueron|anchoa|sardina|pescado|fish": {"pescado": 1.0},
+    "gamba|langostino|pulpo|mejillon|almeja|calamar|vieira|zamburina|navaja|chipiron|marisco|crustaceo|molusco|crustaceans|molluscs": {"marisco": 1.0},
+    "queso|burrata|ricotta|mozzarella|parmesano|mascarpone|manchego|gratinad[oa]": {"queso": 1.0},
+    "jamon|chorizo|lomo|cecina|salchichon|bacon|embutido": {"embutido": 1.0},
+    "ensalada|verdura|champinon|seta|esparrago|pimiento|alcachofa|hummus|berenjena|espinaca|quinoa|edamame|cebolla|tomate": {"verdura": 1.0},
+    "picante|guindilla|brava|curry|chile|pimenton|wasabi": {"picante": 1.0},
+    "postre|tarta|chocolate|helado|flan|natillas|crema catalana|crema pastelera|brownie|coulant|tiramisu|sorbete|milhojas|panna cotta|caramelo|caramelizad[oa]|membrillo": {"dulce": 1.0},
+    "frito|fritura|croqueta|rebozad[oa]|tempura|romana|empanada": {"frito": 1.0},
+    "arroz|paella|risotto|pasta|fideo|fideua|ravioli|lasana|canelon|espagueti": {"arroz_pasta": 1.0},
+    "milk|lacteo|leche": {"queso": 0.3},
+}
+
+# Palabras clave de vinos (tipo, uvas, denominación) -> pesos por perfil
+VINO_RULES: Dict[str, Dict[str, float]] = {
+    "tinto": {"carne_roja": 1.0, "carne_blanca": 0.5, "embutido": 0.5, "queso": 0.3},
+    "crianza|reserva": {"carne_roja": 1.0, "queso": 0.7, "embutido": 0.3},
+    "joven": {"carne_blanca": 0.5, "embutido": 0.5, "arroz_pasta": 0.5, "picante": 0.3, "verdura": 0.3},
+    "blanco": {"pescado": 1.0, "marisco": 0.8, "verdura": 0.6, "frito": 0.4},
+    "rosado": {"arroz_pasta": 1.0, "verdura": 0.5, "picante": 0.6, "carne_blanca": 0.4},
+    "espumoso|cava|champagne": {"frito": 1.0, "marisco": 0.8, "picante": 0.4},
+    "dulce|pedro ximenez|moscatel|montilla": {"dulce": 1.5, "queso": 0.6},
+    "albarino|rias baixas": {"marisco": 1.0, "pescado": 0.8},
+    "verdejo|rueda": {"pescado": 0.6, "verdura": 0.6, "frito": 0.5},
+    "sauvignon": {"verdura": 0.8, "pescado": 0.5, "queso": 0.3},
+    "chardonnay|penedes": {"carne_blanca": 0.5, "pescado": 0.6, "queso": 0.4},
+    "tempranillo|rioja|ribera": {"carne_roja": 0.7, "embutido": 0.6},
+    "garnacha|priorat": {"carne_blanca": 0.5, "arroz_pasta": 0.5, "embutido": 0.4},
+    "graciano": {"carne_roja": 0.6},
+    "mencia|bierzo": {"carne_blanca": 0.6, "pescado": 0.3, "embutido": 0.4},
+    "fino|manzanilla|generoso": {"frito": 0.8, "embutido": 0.8, "marisco": 0.5},
+}
+
+# Franjas de precio (límites superiores en euros) y afinidad entre franjas
+PLATO_PRICE_BANDS = (10.0, 20.0)
+VINO_PRICE_BANDS = (15.0, 25.0)
+BAND_AFFINITY = np.array([
+    [1.0, 0.5, 0.0],
+    [0.5, 1.0, 0.5],
+    [0.0, 0.5, 1.0],
+], dtype=np.float32)
+PRICE_WEIGHT = 0.2
+
+# Tablas cuyo cambio obliga a reconstruir todo el índice
+_LOOKUP_TABLES = frozenset({
+    "categoria_platos", "categoria_vinos", "alergenos", "bodegas",
+    "denominaciones_origen", "enologos", "uvas",
+})
+# Por encima de esta fracción del catálogo cambiada se reconstruye entero
+_FULL_REBUILD_RATIO = 0.25
+# Filas de platos por bloque al calcular la matriz completa
+_CHUNK_ROWS = 1024
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode("ascii")
+    return " ".join(text.lower().split())
+
+def _compile(rules: Dict[str, Dict[str, float]]):
+    compiled = []
+    for keywords, weights in rules.items():
+        vector = np.zeros(len(PROFILES), dtype=np.float32)
+        for profile, weight in weights.items():
+            vector[_PROFILE_INDEX[profile]] = weight
+        compiled.append((re.compile(r"\b(?:" + keywords + r")(?:s|es)?\b"), vector))
+    return compiled
+
+_PLATO_RULES = _compile(PLATO_RULES)
+_VINO_RULES = _compile(VINO_RULES)
+
+def _profile(texts: Iterable[Optional[str]], rules) -> np.ndarray:
+    text = _fold(" ".join(t for t in texts if t))
+    vector = np.zeros(len(PROFILES), dtype=np.float32)
+    for pattern, weights in rules:
+        if pattern.search(text):
+            vector += weights
+    norm = float(np.linalg.norm(vector))
+    return vector / norm if norm else vector
+
+def _band(precio, bands) -> int:
+    return int(np.searchsorted(bands, float(precio or 0), side="left"))
+
+def plato_features(plato: Plato) -> np.ndarray:
+    return _profile(
+        [plato.nombre, plato.descripcion, plato.categoria.nombre if plato.categoria else None]
+        + [alergeno.nombre for alergeno in plato.alergenos],
+        _PLATO_RULES,
+    )
+
+def vino_features(vino: Vino) -> np.ndarray:
+    return _profile(
+        [vino.categoria.nombre if vino.categoria else None,
+         vino.denominacion_origen.nombre if vino.denominacion_origen else None]
+        + [uva.nombre for uva in vino.uvas],
+        _VINO_RULES,
+    )
+
+def plato_item_features(item: Dict[str, Any]) -> np.ndarray:
+    """Como `plato_features`, sobre un plato del catálogo publicado"""
+    return _profile([item["nombre"], item["descripcion"], item["categoria"]] + item["alergenos"], _PLATO_RULES)
+
+def vino_item_features(item: Dict[str, Any]) -> np.ndarray:
+    """Como `vino_features`, sobre un vino del catálogo publicado"""
+    return _profile([item["tipo"], _denominacion(item)] + item["uvas"], _VINO_RULES)
+
+def _denominacion(item: Dict[str, Any]) -> Optional[str]:
+    return None if item["denominacion"] == SIN_DENOMINACION else item["denominacion"]
+
+def _vino_item_info(item: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": item["id"],
+        "nombre": item["nombre"],
+        "precio": item["precio"],
+        "precio_unidad": item["precio_unidad"],
+        "tipo": item["tipo"],
+        "denominacion": _denominacion(item),
+        "bodega": item["bodega"],
+        "uvas": list(item["uvas"]),
+        "enologo": item["enologo"],
+    }
+
+def _vino_info(vino: Vino) -> Dict[str, Any]:
+    return {
+        "id": vino.id,
+        "nombre": vino.nombre,
+        "precio": float(vino.precio) if vino.precio else None,
+        "precio_unidad": vino.precio_unidad,
+        "tipo": vino.categoria.nombre if vino.categoria else None,
+        "denominacion": vino.denominacion_origen.nombre if vino.denominacion_origen else None,
+        "bodega": vino.bodega.nombre if vino.bodega else None,
+        "uvas": [uva.nombre for uva in vino.uvas],
+        "enologo": vino.enologo.nombre if vino.enologo else None,
+    }
+
+class PairingIndex:
+    """
+    Matriz top-K plato -> vinos. Las columnas de vinos son estables: un vino
+    retirado queda marcado como no disponible en lugar de desplazar índices
+    """
+
+    def __init__(self, top_k: int) -> None:
+        self.top_k = top_k
+        self._lock = threading.Lock()
+        self._built = False
+        self._full_pending = True
+        self._pending_platos: Set[int] = set()
+        self._pending_vinos: Set[int] = set()
+        self._reset()
+
+    def _reset(self) -> None:
+        features = len(PROFILES)
+        self._plato_rows: Dict[int, int] = {}
+        self._plato_vectors = np.zeros((0, features), dtype=np.float32)
+        self._plato_bands = np.zeros(0, dtype=np.int64)
+        self._vino_ids: List[int] = []
+        self._vino_cols: Dict[int, int] = {}
+        self._vino_info: List[Optional[Dict[str, Any]]] = []
+        self._vino_vectors = np.zeros((0, features), dtype=np.float32)
+        self._vino_bands = np.zeros(0, dtype=np.int64)
+        self._vino_alive = np.zeros(0, dtype=bool)
+        self._top_cols = np.zeros((0, 0), dtype=np.int64)
+        self._top_scores = np.zeros((0, 0), dtype=np.float32)
+        self._responses: Dict[int, List[Dict[str, Any]]] = {}
+
+    def get(self, plato_id: int) -> Optional[List[Dict[str, Any]]]:
+        """Vinos sugeridos para el plato, o None si el plato no existe"""
+        if self._full_pending or self._pending_platos or self._pending_vinos:
+            self.refresh()
+        response = self._responses.get(plato_id)
+        if response is not None:
+            return response
+        with self._lock:
+            row = self._plato_rows.get(plato_id)
+            if row is None:
+                return None
+            response = []
+            for col, score in zip(self._top_cols[row], self._top_scores[row]):
+                if not np.isfinite(score) or score <= 0:
+                    continue
+                response.append({**self._vino_info[col], "afinidad": round(float(score), 4)})
+            self._responses[plato_id] = response
+            return response
+
+    def invalidate(self, platos: Iterable[int] = (), vinos: Iterable[int] = (), full: bool = False) -> None:
+        """Anota cambios para aplicarlos en la siguiente consulta"""
+        with self._lock:
+            self._full_pending = self._full_pending or full
+            self._pending_platos.update(platos)
+            self._pending_vinos.update(vinos)
+
+    def refresh(self) -> None:
+        """Aplica los cambios pendientes (reconstrucción completa o incremental)"""
+        with self._lock:
+            full = self._full_pending or not self._built
+            platos, vinos = self._pending_platos, self._pending_vinos
+            self._full_pending = False
+            self._pending_platos, self._pending_vinos = set(), set()
+            catalog = len(self._plato_rows) + len(self._vino_ids)
+            if not full and len(platos) + len(vinos) > catalog * _FULL_REBUILD_RATIO:
+                full = True
+            try:
+                if settings.menu_publication_enabled:
+                    # Solo se anotan reconstrucciones completas (al publicar)
+                    self._build_published(catalog_store.refresh())
+                else:
+                    with SessionLocal() as db:
+                        if full:
+                            self._build(db)
+                        else:
+                            if vinos:
+                                self._update_vinos(db, vinos)
+                            if platos:
+                                self._update_platos(db, platos)
+            except Exception:
+                # Se reintenta todo en la siguiente consulta
+                self._full_pending = True
+                raise
+            self._responses = {}
+
+    # Construcción
+
+    def _build(self, db: Session) -> None:
+        self._reset()
+        vinos = self._load_vinos(db)
+        for vino in vinos:
+            self._put_vino(vino.id, vino_features(vino), vino.precio, _vino_info(vino))
+        platos = self._load_platos(db)
+        for plato in platos:
+            self._put_plato(plato.id, plato_features(plato), plato.precio)
+        self._rank_all()
+
+    def _build_published(self, snapshot: CatalogSnapshot) -> None:
+        """Reconstruye el índice con los platos visibles y los vinos de la versión publicada"""
+        self._reset()
+        for item in snapshot.vinos.items:
+            self._put_vino(item["id"], vino_item_features(item), item["precio"], _vino_item_info(item))
+        for row in sorted(snapshot.public_platos):
+            item = snapshot.platos.items[row]
+            self._put_plato(item["id"], plato_item_features(item), item["precio"])
+        self._rank_all()
+
+    def _rank_all(self) -> None:
+        rows = np.arange(self._plato_vectors.shape[0])
+        self._top_cols = np.zeros((len(rows), self._k), dtype=np.int64)
+        self._top_scores = np.full((len(rows), self._k), -np.inf, dtype=np.float32)
+        for start in range(0, len(rows), _CHUNK_ROWS):
+            self._rank_rows(rows[start:start + _CHUNK_ROWS])
+        self._built = True
+        logger.info("Índice de maridaje construido: %d platos x %d vinos", len(rows), len(self._vino_ids))
+
+    @property
+    def _k(self) -> int:
+        return max(1, min(self.top_k, len(self._vino_ids)))
+
+    def _load_platos(self, db: Session, ids: Optional[Set[int]] = None) -> List[Plato]:
+        """Platos visibles en la API pública: activos o sugerencias (como MenuRepository.get_platos_by_ids)"""
+        query = (
+            db.query(Plato)
+            .options(selectinload(Plato.alergenos), selectinload(Plato.categoria))
+            .filter(or_(Plato.is_active == True, Plato.sugerencias == True))
+        )
+        if ids is not None:
+            query = query.filter(Plato.id.in_(ids))
+        return query.all()
+
+    def _load_vinos(self, db: Session, ids: Optional[Set[int]] = None) -> List[Vino]:
+        """Vinos visibles en la API pública: activos y con bodega (como VinosRepository.get_vinos_by_ids)"""
+        query = (
+            db.query(Vino)
+            .options(
+                selectinload(Vino.categoria),
+                selectinload(Vino.denominacion_origen),
+                selectinload(Vino.bodega),
+                selectinload(Vino.enologo),
+                selectinload(Vino.uvas),
+            )
+            .filter(Vino.is_active == True, Vino.bodega_id.isnot(None))
+        )
+        if ids is not None:
+            query = query.filter(Vino.id.in_(ids))
+        return query.all()
+
+    def _put_vino(self, vino_id: int, vector: np.ndarray, precio, info: Dict[str, Any]) -> int:
+        col = self._vino_cols.get(vino_id)
+        band = _band(precio, VINO_PRICE_BANDS)
+        if col is None:
+            col = len(self._vino_ids)
+            self._vino_cols[vino_id] = col
+            self._vino_ids.append(vino_id)
+            self._vino_info.append(None)
+            self._vino_vectors = np.vstack([self._vino_vectors, vector])
+            self._vino_bands = np.append(self._vino_bands, band)
+            self._vino_alive = np.append(self._vino_alive, True)
+        else:
+            self._vino_vectors[col] = vector
+            self._vino_bands[col] = band
+            self._vino_alive[col] = True
+        self._vino_info[col] = info
+        return col
+
+    def _put_plato(self, plato_id: int, vector: np.ndarray, precio) -> int:
+        row = self._plato_rows.get(plato_id)
+        band = _band(precio, PLATO_PRICE_BANDS)
+        if row is None:
+            row = self._plato_vectors.shape[0]
+            self._plato_rows[plato_id] = row
+            self._plato_vectors = np.vstack([self._plato_vectors, vector])
+            self._plato_bands = np.append(self._plato_bands, band)
+        else:
+            self._plato_vectors[row] = vector
+            self._plato_bands[row] = band
+        return row
+
+    def _scores(self, rows: np.ndarray, cols: Optional[np.ndarray] = None) -> np.ndarray:
+        """Afinidad de las filas de platos con las columnas de vinos (todas por defecto)"""
+        if cols is None:
+            cols = np.arange(len(self._vino_ids))
+        scores = self._plato_vectors[rows] @ self._vino_vectors[cols].T
+        scores += PRICE_WEIGHT * BAND_AFFINITY[self._plato_bands[rows]][:, self._vino_bands[cols]]
+        scores[:, ~self._vino_alive[cols]] = -np.inf
+        return scores
+
+    @staticmethod
+    def _select_top(scores: np.ndarray, cols: np.ndarray, k: int):
+        """Top-k por fila sin ordenar toda la fila (argpartition + orden de k)"""
+        k = min(k, scores.shape[1])
+        part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        part_scores = np.take_along_axis(scores, part, axis=1)
+        order = np.argsort(-part_scores, axis=1, kind="stable")
+        part = np.take_along_axis(part, order, axis=1)
+        return cols[part] if cols.ndim == 1 else np.take_along_axis(cols, part, axis=1), \
+            np.take_along_axis(part_scores, order, axis=1)
+
+    def _rank_rows(self, rows: np.ndarray) -> None:
+        if len(rows) == 0 or not self._vino_ids:
+            return
+        top_cols, top_scores = self._select_top(self._scores(rows), np.arange(len(self._vino_ids)), self._k)
+        self._top_cols[rows, :top_cols.shape[1]] = top_cols
+        self._top_scores[rows, :top_scores.shape[1]] = top_scores
+
+    # Actualización incremental
+
+    def _grow_top(self) -> None:
+        """Ajusta el ancho de la matriz top-K si el catálogo de vinos ha crecido"""
+        rows, width = self._top_cols.shape
+        if width < self._k or rows < self._plato_vectors.shape[0]:
+            k = max(width, self._k)
+            total = self._plato_vectors.shape[0]
+            cols = np.zeros((total, k), dtype=np.int64)
+            scores = np.full((total, k), -np.inf, dtype=np.float32)
+            cols[:rows, :width] = self._top_cols
+            scores[:rows, :width] = self._top_scores
+            self._top_cols, self._top_scores = cols, scores
+
+    def _update_vinos(self, db: Session, ids: Set[int]) -> None:
+        loaded = {vino.id: vino for vino in self._load_vinos(db, ids)}
+        changed = []
+        for vino_id in ids:
+            vino = loaded.get(vino_id)
+            if vino is not None:
+                changed.append(self._put_vino(vino.id, vino_features(vino), vino.precio, _vino_info(vino)))
+            elif vino_id in self._vino_cols:
+                col = self._vino_cols[vino_id]
+                self._vino_alive[col] = False
+                changed.append(col)
+        if not changed:
+            return
+        self._grow_top()
+        changed_cols = np.array(changed, dtype=np.int64)
+        rows = np.arange(self._plato_vectors.shape[0])
+
+        # Filas cuyo top-K contenía un vino cambiado: recalcular la fila entera
+        stale = np.isin(self._top_cols, changed_cols).any(axis=1)
+        self._rank_rows(rows[stale])
+
+        # Resto: basta con comparar su top-K actual con los vinos cambiados
+        rest = rows[~stale]
+        if len(rest):
+            candidates = np.hstack([self._top_cols[rest], np.broadcast_to(changed_cols, (len(rest), len(changed_cols)))])
+            scores = np.hstack([self._top_scores[rest], self._scores(rest, changed_cols)])
+            top_cols, top_scores = self._select_top(scores, candidates, self._top_cols.shape[1])
+            self._top_cols[rest] = top_cols
+            self._top_scores[rest] = top_scores
+
+    def _update_platos(self, db: Session, ids: Set[int]) -> None:
+        platos = self._load_platos(db, ids)
+        for plato_id in ids - {plato.id for plato in platos}:
+            # Borrado u oculto: la fila queda huérfana hasta la próxima reconstrucción
+            self._plato_rows.pop(plato_id, None)
+        rows = np.array(
+            [self._put_plato(plato.id, plato_features(plato), plato.precio) for plato in platos],
+            dtype=np.int64
+        )
+        self._grow_top()
+        self._rank_rows(rows)
+
+pairing_index = PairingIndex(top_k=settings.pairing_top_k)
+
+@register_commit_listener
+def _invalidate_pairing_index(changes: CommittedChanges) -> None:
+    """Anota los platos y vinos cambiados; sin ids (otro worker, DML masivo) se reconstruye"""
+    if changes.scope != CATALOG_SCOPE:
+        return
+    if CATALOG_SCOPE != MENU_SCOPE:
+        # Nueva versión publicada
+        pairing_index.invalidate(full=True)
+        return
+    platos = changes.entities.get("platos", frozenset())
+    vinos = changes.entities.get("vinos", frozenset())
+    full = (
+        not changes.local
+        or bool(changes.tables & _LOOKUP_TABLES)
+        or ("platos" in changes.tables and not platos)
+        or ("vinos" in changes.tables and not vinos)
+        or ("platos_alergenos" in changes.tables and not platos)
+        or ("vinos_uvas" in changes.tables and not vinos)
+    )
+    pairing_index.invalidate(platos=platos, vinos=vinos, full=full)
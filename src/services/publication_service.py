@@ -0,0 +1,98 @@
+"""
+Servicio de publicación del menú (borrador y versiones publicadas)
+
+Con ``MENU_PUBLICATION_ENABLED`` las tablas de platos y vinos son el borrador: las
+importaciones, restauraciones y demás cambios no llegan a la carta pública
+hasta que se publica. Publicar lee el borrador en una sola transacción y
+guarda una publicación inmutable con los registros del catálogo y los
+listados sin filtros ya agrupados y serializados. Su commit es el único
+cambio que invalida la carta pública: cada worker construye la instantánea
+de la nueva versión y la sustituye de una vez.
+"""
+import json
+from typing import Any, Dict, List, Optional
+from sqlalchemy.orm import Session, load_only
+from src.entities.publicacion_menu import PublicacionMenu
+from src.services.catalog_service import catalog_entries, encode_item, snapshot_from_entries
+
+class PublicationService:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def publish(self, autor: Optional[str] = None, nota: Optional[str] = None) -> PublicacionMenu:
+        """Publica el borrador actual como una nueva versión"""
+        return self._save(self._draft_entries(), autor, nota)
+
+    def restore(self, version: int, autor: Optional[str] = None) -> Optional[PublicacionMenu]:
+        """
+        Vuelve a publicar el contenido de una versión anterior como una
+        versión nueva; None si no existe
+        """
+        publicacion = self.db.get(PublicacionMenu, version)
+        if publicacion is None:
+            return None
+        return self._save(json.loads(publicacion.catalogo), autor, f"Restauración de la versión {version}")
+
+    def latest(self) -> Optional[PublicacionMenu]:
+        return self.db.query(PublicacionMenu).order_by(PublicacionMenu.id.desc()).first()
+
+    def list_publications(self, limit: int = 50) -> List[PublicacionMenu]:
+        """Versiones publicadas, de la más reciente a la más antigua (sin los documentos)"""
+        return (
+            self.db.query(PublicacionMenu)
+            .options(load_only(
+                PublicacionMenu.id,
+                PublicacionMenu.autor,
+                PublicacionMenu.nota,
+                PublicacionMenu.platos_total,
+                PublicacionMenu.vinos_total,
+                PublicacionMenu.created_at,
+            ))
+            .order_by(PublicacionMenu.id.desc())
+            .limit(limit)
+            .all()
+        )
+
+    def draft_changes(self) -> Dict[str, Any]:
+        """Platos y vinos nuevos, modificados y retirados en el borrador respecto a la última versión"""
+        latest = self.latest()
+        published = json.loads(latest.catalogo) if latest else {"platos": [], "vinos": []}
+        draft = self._draft_entries()
+        return {
+            "version": latest.id if latest else None,
+            "platos": _diff(published["platos"], draft["platos"]),
+            "vinos": _diff(published["vinos"], draft["vinos"]),
+        }
+
+    def _draft_entries(self) -> Dict[str, List[Dict[str, Any]]]:
+        entries = catalog_entries(self.db)
+        # Solo los platos visibles: activos o sugeridos
+        entries["platos"] = [entry for entry in entries["platos"] if entry["activo"] or entry["sugerencia"]]
+        return entries
+
+    def _save(self, entries: Dict[str, List[Dict[str, Any]]], autor: Optional[str], nota: Optional[str]) -> PublicacionMenu:
+        snapshot = snapshot_from_entries(entries)
+        platos = snapshot.platos.grouped(snapshot.plato_rows(None), None)
+        vinos = snapshot.vinos.grouped(snapshot.vinos.all_rows(), None)
+        publicacion = PublicacionMenu(
+            autor=autor,
+            nota=nota,
+            platos_total=len(entries["platos"]),
+            vinos_total=len(entries["vinos"]),
+            catalogo=json.dumps(entries, ensure_ascii=False, separators=(",", ":")),
+            platos_json=encode_item({"platos": platos}).decode("utf-8"),
+            vinos_json=encode_item({"vinos": vinos}).decode("utf-8"),
+        )
+        self.db.add(publicacion)
+        self.db.commit()
+        self.db.refresh(publicacion)
+        return publicacion
+
+def _diff(before: List[Dict[str, Any]], after: List[Dict[str, Any]]) -> Dict[str, List[int]]:
+    old = {entry["item"]["id"]: entry for entry in before}
+    new = {entry["item"]["id"]: entry for entry in after}
+    return {
+        "nuevos": sorted(new.keys() - old.keys()),
+        "modificados": sorted(item_id for item_id in new.keys() & old.keys() if new[item_id] != old[item_id]),
+        "retirados": sorted(old.keys() - new.keys()),
+    }
@@ -0,0 +1,222 @@
+"""
+Exportación del menú público a ficheros estáticos (nginx / CDN)
+
+Cada preset (listado completo, sugerencias, una categoría...) se escribe como
+``<preset>.<hash>.json`` con sus variantes precomprimidas ``.gz`` (y ``.br``
+si está instalado ``brotli``), un alias estable ``<preset>.json`` y un
+``manifest.json`` que se publica al final. Todas las escrituras son atómicas
+(fichero temporal + ``os.replace``), así que nginx nunca sirve un fichero a
+medias. Con ``MENU_PUBLICATION_ENABLED`` se exporta la versión publicada (la
+misma instantánea que sirve la API), nunca las tablas. Ejemplo de
+configuración::
+
+    location /menu/ {
+        root /code/var/snapshots;
+        gzip_static on;
+        location ~ \\.[0-9a-f]{12}\\.json$ { expires max; }
+    }
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+from sqlalchemy.orm import Session
+from src.core.config import settings
+from src.entities.categoria_plato import CategoriaPlato
+from src.entities.categoria_vino import CategoriaVino
+from src.schemas.menu_schema import PlatosGroupedResponse
+from src.schemas.wines_schema import VinosGroupedResponse
+from src.services.catalog_service import CatalogService, CatalogSnapshot, catalog_store, encode_item
+from src.services.menu_service import MenuService
+from src.services.vinos_service import VinosService
+
+try:
+    import brotli
+except ImportError:  # Dependencia opcional
+    brotli = None
+
+MANIFEST_NAME = "manifest.json"
+
+def slugify(value: str) -> str:
+    """Nombre de fichero ASCII a partir de un nombre de categoría"""
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")
+
+def _fingerprint(value: Any) -> str:
+    data = json.dumps(value, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+class SnapshotService:
+    def __init__(self, db: Session, output_dir: Optional[str] = None):
+        self.db = db
+        self.output_dir = Path(output_dir or settings.snapshot_dir)
+        self.menu_service = MenuService(db)
+        self.vinos_service = VinosService(db)
+
+    def export(self, force: bool = False) -> Dict[str, Any]:
+        """
+        Genera todos los presets y publica el manifest. Los presets por
+        categoría cuyo contenido no ha cambiado desde el manifest anterior
+        no se vuelven a consultar ni a escribir
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        previous = {} if force else self._read_manifest().get("presets", {})
+        if settings.menu_publication_enabled:
+            # Una sola instantánea para todos los presets
+            snapshot = catalog_store.refresh()
+            listing = lambda entidad, **filters: self._published_listing(snapshot, entidad, filters)
+            names = lambda entidad: self._published_names(snapshot, entidad)
+        else:
+            listing, names = self._table_listing, self._table_names
+        presets: Dict[str, Dict[str, Any]] = {}
+        written: List[str] = []
+
+        def publish(name: str, path: str, params: Dict[str, Any], fingerprint: Optional[str], render: Callable[[], bytes]) -> None:
+            old = previous.get(name)
+            if fingerprint is not None and old and old.get("fingerprint") == fingerprint \
+                    and (self.output_dir / old["file"]).exists():
+                presets[name] = old
+                return
+            entry = self._write_preset(name, render())
+            if not old or old["file"] != entry["file"]:
+                written.append(name)
+            entry.update({"path": path + ("?" + urlencode(params) if params else ""), "fingerprint": fingerprint})
+            presets[name] = entry
+
+        # Platos: listado completo, sugerencias y una entrada por categoría
+        platos, render = listing("platos")
+        publish("platos", "/api/v1/public/platos", {}, _fingerprint(platos), render)
+        publish("platos-sugerencias", "/api/v1/public/platos", {"sugerencias": "true"}, None,
+                lambda: listing("platos", sugerencias=True)[1]())
+        for nombre in names("platos"):
+            # Mismo criterio de coincidencia parcial que el filtro `categoria`
+            grupo = {k: v for k, v in platos.items() if nombre.casefold() in k.casefold()}
+            publish(f"platos-{slugify(nombre)}", "/api/v1/public/platos", {"categoria": nombre},
+                    _fingerprint(grupo),
+                    lambda nombre=nombre: listing("platos", categoria=nombre)[1]())
+
+        # Vinos: listado completo y una entrada por tipo
+        vinos, render = listing("vinos")
+        publish("vinos", "/api/v1/public/vinos", {}, _fingerprint(vinos), render)
+        for nombre in names("vinos"):
+            grupo = {k: v for k, v in vinos.items() if nombre.casefold() in k.casefold()}
+            publish(f"vinos-{slugify(nombre)}", "/api/v1/public/vinos", {"tipo": nombre},
+                    _fingerprint(grupo),
+                    lambda nombre=nombre: listing("vinos", tipo=nombre)[1]())
+
+        manifest = {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "presets": presets,
+        }
+        self._atomic_write(self.output_dir / MANIFEST_NAME, json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8"))
+        self._remove_unreferenced(previous, presets)
+        return {"presets": len(presets), "written": written}
+
+    def _table_listing(self, entidad: str, **filters: Any) -> Tuple[Dict[str, Any], Callable[[], bytes]]:
+        """Listado agrupado desde las tablas y cómo serializarlo"""
+        if entidad == "platos":
+            platos = self.menu_service.get_platos_public(**filters)
+            return platos, lambda: self._render_platos(platos)
+        vinos = self.vinos_service.get_vinos_public(**filters)
+        return vinos, lambda: self._render_vinos(vinos)
+
+    def _table_names(self, entidad: str) -> List[str]:
+        model = CategoriaPlato if entidad == "platos" else CategoriaVino
+        return [nombre for (nombre,) in self.db.query(model.nombre).filter(model.is_active == True).order_by(model.nombre)]
+
+    @staticmethod
+    def _published_listing(
+        snapshot: CatalogSnapshot,
+        entidad: str,
+        filters: Dict[str, Any]
+    ) -> Tuple[Dict[str, Any], Callable[[], bytes]]:
+        """
+        Listado agrupado de la versión publicada; sin filtros se sirve el
+        cuerpo ya serializado en la publicación, como hace la API
+        """
+        grouped = CatalogService()._grouped(
+            snapshot,
+            entidad,
+            None,
+            filters.get("categoria"),
+            filters.get("sugerencias"),
+            filters.get("tipo"),
+            None,
+            None,
+            None,
+        )
+        publication = snapshot.publication
+        if publication is not None and not filters:
+            body = publication.platos_json if entidad == "platos" else publication.vinos_json
+            return grouped, lambda: body
+        return grouped, lambda: encode_item({entidad: grouped})
+
+    @staticmethod
+    def _published_names(snapshot: CatalogSnapshot, entidad: str) -> List[str]:
+        """Categorías (o tipos) con algún registro en la versión publicada"""
+        if entidad == "platos":
+            catalog, field = snapshot.platos, "categoria"
+            rows = sorted(snapshot.public_platos)
+        else:
+            catalog, field = snapshot.vinos, "tipo"
+            rows = catalog.all_rows().tolist()
+        return sorted({catalog.items[row][field] for row in rows if catalog.items[row][field]})
+
+    @staticmethod
+    def _render_platos(platos: Dict[str, Any]) -> bytes:
+        # Misma serialización que la respuesta del endpoint (response_model)
+        return PlatosGroupedResponse.model_validate({"platos": platos}).model_dump_json().encode("utf-8")
+
+    @staticmethod
+    def _render_vinos(vinos: Dict[str, Any]) -> bytes:
+        return VinosGroupedResponse.model_validate({"vinos": vinos}).model_dump_json().encode("utf-8")
+
+    def _write_preset(self, name: str, body: bytes) -> Dict[str, Any]:
+        """Escribe el fichero con hash de contenido, sus variantes y el alias estable"""
+        digest = hashlib.sha256(body).hexdigest()[:12]
+        filename = f"{name}.{digest}.json"
+        target = self.output_dir / filename
+        variants = ["gz"] + (["br"] if brotli is not None else [])
+
+        if not target.exists():
+            # Las variantes comprimidas van antes para que nunca falten junto al original
+            self._atomic_write(target.with_name(filename + ".gz"), gzip.compress(body, 9, mtime=0))
+            if brotli is not None:
+                self._atomic_write(target.with_name(filename + ".br"), brotli.compress(body))
+            self._atomic_write(target, body)
+
+        for suffix in ("", ".gz", ".br"):
+            source = target.with_name(filename + suffix)
+            if source.exists():
+                self._atomic_write(self.output_dir / f"{name}.json{suffix}", source.read_bytes())
+
+        return {"file": filename, "hash": digest, "size": len(body), "variants": variants}
+
+    def _remove_unreferenced(self, previous: Dict[str, Any], current: Dict[str, Any]) -> None:
+        """Borra ficheros con hash que no aparecen ni en el manifest actual ni en el anterior"""
+        keep = {entry["file"] for entry in (*previous.values(), *current.values())}
+        for path in self.output_dir.glob("*.*.json*"):
+            base = path.name.split(".json")[0] + ".json"
+            if re.search(r"\.[0-9a-f]{12}\.json$", base) and base not in keep:
+                path.unlink(missing_ok=True)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            return json.loads((self.output_dir / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    @staticmethod
+    def _atomic_write(path: Path, data: bytes) -> None:
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
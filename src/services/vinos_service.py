@@ -1,25 +1,144 @@
 """
 Servicio para lógica de negocio de los vinos
 """
-from typing import Dict, List, Any, Optional
+from typing import Dict, Iterator, List, Any, Optional
 from sqlalchemy.orm import Session
+from src.core.cache import cache_key
+from src.core.tracing import traced
+from src.repositories.json_aggregation import JsonAggregation
 from src.repositories.vinos_repository import VinosRepository
+from src.schemas.wines_schema import VinoResponse
+from src.services.catalog_service import CatalogService
+from src.services.grouped_stream import stream_grouped_json
+from src.services.menu_cache import menu_cache, menu_flight
 
 class VinosService:
     def __init__(self, db: Session):
         self.db = db
         self.vinos_repo = VinosRepository(db)
     
+    @traced()
     def get_vinos_public(
+        self,
+        tipo: Optional[str] = None,
+        denominacion: Optional[str] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        sort: Optional[str] = None
+    ) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        """
+        Lógica de negocio + transformación para API pública. Con `sort`, los
+        registros de cada grupo salen en ese orden (precio, -precio, nombre)
+        """
+        key = cache_key(
+            "vinos",
+            tipo=tipo,
+            denominacion=denominacion,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            sort=sort
+        )
+        return menu_cache.get_or_set(
+            key,
+            lambda: self._build_vinos_public(tipo, denominacion, precio_min, precio_max, sort),
+            flight=menu_flight
+        )
+    
+    @traced()
+    def get_vinos_public_json(
         self,
         tipo: Optional[str] = None,
         denominacion: Optional[str] = None,
         precio_min: Optional[float] = None,
         precio_max: Optional[float] = None
+    ) -> Optional[str]:
+        """
+        Mismos vinos que `get_vinos_public`, agrupados por la base de datos
+        y ya serializados (el orden de las claves lo decide la base de datos).
+        None si la base de datos no admite la agregación JSON
+        """
+        if not JsonAggregation.supported(self.db):
+            return None
+        key = cache_key(
+            "vinos_json",
+            tipo=tipo,
+            denominacion=denominacion,
+            precio_min=precio_min,
+            precio_max=precio_max
+        )
+        return menu_cache.get_or_set(
+            key,
+            lambda: self.vinos_repo.get_vinos_grouped_json(
+                tipo=tipo,
+                denominacion=denominacion,
+                precio_min=precio_min,
+                precio_max=precio_max,
+                incluir_inactivos=False
+            ),
+            flight=menu_flight
+        )
+    
+    def stream_vinos_public(
+        self,
+        tipo: Optional[str] = None,
+        denominacion: Optional[str] = None,
+        precio_min: Optional[float] = None,
+        precio_max: Optional[float] = None,
+        sort: Optional[str] = None,
+        batch_size: int = 500
+    ) -> Iterator[bytes]:
+        """
+        Mismo JSON que `get_vinos_public` escrito por partes desde un cursor
+        de servidor, sin caché y con memoria constante. La sesión tiene que
+        seguir abierta mientras se consume el generador
+        """
+        rows = self.vinos_repo.iter_vinos_rows(
+            tipo=tipo,
+            denominacion=denominacion,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            sort=sort,
+            batch_size=batch_size
+        )
+        
+        def records():
+            for vino in rows:
+                item = VinoResponse(
+                    id=vino.id,
+                    nombre=vino.nombre,
+                    precio=float(vino.precio) if vino.precio else None,
+                    precio_unidad=vino.precio_unidad,
+                    bodega=vino.bodega,
+                    uvas=vino.uvas or [],
+                    enologo=vino.enologo
+                )
+                yield (vino.tipo, vino.denominacion or "Sin denominación"), item.model_dump_json()
+        
+        return stream_grouped_json("vinos", records(), depth=2)
+    
+    @traced()
+    def _build_vinos_public(
+        self,
+        tipo: Optional[str],
+        denominacion: Optional[str],
+        precio_min: Optional[float],
+        precio_max: Optional[float],
+        sort: Optional[str] = None
     ) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
         """
-        Lógica de negocio + transformación para API pública
+        Consulta y agrupación sin caché. Los listados ordenados salen de las
+        permutaciones precalculadas del catálogo en memoria
         """
+        if sort is not None:
+            return CatalogService().get_grouped(
+                "vinos",
+                sort,
+                tipo=tipo,
+                denominacion=denominacion,
+                precio_min=precio_min,
+                precio_max=precio_max
+            )
+        
         # Usar repository (devuelve objetos Vino)
         vinos = self.vinos_repo.get_vinos_with_filters(
             tipo=tipo,
@@ -32,6 +151,7 @@ class VinosService:
         # TRANSFORMACIÓN: agrupar y formatear para API
         return self._group_vinos_by_type_and_denominacion(vinos)
     
+    @traced()
     def _group_vinos_by_type_and_denominacion(self, vinos: List) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
         """
         TRANSFORMACIÓN: convertir objetos Vino a estructura para API
@@ -39,9 +159,9 @@ class VinosService:
         vinos_agrupados = {}
         
         for vino in vinos:
-            tipo_vino = vino.categoria.nombre
+            tipo_vino = vino.categoria_nombre
             # Manejar denominación nula
-            denominacion_nombre = vino.denominacion_origen.nombre if vino.denominacion_origen else "Sin denominación"
+            denominacion_nombre = vino.denominacion_nombre or "Sin denominación"
             
             # Crear el tipo si no existe
             if tipo_vino not in vinos_agrupados:
@@ -51,19 +171,15 @@ class VinosService:
             if denominacion_nombre not in vinos_agrupados[tipo_vino]:
                 vinos_agrupados[tipo_vino][denominacion_nombre] = []
             
-            # Obtener información adicional
-            uvas_nombres = [uva.nombre for uva in vino.uvas] if vino.uvas else []
-            enologo_nombre = vino.enologo.nombre if vino.enologo else None
-            
             # Añadir el vino formateado
             vino_dict = {
                 "id": vino.id,
                 "nombre": vino.nombre,
                 "precio": float(vino.precio) if vino.precio else None,
                 "precio_unidad": vino.precio_unidad,
-                "bodega": vino.bodega.nombre,
-                "uvas": uvas_nombres,
-                "enologo": enologo_nombre
+                "bodega": vino.bodega_nombre,
+                "uvas": list(vino.uvas_nombres or []),
+                "enologo": vino.enologo_nombre
             }
             
             vinos_agrupados[tipo_vino][denominacion_nombre].append(vino_dict)
@@ -0,0 +1,153 @@
+"""
+Calentamiento del worker antes de recibir tráfico
+
+Abre de antemano las conexiones del pool, ejecuta las consultas principales
+de los repositorios (que quedan compiladas en la caché de sentencias del
+engine) y deja preparadas las cachés del menú y de los repositorios, el
+catálogo en memoria, los índices de búsqueda de vinos, el índice de
+maridajes y la tabla de versiones de token. ``/health/ready`` no responde 200 hasta que termina.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from src.auth.token_registry import token_registry
+from src.core.config import settings
+from src.database import SessionLocal, engine
+from src.database.change_tracking import MENU_SCOPE, read_version
+from src.repositories.query_cache import repository_cache
+from src.services.catalog_service import catalog_store
+from src.services.fuzzy_search import vinos_search
+from src.services.menu_service import MenuService
+from src.services.pairing_service import pairing_index
+from src.services.vinos_service import VinosService
+
+logger = logging.getLogger(__name__)
+
+class Warmup:
+    """Pasos de calentamiento y su resultado"""
+
+    def __init__(self) -> None:
+        self.ready = False
+        self.attempts = 0
+        self.started_at: Optional[float] = None
+        self.duration_ms: Optional[float] = None
+        self.steps: List[Dict[str, Any]] = []
+        self.error: Optional[str] = None
+
+    def run(self) -> None:
+        """Ejecuta todos los pasos; lanza la excepción del primero que falle"""
+        self.attempts += 1
+        self.started_at = time.time()
+        self.steps = []
+        self.error = None
+        start = time.perf_counter()
+        try:
+            self._step("pool", self._connect_pool)
+            self._step("versiones", self._sync_versions)
+            self._step("platos", self._prime_platos)
+            self._step("vinos", self._prime_vinos)
+            self._step("catalogo", catalog_store.snapshot)
+            self._step("busqueda", vinos_search.refresh)
+            self._step("maridaje", pairing_index.refresh)
+            # Cualquier id sirve: la primera consulta carga la tabla entera
+            self._step("usuarios", lambda: token_registry.state(0))
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            self.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+        self.ready = True
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "listo": self.ready,
+            "intentos": self.attempts,
+            "inicio": self.started_at,
+            "duracion_ms": self.duration_ms,
+            "pasos": self.steps,
+            "error": self.error,
+        }
+
+    def _step(self, name: str, fn: Callable[[], Any]) -> None:
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            self.steps.append({"paso": name, "ms": _elapsed_ms(start), "error": str(e)[:200]})
+            raise
+        self.steps.append({"paso": name, "ms": _elapsed_ms(start)})
+
+    @staticmethod
+    def _connect_pool() -> None:
+        """Abre a la vez tantas conexiones como el tamaño del pool y las devuelve"""
+        size = settings.warmup_pool_connections
+        if size is None:
+            size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+        connections = []
+        try:
+            for _ in range(max(size, 1)):
+                connection = engine.connect()
+                connections.append(connection)
+                connection.execute(text("SELECT 1"))
+        finally:
+            for connection in connections:
+                connection.close()
+
+    @staticmethod
+    def _sync_versions() -> None:
+        with SessionLocal() as db:
+            row = read_version(db, MENU_SCOPE)
+        repository_cache.sync_version(row[0] if row else None)
+
+    @staticmethod
+    def _prime_platos() -> None:
+        with SessionLocal() as db:
+            service = MenuService(db)
+            service.get_platos_public()
+            service.get_platos_public(sugerencias=True)
+
+    @staticmethod
+    def _prime_vinos() -> None:
+        with SessionLocal() as db:
+            VinosService(db).get_vinos_public()
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 1)
+
+def database_status() -> Dict[str, Any]:
+    """Estado actual de la base de datos (SELECT 1) y del pool de conexiones"""
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool": {"tipo": type(pool).__name__}}
+    for name, attribute in (("tamano", "size"), ("libres", "checkedin"), ("en_uso", "checkedout"), ("desborde", "overflow")):
+        if hasattr(pool, attribute):
+            status["pool"][name] = getattr(pool, attribute)()
+    compiled_cache = getattr(engine, "_compiled_cache", None)
+    if compiled_cache is not None:
+        status["sentencias_compiladas"] = len(compiled_cache)
+
+    start = time.perf_counter()
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        status["base_datos"] = {"ok": True, "latencia_ms": _elapsed_ms(start)}
+    except Exception as e:
+        status["base_datos"] = {"ok": False, "latencia_ms": _elapsed_ms(start), "error": str(e)[:200]}
+    return status
+
+warmup = Warmup()
+
+async def run_warmup() -> None:
+    """Tarea del worker: reintenta el calentamiento hasta que termina bien"""
+    while True:
+        try:
+            await run_in_threadpool(warmup.run)
+            logger.info("Worker calentado en %.1f ms", warmup.duration_ms)
+            return
+        except Exception:
+            logger.exception("Error en el calentamiento, reintento en %.0f s", settings.warmup_retry_seconds)
+        await asyncio.sleep(settings.warmup_retry_seconds)